@@ -0,0 +1,44 @@
+'''
+Compares the compact binary record format of the resolver cache with JSON: size and decode speed.
+
+	python benchmarks/bench_codec.py [number of repetitions]
+'''
+
+import sys
+import json
+import time
+
+from fake_api import synthetic_record
+
+from scidd.astro.codec import decode_records, encode_records
+
+def entries(records_per_entry:int) -> list:
+	''' Returns a cache entry with the given number of records with realistic (long) URLs. '''
+	records = [synthetic_record("galex", "gr6", f"MISDR1_{i:06d}_0267_0001-nd-int.fits") for i in range(records_per_entry)]
+	for record in records:
+		record["url"] = "https://galex.stsci.edu/data/GR6/pipe/01-vsn/50267-MISDR1_24278_0267/d/01-main/0001-img/07-try/" + record["scidd"].rsplit("/", 1)[1]
+	return records
+
+def rate(function, data, repetitions:int) -> float:
+	start = time.perf_counter()
+	for _ in range(repetitions):
+		function(data)
+	return repetitions / (time.perf_counter() - start)
+
+def main(repetitions:int=100000) -> dict:
+	results = dict()
+	for n in [1, 10]:
+		records = entries(n)
+		text = json.dumps(records)
+		compact = encode_records(records)
+		assert decode_records(compact) == records
+		results[f"json_{n}_bytes"] = len(text)
+		results[f"compact_{n}_bytes"] = len(compact)
+		results[f"json_{n}_decode_per_s"] = rate(json.loads, text, repetitions // n)
+		results[f"compact_{n}_decode_per_s"] = rate(decode_records, compact, repetitions // n)
+	for name, value in results.items():
+		print(f"{name:>28}: {value:12,.0f}")
+	return results
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
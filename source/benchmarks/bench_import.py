@@ -0,0 +1,78 @@
+'''
+Import-time regression benchmark for `scidd.astro`.
+
+Imports the package in fresh interpreters with ``python -X importtime`` and reports the
+cumulative import time of ``scidd.astro`` itself (i.e. excluding ``scidd.core``, which is
+imported first), the slowest modules it pulls in, and any heavy dependency loaded eagerly.
+Exits with a non-zero status if the median time is over the budget.
+
+	python benchmarks/bench_import.py [--budget milliseconds] [--runs n]
+'''
+
+import sys
+import argparse
+import statistics
+import subprocess
+
+# dependencies that must only be imported when the feature needing them is used
+DEFERRED = ["astropy", "requests", "numpy", "aiohttp", "sqlite3", "tarfile", "scidd.astro.dataset.galex", "scidd.astro.streaming"]
+
+def import_times(runs:int) -> list:
+	'''
+	Returns one (cumulative microseconds of scidd.astro, {module:self microseconds}, eagerly loaded modules) tuple per run.
+	'''
+	probe = ";".join([
+		"import sys",
+		"import scidd.core",
+		"before = set(sys.modules)",
+		"import scidd.astro",
+		f"print(','.join(m for m in {DEFERRED!r} if m in sys.modules and m not in before))"
+	])
+	results = list()
+	for _ in range(runs):
+		process = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+								 capture_output=True, text=True, check=True)
+		total = None
+		modules = dict() # the modules imported by the last top level import
+		for line in process.stderr.splitlines():
+			if not line.startswith("import time:") or "self [us]" in line:
+				continue
+			self_us, cumulative_us, name = line[len("import time:"):].split("|")
+			top_level = not name.startswith("  ") # nested imports are indented by two spaces per level
+			name = name.strip()
+			if name == "scidd.astro":
+				total = int(cumulative_us)
+				modules[name] = int(self_us)
+				break
+			modules[name] = int(self_us)
+			if top_level:
+				modules = dict()
+		eager = [name for name in process.stdout.strip().split(",") if name]
+		results.append((total, modules, eager))
+	return results
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--budget", type=float, default=150.0, help="maximum median import time in milliseconds")
+	parser.add_argument("--runs", type=int, default=7, help="number of fresh interpreters to measure")
+	args = parser.parse_args()
+
+	results = import_times(args.runs)
+	median_ms = statistics.median(total for total, _, _ in results) / 1000
+
+	print(f"scidd.astro import time (median of {args.runs}): {median_ms:.1f} ms, budget {args.budget:.1f} ms")
+	print("slowest modules imported by scidd.astro (self time):")
+	modules = results[-1][1]
+	for name in sorted(modules, key=modules.get, reverse=True)[:10]:
+		print(f"  {modules[name]/1000:8.1f} ms  {name}")
+
+	eager = results[-1][2]
+	if eager:
+		print(f"FAIL: imported eagerly: {', '.join(eager)}")
+	if median_ms > args.budget:
+		print("FAIL: over budget")
+	if eager or median_ms > args.budget:
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,106 @@
+'''
+Measures the memory used per `SciDDAstroFile` object, before and after the lean object layout.
+
+"before" reproduces the layout the objects had before they were made lean (every attribute in the instance
+``__dict__``, a dataset/release string per object) on the installed ``scidd.core`` base classes, so the
+comparison is made against the same bases as the current objects. As those bases don't define ``__slots__``,
+every object still has a ``__dict__`` ("instance dict"); "unslotted" keeps the attributes of the current
+objects in that ``__dict__`` instead, which shows what the ``__slots__`` of the astro classes save.
+
+	python benchmarks/bench_memory.py [number of objects]
+'''
+
+import sys
+import gc
+import tracemalloc
+
+from scidd.core import SciDD, SciDDFileResource
+
+class LegacySciDDAstroFile(SciDD, SciDDFileResource):
+	'''
+	The attributes a `SciDDAstroFile` object held before the lean layout, once its components were read.
+	'''
+	def __init__(self, sci_dd:str, resolver=None):
+		SciDD.__init__(self, sci_dd=sci_dd, resolver=resolver)
+		SciDDFileResource.__init__(self)
+		self._datasetRelease = None
+		self._position = None # a SkyCoord once the position is known
+		self._uniqueid_checked = False
+
+	def read(self):
+		''' Fill the values that were computed lazily, as reading 'datasetRelease' and 'filenameUniqueIdentifier' did. '''
+		dataset, release = self.scidd.split("/")[3:5]
+		self._datasetRelease = ".".join([dataset, release]) # a new string for every object
+		self._filename_unique_identifier = None
+		self._uniqueid_checked = True
+
+def bytes_per_object(factory, n:int) -> float:
+	'''
+	Returns the average number of bytes held per object created by 'factory(i)'.
+
+	This is measured as the memory released when the objects are deleted, so that shared state that only
+	grows once (e.g. the table of interned strings) is not counted.
+	'''
+	gc.collect()
+	tracemalloc.start()
+	try:
+		objects = [factory(i) for i in range(n)]
+		alive = tracemalloc.take_snapshot()
+		del objects
+		gc.collect()
+		released = tracemalloc.take_snapshot()
+	finally:
+		tracemalloc.stop()
+	return -sum(stat.size_diff for stat in released.compare_to(alive, "filename")) / n
+
+class _Unslotted(SciDD, SciDDFileResource):
+	''' A class without ``__slots__`` on the same bases. '''
+
+def unslotted(sci_dd) -> _Unslotted:
+	'''
+	Returns an object with the same attributes as 'sci_dd', all kept in its ``__dict__`` (as if the astro classes had no ``__slots__``).
+	'''
+	copy = object.__new__(_Unslotted)
+	for name, value in vars(sci_dd).items():
+		setattr(copy, name, value)
+	for name in [name for cls in type(sci_dd).__mro__ for name in getattr(cls, "__slots__", ())]:
+		setattr(copy, name, getattr(sci_dd, name))
+	return copy
+
+def main(n:int=100000) -> dict:
+	from scidd.astro import SciDDAstro
+
+	identifiers = [f"scidd:/astro/file/galex/gr6/MISDR1_{i:06d}_0267_0001-nd-cat.fits" for i in range(n)]
+
+	def scidd_file(i):
+		s = SciDDAstro(identifiers[i])
+		s.datasetRelease, s.filename, s.filenameUniqueIdentifier # fill lazily computed values
+		return s
+
+	def legacy_scidd_file(i):
+		s = LegacySciDDAstroFile(identifiers[i])
+		s.read()
+		return s
+
+	def sky_coord(i):
+		import astropy.units as u
+		from astropy.coordinates import SkyCoord
+		return SkyCoord(ra=(i % 360)*u.deg, dec=0.5*u.deg)
+
+	def floats(i):
+		return (float(i % 360), 0.5)
+
+	results = {
+		"SciDDAstroFile before" : bytes_per_object(legacy_scidd_file, n),
+		"SciDDAstroFile" : bytes_per_object(scidd_file, n),
+		"SciDDAstroFile unslotted" : bytes_per_object(lambda i: unslotted(scidd_file(i)), n),
+		"instance dict" : float(sys.getsizeof(vars(scidd_file(0)))),
+		"SkyCoord position" : bytes_per_object(sky_coord, min(n, 10000)),
+		"float position" : bytes_per_object(floats, n)
+	}
+	for name, size in results.items():
+		print(f"{name:>26}: {size:8.1f} bytes/object")
+	return results
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,74 @@
+'''
+Micro-benchmark of astro SciDD identifier parsing.
+
+Compares the per-property regular expression/split approach previously used by
+`SciDDAstro` and `SciDDAstroFile` against the single-pass `parse_astro_scidd`.
+
+	python benchmarks/bench_parse.py [number of identifiers]
+'''
+
+import os
+import re
+import sys
+import time
+
+from scidd.astro.parser import compression_extensions, parse_astro_scidd
+
+def identifiers(n:int):
+	''' Returns 'n' distinct synthetic identifiers across the supported datasets. '''
+	templates = [
+		"scidd:/astro/file/galex/gr6/MISDR1_{n:05d}_0267_0001-nd-cat.fits",
+		"scidd:/astro/file/wise/allsky/{n:05d}a123-w1-int-1b.fits",
+		"scidd:/astro/file/2mass/allsky/ji{n:07d}.fits;uniqueid=20001017.s.27#1",
+		"scidd:/astro/file/sdss/dr16/frame-g-{n:06d}-3-0213.fits.bz2"
+	]
+	return [templates[i % len(templates)].format(n=i) for i in range(n)]
+
+def legacy(sci_dd:str):
+	''' The previous implementation: each property scans the identifier on its own. '''
+	match = re.search("scidd:/astro/(?P<type>data|file)/2mass/.+", sci_dd)
+	if not match:
+		sci_dd.startswith("scidd:/astro/data/") or sci_dd.startswith("scidd:/astro/file/")
+
+	match = re.search("^scidd:/astro/(data|file)/([^/]+)/([^/^.]+)", sci_dd)
+	dataset_release = ".".join([match.group(2), match.group(3)])
+
+	uri = sci_dd.split("#")[0]
+	filename = uri.split("/")[-1]
+	filename = filename.split(";")[0]
+	fname, ext = os.path.splitext(filename)
+	if ext in compression_extensions:
+		filename = fname
+
+	uniqueid = None
+	match = re.search("^.+;([^#]+)", sci_dd)
+	if match:
+		d = dict([x.split("=") for x in match.group(1).split("?")])
+		uniqueid = d.get("uniqueid")
+
+	return dataset_release, filename, uniqueid
+
+def single_pass(sci_dd:str):
+	parsed = parse_astro_scidd(sci_dd)
+	return parsed.datasetRelease, parsed.filename, parsed.uniqueid
+
+def measure(function, ids) -> float:
+	start = time.perf_counter()
+	for sci_dd in ids:
+		function(sci_dd)
+	return time.perf_counter() - start
+
+def main(n:int=1000000) -> dict:
+	ids = identifiers(n)
+	assert all(legacy(s) == single_pass(s) for s in ids[:1000])
+
+	results = dict()
+	for name, function in [("legacy", legacy), ("single_pass", single_pass)]:
+		elapsed = measure(function, ids)
+		results[name] = n / elapsed
+		print(f"{name:>12}: {elapsed:7.3f} s  ({n / elapsed:,.0f} identifiers/s)")
+	print(f"     speedup: {results['single_pass'] / results['legacy']:.2f}x")
+	return results
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 1000000)
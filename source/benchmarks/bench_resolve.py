@@ -0,0 +1,73 @@
+'''
+Benchmark of SciDD resolution against a local stand-in for the filename-search API (see fake_api.py).
+
+Measures resolving identifiers one at a time with a cold cache, with the cache warm in memory,
+with only the persistent cache warm, and in bulk with a cold cache.
+
+	python benchmarks/bench_resolve.py [number of identifiers] [latency in ms]
+'''
+
+import os
+import sys
+import time
+
+from fake_api import FakeAPIServer, synthetic_scidds
+
+def new_resolver(server:FakeAPIServer):
+	''' Returns a resolver for the fake API with an empty, private cache. '''
+	from scidd.astro import SciDDAstroResolver
+	from scidd.astro.cache import ResolverCache
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=server.port)
+	resolver.cache = ResolverCache(persistent=dict())
+	return resolver
+
+def resolve_one_at_a_time(resolver, identifiers) -> float:
+	''' Returns the number of identifiers resolved per second with 'urlForSciDD'. '''
+	from scidd.astro import SciDDAstro
+	sci_dds = [SciDDAstro(sci_dd, resolver=resolver) for sci_dd in identifiers]
+	start = time.perf_counter()
+	for sci_dd in sci_dds:
+		resolver.urlForSciDD(sci_dd)
+	return len(sci_dds) / (time.perf_counter() - start)
+
+def resolve_in_bulk(resolver, identifiers) -> float:
+	''' Returns the number of identifiers resolved per second with 'urlsForSciDDs'. '''
+	from scidd.astro import SciDDAstro
+	sci_dds = [SciDDAstro(sci_dd, resolver=resolver) for sci_dd in identifiers]
+	start = time.perf_counter()
+	results = resolver.urlsForSciDDs(sci_dds)
+	elapsed = time.perf_counter() - start
+	errors = [result for result in results.values() if isinstance(result, Exception)]
+	assert len(errors) == 0, errors[0] if errors else None
+	return len(sci_dds) / elapsed
+
+def main(n:int=2000, latency_ms:float=1.0) -> dict:
+	os.environ.pop("SCIDD_USE_CACHE", None) # the cache must be on for the warm measurements
+	server = FakeAPIServer(latency=latency_ms / 1000).start()
+	server.respondWithSyntheticRecords()
+	try:
+		identifiers = synthetic_scidds(n)
+		results = dict()
+
+		resolver = new_resolver(server)
+		server.requests.clear()
+		results["single_cold_per_s"] = resolve_one_at_a_time(resolver, identifiers)
+		results["single_cold_requests"] = len(server.requests)
+		results["single_warm_memory_per_s"] = resolve_one_at_a_time(resolver, identifiers)
+		resolver.cache.clearMemory()
+		results["single_warm_persistent_per_s"] = resolve_one_at_a_time(resolver, identifiers)
+
+		resolver = new_resolver(server)
+		server.requests.clear()
+		results["batch_cold_per_s"] = resolve_in_bulk(resolver, identifiers)
+		results["batch_cold_requests"] = len(server.requests)
+	finally:
+		server.stop()
+
+	for name, value in results.items():
+		print(f"{name:>30}: {value:12,.0f}")
+	return results
+
+if __name__ == "__main__":
+	main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+		 float(sys.argv[2]) if len(sys.argv) > 2 else 1.0)
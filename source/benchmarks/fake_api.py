@@ -0,0 +1,175 @@
+'''
+A local stand-in for the resolver API, shared by the benchmarks and the tests (see ``tests/conftest.py``).
+
+Responses are queued per path with :py:meth:`FakeAPIServer.respond`. For benchmarks,
+:py:meth:`FakeAPIServer.respondWithSyntheticRecords` answers filename searches with synthetic records
+derived from the requested filename, so that every run sees the same data. Filenames starting with
+"missing" are not found. Several filenames may be requested at once (repeated ``filename``
+parameters), as in a bulk query.
+
+	python benchmarks/fake_api.py [port]
+'''
+
+import sys
+import json
+import time
+import zlib
+import threading
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# a release and a filename pattern per supported dataset
+DATASETS = {
+	"galex" : ("gr6", "MISDR1_{n:06d}_0267_0001-nd-int.fits.gz"),
+	"wise"  : ("allsky", "{n:05d}a123-w1-int-1b.fits"),
+	"2mass" : ("allsky", "ji{n:07d}.fits.gz"),
+	"sdss"  : ("dr16", "frame-g-{n:06d}-3-0213.fits.bz2")
+}
+
+def synthetic_scidds(n:int, dataset:str=None) -> list:
+	'''
+	Returns 'n' distinct file identifiers spread across the supported datasets (or only in the given dataset).
+	'''
+	datasets = [dataset] if dataset else list(DATASETS.keys())
+	scidds = list()
+	for i in range(n):
+		name = datasets[i % len(datasets)]
+		release, pattern = DATASETS[name]
+		sci_dd = f"scidd:/astro/file/{name}/{release}/{pattern.format(n=i)}"
+		if name == "2mass":
+			sci_dd += f";uniqueid=20001017.s.{i % 300}"
+		scidds.append(sci_dd)
+	return scidds
+
+def synthetic_search(query:dict) -> list:
+	'''
+	Returns the synthetic records of the filenames in the query parameters of a filename search.
+	'''
+	dataset = query.get("dataset", ["galex"])[0]
+	release = query.get("release", [DATASETS.get(dataset, ("dr1",))[0]])[0]
+	uniqueid = query.get("uniqueid", [None])[0]
+	return [synthetic_record(dataset, release, filename, uniqueid)
+			for filename in query.get("filename", []) if not filename.startswith("missing")]
+
+def synthetic_record(dataset:str, release:str, filename:str, uniqueid:str=None) -> dict:
+	'''
+	Returns the record the API would return for a filename; the same filename always gives the same record.
+	'''
+	checksum = zlib.crc32(filename.encode("utf-8"))
+	pattern = DATASETS.get(dataset, (None, ""))[1]
+	extension = next((ext for ext in [".gz", ".bz2"] if pattern.endswith(ext)), "")
+	sci_dd = f"scidd:/astro/file/{dataset}/{release}/{filename}{extension}"
+	if uniqueid:
+		sci_dd += f";uniqueid={uniqueid}"
+	return {
+		"scidd" : sci_dd,
+		"url" : f"https://data.example.org/{dataset}/{release}/{filename}{extension}",
+		"dataset" : dataset,
+		"release" : release,
+		"file_size" : None if extension else 2880 * (1 + checksum % 4000),
+		"position" : [(checksum % 360000) / 1000, (checksum // 360000) % 180000 / 1000 - 90]
+	}
+
+class FakeAPIServer(ThreadingHTTPServer):
+	'''
+	Serves the resolver API on 127.0.0.1.
+
+	Responses are queued per path as (status, JSON-serializable body, headers) tuples, where the body may also be a
+	callable that is passed the query parameters and returns the body; the last response
+	for a path is repeated once the queue is down to one entry. A HEAD request gets the headers of the same
+	response without the body. Every request is logged in ``requests`` as (path, query parameters) and the
+	client address of every connection is recorded in ``connections``.
+
+	:param port: the port to listen on; 0 picks a free port
+	:param latency: seconds each request is delayed by, to stand in for the network round trip
+	'''
+	daemon_threads = True
+
+	def __init__(self, port:int=0, latency:float=0.0):
+		super().__init__(("127.0.0.1", port), _FakeAPIHandler)
+		self.latency = latency
+		self.responses = dict()
+		self.requests = list()
+		self.connections = set()
+		self.lock = threading.Lock()
+
+	@property
+	def port(self) -> int:
+		return self.server_address[1]
+
+	def start(self):
+		''' Serve requests in a background thread. '''
+		threading.Thread(target=self.serve_forever, daemon=True).start()
+		return self
+
+	def stop(self):
+		self.shutdown()
+		self.server_close()
+
+	def respond(self, path:str, body, status:int=200, headers:dict=None):
+		''' Queue a response for the given path, optionally with additional headers. '''
+		with self.lock:
+			self.responses.setdefault(path, list()).append((status, body, headers or dict()))
+
+	def respondWithRecords(self, records:list):
+		'''
+		Answer filename searches like the API: with the records whose file name is one of those requested.
+		'''
+		def search(query:dict) -> list:
+			return [record for record in records if _filename_of(record) in query.get("filename", [])]
+		self.respond(FILENAME_SEARCH, search)
+
+	def respondWithSyntheticRecords(self):
+		''' Answer filename searches with synthetic records (see :py:func:`synthetic_search`). '''
+		self.respond(FILENAME_SEARCH, synthetic_search)
+
+FILENAME_SEARCH = "/astro/data/filename-search"
+
+def _filename_of(record:dict) -> str:
+	filename = record["scidd"].split(";")[0].split("/")[-1]
+	for extension in [".gz", ".bz2", ".zip", ".tgz"]:
+		if filename.endswith(extension):
+			return filename[:-len(extension)]
+	return filename
+
+class _FakeAPIHandler(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1" # keep-alive
+	disable_nagle_algorithm = True # the headers and body are written separately
+
+	def do_GET(self):
+		self._respond(send_body=True)
+
+	def do_HEAD(self):
+		self._respond(send_body=False)
+
+	def _respond(self, send_body:bool):
+		server = self.server
+		url = urlsplit(self.path)
+		with server.lock:
+			server.requests.append((url.path, parse_qs(url.query)))
+			server.connections.add(self.client_address)
+			queue = server.responses.get(url.path, [(404, {"error" : "not found"}, dict())])
+			status, body, headers = queue.pop(0) if len(queue) > 1 else queue[0]
+		if server.latency:
+			time.sleep(server.latency)
+		if callable(body):
+			body = body(parse_qs(url.query))
+		payload = json.dumps(body).encode("utf-8")
+		self.send_response(status)
+		self.send_header("Content-Type", "application/json")
+		self.send_header("Content-Length", str(len(payload)))
+		self.send_header("ETag", f'"{zlib.crc32(payload):08x}"')
+		for name, value in headers.items():
+			self.send_header(name, value)
+		self.end_headers()
+		if send_body:
+			self.wfile.write(payload)
+
+	def log_message(self, format, *args):
+		pass
+
+if __name__ == "__main__":
+	server = FakeAPIServer(port=int(sys.argv[1]) if len(sys.argv) > 1 else 8000)
+	server.respondWithSyntheticRecords()
+	print(f"serving on http://127.0.0.1:{server.port}{FILENAME_SEARCH}")
+	server.serve_forever()
@@ -0,0 +1,108 @@
+'''
+Runs the benchmark suite and compares the results with the recorded baselines.
+
+A result that is worse than its baseline by more than the tolerance is reported as a regression
+and the script exits with a non-zero status. Results named ``*_per_s`` are rates (higher is better);
+all others are sizes, times or request counts (lower is better).
+
+Baselines depend on the machine; record them on the machine the suite is run on with ``--update``.
+
+	python benchmarks/run.py [--only parse,resolve,codec,memory,import] [--tolerance 0.25] [--update]
+'''
+
+import sys
+import json
+import time
+import pathlib
+import argparse
+import platform
+import statistics
+
+sys.path.insert(0, str(pathlib.Path(__file__).parent))
+
+BASELINES = pathlib.Path(__file__).parent / "baselines.json"
+
+def best_of(results:list) -> dict:
+	''' Returns the best value of each result over repeated runs (fastest rate, smallest size or time). '''
+	return {name:(max if name.endswith("_per_s") else min)(result[name] for result in results) for name in results[0]}
+
+def run_parse() -> dict:
+	import bench_parse
+	return best_of([{f"{name}_per_s":value for name, value in bench_parse.main(200000).items()} for _ in range(3)])
+
+def run_resolve() -> dict:
+	import bench_resolve
+	return best_of([bench_resolve.main(2000, latency_ms=1.0) for _ in range(3)])
+
+def run_codec() -> dict:
+	import bench_codec
+	return best_of([bench_codec.main(100000) for _ in range(3)])
+
+def run_memory() -> dict:
+	import bench_memory
+	return {f"{name.replace(' ', '_')}_bytes":value for name, value in bench_memory.main(50000).items()}
+
+def run_import() -> dict:
+	import bench_import
+	totals = [total for total, _, _ in bench_import.import_times(runs=5)]
+	return {"scidd_astro_ms" : statistics.median(totals) / 1000}
+
+BENCHMARKS = {
+	"parse" : run_parse,
+	"resolve" : run_resolve,
+	"codec" : run_codec,
+	"memory" : run_memory,
+	"import" : run_import
+}
+
+def compare(results:dict, baselines:dict, tolerance:float) -> list:
+	'''
+	Returns the names of the results that are worse than their baseline by more than the tolerance.
+	'''
+	regressions = list()
+	print(f"\n{'benchmark':>45} {'baseline':>14} {'result':>14} {'change':>8}")
+	for name, value in results.items():
+		baseline = baselines.get(name)
+		if baseline is None:
+			print(f"{name:>45} {'-':>14} {value:14,.1f}")
+			continue
+		change = (value - baseline) / baseline if baseline else 0.0
+		higher_is_better = name.endswith("_per_s")
+		regressed = change < -tolerance if higher_is_better else change > tolerance
+		print(f"{name:>45} {baseline:14,.1f} {value:14,.1f} {change:+8.1%}{'  REGRESSION' if regressed else ''}")
+		if regressed:
+			regressions.append(name)
+	return regressions
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+	parser.add_argument("--only", default=",".join(BENCHMARKS.keys()), help="comma-separated list of benchmarks to run")
+	parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative change before a result counts as a regression")
+	parser.add_argument("--update", action="store_true", help="record the results as the new baselines")
+	parser.add_argument("--baselines", type=pathlib.Path, default=BASELINES, help="the baselines file")
+	args = parser.parse_args()
+
+	results = dict()
+	for name in args.only.split(","):
+		print(f"== {name}")
+		results.update({f"{name}.{key}":value for key, value in BENCHMARKS[name]().items()})
+
+	recorded = json.loads(args.baselines.read_text()) if args.baselines.exists() else {"results" : dict()}
+	regressions = compare(results, recorded["results"], args.tolerance)
+
+	if args.update:
+		recorded["results"].update(results)
+		recorded["machine"] = {
+			"python" : platform.python_version(),
+			"platform" : platform.platform(),
+			"processor" : platform.processor() or platform.machine(),
+			"recorded" : time.strftime("%Y-%m-%d")
+		}
+		args.baselines.write_text(json.dumps(recorded, indent=4, sort_keys=True) + "\n")
+		print(f"\nbaselines written to '{args.baselines}'")
+	elif regressions:
+		print(f"\n{len(regressions)} regression(s): {', '.join(regressions)}")
+		sys.exit(1)
+
+if __name__ == "__main__":
+	main()
@@ -1,5 +1,37 @@
 
 from .version import __version__
 
-from .astro_resolver import SciDDAstroResolver
-from .astro_scidd import SciDDAstro, SciDDAstroData, SciDDAstroFile
+from .astro_resolver import SciDDAstroResolver, ResourceStatus
+from .metrics import ResolverMetrics
+from .registry import DatasetRegistry, dataset_registry, register_dataset
+from .astro_scidd import SciDDAstro, SciDDAstroData, SciDDAstroFile, set_parse_cache_size
+
+# Names below are imported from their modules on first access (PEP 562) as they
+# pull in heavy dependencies (astropy, numpy, aiohttp, sqlite3) that most scripts don't need.
+_lazy_imports = {
+	"AsyncSciDDAstroResolver" : ".async_resolver",
+	"LocalMirrorResolver" : ".local_mirror",
+	"SkyPositions" : ".positions",
+	"positions" : ".positions",
+	"HEALPixIndex" : ".healpix_index",
+	"DownloadManager" : ".download",
+	"prewarm" : ".prewarm",
+	"PrewarmReport" : ".prewarm",
+	"ShardedSQLiteCache" : ".sqlite_cache",
+	"resolve_manifest" : ".bulk",
+	"iter_resolve" : ".bulk",
+	"CircuitOpenError" : ".throttle"
+}
+
+def __getattr__(name:str):
+	try:
+		module_name = _lazy_imports[name]
+	except KeyError:
+		raise AttributeError(f"module '{__name__}' has no attribute '{name}'")
+	import importlib
+	value = getattr(importlib.import_module(module_name, __name__), name)
+	globals()[name] = value # only look it up once
+	return value
+
+def __dir__():
+	return sorted(list(globals().keys()) + list(_lazy_imports.keys()))
@@ -1,25 +1,59 @@
 
 import os
-import re
-import pdb
 import json
+import time
 import logging
-from typing import Dict, List, Union
-
-import requests
+import pathlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, MutableMapping, NamedTuple, Union
 
 import scidd.core
 import scidd.core.exc
 from scidd.core.cache import LocalAPICache
 from scidd.core.logger import scidd_logger as logger
 
-from .dataset.galex import GALEXResolver
-from .dataset.wise import WISEResolver
-from .dataset.twomass import TwoMASSResolver
-from .dataset.sdss import SDSSResolver
+from .cache import ResolverCache, filename_cache_key
+from .metrics import ResolverMetrics
+from .parser import compression_extension, parse_astro_scidd
+from .registry import dataset_registry
+from .singleflight import SingleFlight
+from .throttle import CircuitOpenError
+from .transport import HTTPTransport
 
 logger = logging.getLogger("scidd.astro")
 
+class ResourceStatus(NamedTuple):
+	'''
+	The result of checking that a resource is available at a URL (an HTTP HEAD request).
+
+	``etag`` and ``content_length`` are ``None`` if the server did not send them; ``checked`` is the
+	time of the request (seconds since the epoch), which is earlier than now if the result came from the cache.
+	'''
+	url: str
+	status_code: int
+	etag: str
+	content_length: int
+	checked: float
+
+	@property
+	def available(self) -> bool:
+		''' Returns 'True' if the server reported the resource as available. '''
+		return self.status_code == 200
+
+def _filename_from_record(record:dict) -> str:
+	'''
+	Returns the filename (without any compression extension) of the SciDD in a filename search record.
+	'''
+	return parse_astro_scidd(record["scidd"]).filename
+
+def _apply_resource_status(sci_dd, status:ResourceStatus):
+	'''
+	Set the file size of a SciDD from the Content-Length of its (uncompressed) resource if it is not yet known.
+	'''
+	if status.available and status.content_length is not None and compression_extension(status.url) is None:
+		if getattr(sci_dd, "_uncompressed_file_size", None) is None:
+			sci_dd._uncompressed_file_size = status.content_length
+
 class SciDDAstroResolver(scidd.core.Resolver):
 	'''
 	This resolver can translate SciDDs of the "scidd:astro" domain into URLs that point to the specific resource.
@@ -32,11 +66,48 @@ class SciDDAstroResolver(scidd.core.Resolver):
 	:param scheme: scheme where the resolver service uses, e.g. "http", "https"
 	:param host: the hostname of the resolver service
 	:param port: the port number the resolver service is listening on
+	:param pool_size: the maximum number of persistent connections kept open to the resolver service
+	:param max_retries: the number of times a failed API call is retried
+	:param backoff_factor: controls the sleep between retries, ``backoff_factor * 2**(retry number - 1)`` seconds
+	:param timeout: per-request timeout in seconds, either a single value or a ``(connect, read)`` tuple
+	:param memory_cache_size: the maximum number of decoded API responses held in memory in front of the persistent cache
+	:param memory_cache_ttl: the number of seconds a response is held in memory, or ``None`` to hold it until evicted
+	:param negative_cache_ttl: the number of seconds a search that found nothing is remembered for
+	:param verify_cache_ttl: the number of seconds the result of checking that a resource is available is reused for
+	:param metrics: if True, record timings and counters of the resolve path in :py:attr:`metrics` (a :py:class:`ResolverMetrics`);
+					metrics can also be turned on later by assigning a ``ResolverMetrics`` object to it
+	:param rate_limit: the maximum number of requests per second sent to a host, or ``None`` for no limit (see :py:class:`HTTPTransport`)
+	:param failure_threshold: the number of consecutive failed requests to a host after which requests to it fail immediately
+							  with :py:class:`scidd.astro.throttle.CircuitOpenError` until it recovers; ``0`` to disable.
+							  While the API host's circuit is open, only answers already in the cache are given
+							  (resource checks may return a result older than ``verify_cache_ttl``).
+	:param recovery_time: the number of seconds requests to a failing host are paused before a single probe request is sent
+	:param persistent_cache: the persistent cache tier: a dictionary-like object, or the path of a directory to use as a
+							 :py:class:`ShardedSQLiteCache` (recommended when many processes share a cache); defaults to the
+							 directory in the ``SCIDD_ASTRO_CACHE_DIR`` environment variable if set, else the default ``LocalAPICache``
 	'''
 
-	def __init__(self, scheme:str="https", host:str=None, port:int=None):
+	def __init__(self, scheme:str="https", host:str=None, port:int=None, pool_size:int=10,
+				 max_retries:int=3, backoff_factor:float=0.5, timeout=(5.0, 30.0),
+				 memory_cache_size:int=10000, memory_cache_ttl:float=3600, negative_cache_ttl:float=86400,
+				 verify_cache_ttl:float=86400, metrics:bool=False, rate_limit:float=None, failure_threshold:int=5,
+				 recovery_time:float=30.0, persistent_cache:Union[MutableMapping,str,pathlib.Path]=None):
 		super().__init__(scheme=scheme, host=host, port=port)
 		self._useCache = True
+		self._cacheDisabledByEnvironment = False # as last seen in SCIDD_USE_CACHE
+		self.metrics = ResolverMetrics() if metrics else None # 'None' when disabled so the cost is a single check
+		self.verify_cache_ttl = verify_cache_ttl
+		self._inflight = SingleFlight() # concurrent identical filename searches are sent once
+		if persistent_cache is None:
+			persistent_cache = os.environ.get("SCIDD_ASTRO_CACHE_DIR") or None
+		if isinstance(persistent_cache, (str, pathlib.Path)):
+			from .sqlite_cache import ShardedSQLiteCache
+			persistent_cache = ShardedSQLiteCache(persistent_cache)
+		self.cache = ResolverCache(persistent=persistent_cache, memory_size=memory_cache_size, memory_ttl=memory_cache_ttl,
+								   negative_ttl=negative_cache_ttl)
+		self.transport = HTTPTransport(pool_size=pool_size, max_retries=max_retries,
+									   backoff_factor=backoff_factor, timeout=timeout, rate_limit=rate_limit,
+									   failure_threshold=failure_threshold, recovery_time=recovery_time)
 
 	@classmethod
 	def defaultResolver(cls):
@@ -48,32 +119,42 @@ class SciDDAstroResolver(scidd.core.Resolver):
 		The same object will always be returned from this method (pseudo-singleton).
 		'''
 		if cls._default_instance is None:
-			if "SCIDD_ASTRO_RESOLVER_HOST" in os.environ:
-				host = os.environ["SCIDD_ASTRO_RESOLVER_HOST"]
-			else:
-				host = "api.trillianverse.org"
-
-			if "SCIDD_ASTRO_RESOLVER_PORT" in os.environ:
-				port = os.environ["SCIDD_ASTRO_RESOLVER_PORT"]
-			else:
-				port = 443
-			cls._default_instance = cls(host=host, port=port)
+			cls._default_instance = cls(**cls._defaultOptions())
 		return cls._default_instance
 
+	@classmethod
+	def _defaultOptions(cls) -> dict:
+		''' Returns the constructor arguments of the default resolver (see :py:meth:`defaultResolver`). '''
+		if "SCIDD_ASTRO_RESOLVER_HOST" in os.environ:
+			host = os.environ["SCIDD_ASTRO_RESOLVER_HOST"]
+		else:
+			host = "api.trillianverse.org"
+
+		if "SCIDD_ASTRO_RESOLVER_PORT" in os.environ:
+			port = os.environ["SCIDD_ASTRO_RESOLVER_PORT"]
+		else:
+			port = 443
+		return {"host" : host, "port" : port}
+
 	@property
 	def useCache(self) -> bool:
 		# let environment variable override any setting here
-		try:
-			if os.environ["SCIDD_USE_CACHE"].lower() in ["0", "false", "f"]:
-				return False
-		except KeyError:
-			pass
+		disabled = os.environ.get("SCIDD_USE_CACHE", "").lower() in ["0", "false", "f"]
+		if disabled != self._cacheDisabledByEnvironment:
+			self._cacheDisabledByEnvironment = disabled
+			if disabled:
+				# drop values held in memory so none are stale if the cache is turned back on
+				self.cache.clearMemory()
+		if disabled:
+			return False
 
 		return self._useCache
 
 	@useCache.setter
 	def useCache(self, new_value:bool):
 		self._useCache = bool(new_value)
+		if not self._useCache:
+			self.cache.clearMemory()
 
 	def get(self, path:str, params:dict=None, data:dict=None, headers:Dict[str,str]=None) -> Union[Dict,List]:
 		'''
@@ -93,43 +174,65 @@ class SciDDAstroResolver(scidd.core.Resolver):
 		if data is None:
 			data = dict()
 
-		with requests.Session() as http_session:
-			try:
-				response = http_session.get(self.base_url + path, params=params)
-			except requests.exceptions.ConnectionError as e:
-				if "Max retries exceeded" in str(e):
-					raise Exception(f"Unable to reach the API server; is the server down?\n{e}")
-				else:
-					raise e
+		import requests
+		metrics = self.metrics
+		if metrics is not None:
+			metrics.increment("http_requests_total")
+			start = time.perf_counter()
+		try:
+			response = self.transport.get(self.base_url + path, params=params, headers=headers)
+		except CircuitOpenError:
+			if metrics is not None:
+				metrics.increment("http_errors_total", status="circuit_open")
+			raise
+		except requests.exceptions.ConnectionError as e:
+			if metrics is not None:
+				metrics.increment("http_errors_total", status="connection")
+			if "Max retries exceeded" in str(e):
+				raise Exception(f"Unable to reach the API server; is the server down?\n{e}")
+			else:
+				raise e
 
-			logger.debug(f"params={params}")
-			logger.debug(f"API request URL: '{response.url}'")
+		logger.debug(f"params={params}")
+		logger.debug(f"API request URL: '{response.url}'")
 
-			status_code = None
-			try:
-				response.raise_for_status()
-			except requests.HTTPError as e:
-				status_code = e.response.status_code
-				# "Absorb" the exception so the trace doesn't go all the way down
-				# to the requests package, then check for and raise a custom error below.
-				pass
+		if metrics is not None:
+			metrics.observe("http_request_seconds", time.perf_counter() - start)
+			metrics.increment("http_response_bytes_total", len(response.content))
 
-			if status_code is None:
-				# no error occurred
-				pass
-			elif status_code == 500: # "Server Error"
-				# a problem occurred on the server returning the response
-				raise exc.ErrorInAccessingAPI("\n".join([
-					f"An error occurred on the server in accessing the API.",
-					f"Please contact Demitri Muna <demitri.muna@utsa.edu> with this full error message.",
-					f"URL: {response.url}",
-					"Response:",
-					f"{json.dumps(response.json(), indent=4)}"
-				]))
-			else:
-				raise Exception(f"Unhandled HTTP error status code: {status_code}")
+		status_code = None
+		try:
+			response.raise_for_status()
+		except requests.HTTPError as e:
+			status_code = e.response.status_code
+			# "Absorb" the exception so the trace doesn't go all the way down
+			# to the requests package, then check for and raise a custom error below.
+			pass
+
+		if status_code is not None and metrics is not None:
+			metrics.increment("http_errors_total", status=str(status_code))
+
+		if status_code is None:
+			# no error occurred
+			pass
+		elif status_code == 500: # "Server Error"
+			# a problem occurred on the server returning the response
+			raise scidd.core.exc.ErrorInAccessingAPI("\n".join([
+				f"An error occurred on the server in accessing the API.",
+				f"Please contact Demitri Muna <demitri.muna@utsa.edu> with this full error message.",
+				f"URL: {response.url}",
+				"Response:",
+				f"{json.dumps(response.json(), indent=4)}"
+			]))
+		else:
+			raise Exception(f"Unhandled HTTP error status code: {status_code}")
 
+		if metrics is None:
 			return response.json()
+		start = time.perf_counter()
+		results = response.json()
+		metrics.observe("json_decode_seconds", time.perf_counter() - start)
+		return results
 
 	def urlForSciDD(self, sci_dd:scidd.core.SciDD, verify_resource=False) -> str:
 		'''
@@ -154,16 +257,10 @@ class SciDDAstroResolver(scidd.core.Resolver):
 		elif isinstance(sci_dd, SciDDAstroFile):
 			#print(f"dataset = {sci_dd.dataset}")
 			dataset = sci_dd.datasetRelease.split(".")[0]
-			if dataset == "galex":
-				url = GALEXResolver().resolveURLFromSciDD(sci_dd)
-			elif dataset == "wise":
-				url = WISEResolver().resolveURLFromSciDD(sci_dd)
-			elif dataset == "2mass":
-				url = TwoMASSResolver().resolveURLFromSciDD(sci_dd)
-			elif dataset == "sdss":
-				url = SDSSResolver().resolveURLFromSciDD(sci_dd)
+			if self.metrics is None:
+				url = self._datasetResolverFor(dataset).resolveURLFromSciDD(sci_dd)
 			else:
-				raise NotImplementedError(f"The dataset '{sci_dd.dataset}' does not currently have a resolver associated with it.")
+				url = self._timedResolve(dataset, sci_dd)
 		else:
 			raise NotImplementedError(f"Class {type(sci_dd)} not handled in {self.__class__}.")
 
@@ -177,11 +274,163 @@ class SciDDAstroResolver(scidd.core.Resolver):
 		#print(f"url={url}")
 
 		if verify_resource:
-			r = requests.head(url)
-			if r.status_code != requests.codes.ok:
+			status = self.resourceStatus(url)
+			if not status.available:
 				raise scidd.core.exc.ResourceUnavailableWhereResolverExpected("The resolver returned a URL, but the resource was not found at that location.")
+			_apply_resource_status(sci_dd, status)
 		return url
 
+	def _timedResolve(self, dataset:str, sci_dd:scidd.core.SciDD) -> str:
+		'''
+		Resolve a SciDD with the dataset resolver, recording the time taken and the outcome in :py:attr:`metrics`.
+		'''
+		start = time.perf_counter()
+		try:
+			url = self._datasetResolverFor(dataset).resolveURLFromSciDD(sci_dd)
+		except Exception:
+			self.metrics.increment("resolves_total", dataset=dataset, outcome="error")
+			raise
+		finally:
+			self.metrics.observe("resolve_seconds", time.perf_counter() - start, dataset=dataset)
+		self.metrics.increment("resolves_total", dataset=dataset, outcome="ok")
+		return url
+
+	def resourceStatus(self, url:str, refresh:bool=False) -> ResourceStatus:
+		'''
+		Check that a resource is available at the given URL with an HTTP HEAD request.
+
+		Results are cached for ``verify_cache_ttl`` seconds (whether or not the resource was found). While requests to
+		the host are paused by its circuit breaker, an older cached result is returned if there is one.
+
+		:param url: the URL to check
+		:param refresh: ignore a cached result and send a new request
+		'''
+		CACHE_KEY = f"astro:head/{url}"
+
+		cached = None
+		if self.useCache and not refresh:
+			try:
+				cached = ResourceStatus(url=url, **self.cache[CACHE_KEY])
+				if cached.checked + self.verify_cache_ttl > time.time():
+					return cached
+			except (KeyError, TypeError):
+				pass
+
+		try:
+			response = self.transport.head(url)
+		except CircuitOpenError:
+			if cached is None:
+				raise
+			logger.debug(f"the host of '{url}' is unavailable; using the result of a check from {time.time() - cached.checked:.0f} s ago")
+			if self.metrics is not None:
+				self.metrics.increment("stale_answers_total")
+			return cached
+		response.close()
+		content_length = response.headers.get("Content-Length")
+		status = ResourceStatus(url=url,
+								status_code=response.status_code,
+								etag=response.headers.get("ETag"),
+								content_length=int(content_length) if content_length is not None else None,
+								checked=time.time())
+
+		if self.useCache:
+			try:
+				self.cache[CACHE_KEY] = {field:value for field, value in status._asdict().items() if field != "url"} # the key holds the URL
+			except Exception as e:
+				logger.debug(f"Note: exception in trying to save resource status to cache: {e}")
+		return status
+
+	def verifyResources(self, resources:Iterable[Union[str,scidd.core.SciDD]], workers:int=None, refresh:bool=False) -> Dict[Union[str,scidd.core.SciDD],Union[ResourceStatus,Exception]]:
+		'''
+		Check that many resources are available, sending the HTTP HEAD requests concurrently over pooled connections.
+
+		Resources may be given as URLs or as `SciDDAstroFile` objects; URLs of the latter not yet known are
+		resolved in bulk first (see :py:meth:`urlsForSciDDs`). Results are cached as in :py:meth:`resourceStatus`.
+		When the server reports the size of an uncompressed file, it is set on a SciDD whose size is not yet known.
+
+		A failure to check one resource does not fail the others: the value returned for it is the exception.
+
+		:param resources: an iterable of URLs or `SciDDAstroFile` objects
+		:param workers: the number of requests made at the same time; defaults to the size of the connection pool
+		:param refresh: ignore cached results and send new requests
+		:returns: a dictionary mapping each resource (in input order) to its status or to an exception
+		'''
+		resources = list(resources)
+		urls = {resource:resource for resource in resources if isinstance(resource, str)}
+		sci_dds = [resource for resource in resources if not isinstance(resource, str)]
+
+		unresolved = [sci_dd for sci_dd in sci_dds if getattr(sci_dd, "_url", None) is None]
+		urls.update({sci_dd:sci_dd._url for sci_dd in sci_dds if getattr(sci_dd, "_url", None) is not None})
+		if len(unresolved) > 0:
+			urls.update(self.urlsForSciDDs(unresolved))
+
+		def check(resource):
+			url = urls[resource]
+			if isinstance(url, Exception):
+				return url
+			try:
+				status = self.resourceStatus(url, refresh=refresh)
+			except Exception as e:
+				logger.debug(f"checking '{url}' failed: {e}")
+				return e
+			if not isinstance(resource, str):
+				_apply_resource_status(resource, status)
+			return status
+
+		with ThreadPoolExecutor(max_workers=workers or self.transport.pool_size) as executor:
+			return dict(zip(resources, executor.map(check, resources)))
+
+	def urlsForSciDDs(self, sci_dds:Iterable[scidd.core.SciDD], chunk_size:int=None) -> Dict[scidd.core.SciDD,Union[str,Exception]]:
+		'''
+		Resolve many SciDDs into URLs using as few API calls as possible.
+
+		Identifiers are grouped by dataset and release; those found in the cache are not sent to the server,
+		and the rest are sent in bulk queries of up to ``chunk_size`` filenames each. The URL, uncompressed
+		file size, and dataset/release are set on every SciDD object resolved.
+
+		A failure to resolve one identifier does not fail the batch: the value returned for that SciDD is
+		the exception that would have been raised by :py:meth:`urlForSciDD`.
+
+		:param sci_dds: an iterable of `scidd.core.SciDD` objects
+		:param chunk_size: the maximum number of filenames sent to the server in a single query; defaults to the batch size of each dataset
+		:returns: a dictionary mapping each SciDD (in input order) to its URL or to an exception
+		'''
+		from .astro_scidd import SciDDAstroFile # avoid circular import
+
+		sci_dds = list(sci_dds)
+		results = dict()
+		datasets = dict() # key: dataset resolver, value: list of SciDDs
+		for sci_dd in sci_dds:
+			if not isinstance(sci_dd, SciDDAstroFile):
+				results[sci_dd] = NotImplementedError(f"Class {type(sci_dd)} not handled in {self.__class__}.")
+				continue
+			try:
+				dataset_resolver = self._datasetResolverFor(sci_dd.datasetRelease.split(".")[0])
+			except Exception as e:
+				results[sci_dd] = e
+				continue
+			datasets.setdefault(dataset_resolver, list()).append(sci_dd)
+
+		for dataset_resolver, group in datasets.items():
+			results.update(dataset_resolver.resolveURLsFromSciDDs(group, resolver=self, chunk_size=chunk_size))
+
+		return {sci_dd:results[sci_dd] for sci_dd in sci_dds}
+
+	def _datasetResolverFor(self, dataset:str):
+		'''
+		Returns the dataset resolver object that handles the dataset with the given short name (see :py:mod:`scidd.astro.registry`).
+		'''
+		return dataset_registry[dataset]
+
+	def _cachePolicy(self, dataset:str) -> tuple:
+		'''
+		Returns whether to cache filename searches in the given dataset and the lifetime of negative results (``None`` for the default).
+		'''
+		dataset_resolver = dataset_registry.get(dataset) if dataset else None
+		if dataset_resolver is None:
+			return self.useCache, None
+		return self.useCache and dataset_resolver.cacheResults, dataset_resolver.negativeCacheTTL
+
 	def _url_for_astrofile(self, sci_dd) -> str:
 		'''
 		'''
@@ -217,22 +466,43 @@ class SciDDAstroResolver(scidd.core.Resolver):
 		:param filename: the file name
 		:param uniqueid: if filenames are not unique in the dataset, this is an identifier that disambiguates the records for the filename
 		'''
-		if uniqueid:
-			CACHE_KEY = "/".join(["astro:file", str(dataset), str(release), str(filename), str(uniqueid)])
-		else:
-			CACHE_KEY = "/".join(["astro:file", str(dataset), str(release), str(filename)])
+		CACHE_KEY = filename_cache_key(dataset=dataset, release=release, filename=filename, uniqueid=uniqueid)
+		use_cache, negative_ttl = self._cachePolicy(dataset)
 
-		if self.useCache:
+		metrics = self.metrics
+		if use_cache:
 			try:
-				results = json.loads(LocalAPICache.defaultCache()[CACHE_KEY])
+				results = self.cache[CACHE_KEY]
 				logger.debug("API cache hit")
+				if metrics is not None:
+					metrics.increment("cache_lookups_total", result="hit")
 				return results
 			except KeyError:
 				pass
+			if self.cache.isNegative(CACHE_KEY):
+				logger.debug("API negative cache hit")
+				if metrics is not None:
+					metrics.increment("cache_lookups_total", result="negative_hit")
+				return list()
+			if metrics is not None:
+				metrics.increment("cache_lookups_total", result="miss")
+
+		# threads searching for the same key at the same time share a single request (and its errors)
+		results, leader = self._inflight.do(CACHE_KEY, self._filenameSearch, CACHE_KEY, use_cache, negative_ttl,
+											dataset=dataset, release=release, filename=filename, uniqueid=uniqueid)
+		if not leader and metrics is not None:
+			metrics.increment("merged_requests_total")
+		return results
 
-		if ";" in filename:
-			pdb.set_trace()
+	@property
+	def mergedRequests(self) -> int:
+		''' The number of filename searches that were served by an identical search already in flight. '''
+		return self._inflight.merged
 
+	def _filenameSearch(self, cache_key:str, use_cache:bool, negative_ttl:float, dataset:str=None, release:str=None, filename:str=None, uniqueid:str=None) -> List[dict]:
+		'''
+		Call the API filename search and store the results in the cache.
+		'''
 		query_parameters = { "filename" : filename }
 		if dataset:
 			query_parameters["dataset"] = dataset
@@ -243,17 +513,90 @@ class SciDDAstroResolver(scidd.core.Resolver):
 			logger.debug(f"uniqueid={uniqueid}")
 		results = self.get("/astro/data/filename-search", params=query_parameters)
 
-		if self.useCache:
+		if use_cache:
 			try:
-				LocalAPICache.defaultCache()[CACHE_KEY] = json.dumps(results)
+				if len(results) == 0:
+					self.cache.setNegative(cache_key, ttl=negative_ttl)
+				else:
+					self.cache[cache_key] = results
 			except Exception as e:
-				raise e # remove after debugging
+				# a cache that can't be written to shouldn't fail the lookup
 				logger.debug(f"Note: exception in trying to save API response to cache: {e}")
-				pass
 
 		return results
 
+	def bulkFilenameResolver(self, dataset:str=None, release:str=None, filenames:Iterable[str]=None, chunk_size:int=100) -> Dict[str,Union[List[dict],Exception]]:
+		'''
+		This method calls the Trillian API to search for many filenames at once within a dataset and release.
 
+		The results of each filename are cached under the same key :py:meth:`genericFilenameResolver` uses,
+		so the two methods share the cache. Only filenames not found in the cache are sent to the server, in
+		queries of up to ``chunk_size`` filenames. If a query fails, the exception is returned as the value
+		of every filename in that query.
 
+		A filename missing from the response to a query of several filenames is not taken to be absent (the server
+		may have ignored some of the filenames or capped the number of records); it is confirmed with a query of its
+		own (see :py:meth:`genericFilenameResolver`) before a negative result is cached.
 
+		:param dataset: the short name of the dataset
+		:param release: the short name of the release
+		:param filenames: the file names to search for
+		:param chunk_size: the maximum number of filenames sent in a single query
+		:returns: a dictionary mapping each filename to the list of matching records or to an exception
+		'''
+		use_cache, negative_ttl = self._cachePolicy(dataset)
+		results = dict()
+		misses = list()
+		for filename in dict.fromkeys(filenames): # remove duplicates, keep order
+			if use_cache:
+				CACHE_KEY = filename_cache_key(dataset=dataset, release=release, filename=filename)
+				try:
+					results[filename] = self.cache[CACHE_KEY]
+					continue
+				except KeyError:
+					pass
+				if self.cache.isNegative(CACHE_KEY):
+					results[filename] = list()
+					continue
+			misses.append(filename)
+		logger.debug(f"bulk filename search: {len(results)} cached, {len(misses)} to query")
+
+		for idx in range(0, len(misses), chunk_size):
+			chunk = misses[idx:idx+chunk_size]
+			query_parameters = { "filename" : chunk }
+			if dataset:
+				query_parameters["dataset"] = dataset
+			if release:
+				query_parameters["release"] = release
+			try:
+				records = self.get("/astro/data/filename-search", params=query_parameters)
+			except Exception as e:
+				for filename in chunk:
+					results[filename] = e
+				continue
+
+			chunk_results = {filename:list() for filename in chunk}
+			for record in records:
+				filename = _filename_from_record(record)
+				if filename in chunk_results:
+					chunk_results[filename].append(record)
+
+			for filename, filename_records in chunk_results.items():
+				if len(filename_records) == 0 and len(chunk) > 1:
+					try:
+						results[filename] = self.genericFilenameResolver(dataset=dataset, release=release, filename=filename)
+					except Exception as e:
+						results[filename] = e
+					continue
+				results[filename] = filename_records
+				if use_cache:
+					CACHE_KEY = filename_cache_key(dataset=dataset, release=release, filename=filename)
+					try:
+						if len(filename_records) == 0:
+							self.cache.setNegative(CACHE_KEY, ttl=negative_ttl)
+						else:
+							self.cache[CACHE_KEY] = filename_records
+					except Exception as e:
+						logger.debug(f"Note: exception in trying to save API response to cache: {e}")
 
+		return results
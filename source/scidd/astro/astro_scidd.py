@@ -2,9 +2,12 @@
 import io
 import os
 import re
-import pdb
+import sys
+import math
 import json
+import time
 import logging
+import functools
 import pathlib
 from typing import Union, List
 
@@ -13,22 +16,43 @@ import scidd.core.exc
 from scidd.core import LocalAPICache
 from scidd.core.logger import scidd_logger as logger
 from scidd.core import SciDD, SciDDFileResource, Resolver
-import astropy.units as u
-from astropy.coordinates import SkyCoord
 
 from . import SciDDAstroResolver
+from .parser import SciDDAstroParseResult, compression_extensions, parse_astro_scidd
 
 logger = logging.getLogger("scidd.astro")
 
-compression_extensions = [".zip", ".tgz", ".gz", "bz2"]
+def set_parse_cache_size(maxsize:int):
+	'''
+	Set the number of recently parsed identifiers that are remembered; ``0`` turns this off.
+
+	Objects don't keep their parsed identifier (see :py:attr:`SciDDAstro.parsed`), and resolving one reads
+	several of its components in a row, so the last few identifiers parsed are remembered to parse each only once.
+	This only holds parse results and is separate from the resolver cache. The default size is 64, or the
+	value of the ``SCIDD_ASTRO_PARSE_CACHE_SIZE`` environment variable.
+
+	:param maxsize: the number of identifiers remembered
+	'''
+	global _parse_recent
+	if maxsize > 0:
+		_parse_recent = functools.lru_cache(maxsize=int(maxsize))(parse_astro_scidd)
+	else:
+		_parse_recent = parse_astro_scidd
+
+set_parse_cache_size(int(os.environ.get("SCIDD_ASTRO_PARSE_CACHE_SIZE", 64)))
 
 class SciDDAstro(SciDD):
 	'''
 	This class is wrapper around SciDD identifiers in the 'astro' namespace ("scidd:/astro").
 
+	To keep objects small when very many are held in memory, only the (interned) dataset and release are stored;
+	the other components of the identifier are parsed from it again when needed.
+
 	:param scidd: a SciDD identifier or one assumed to have "scidd:/astro" prepended to it
 	:param resolver: an object that can resolve the identifier to a URL; for most cases using the default resolver by passing 'None' is the right choice
 	'''
+	__slots__ = ("_datasetRelease",)
+
 	def __init__(self, sci_dd:str=None, resolver:Resolver=None):
 		if isinstance(sci_dd, SciDD):
 			sci_dd = str(sci_dd)
@@ -47,27 +71,26 @@ class SciDDAstro(SciDD):
 		If the SciDD passed into the constructor can be identified as being handled by a specialized subclass, that subclass is instantiated.
 		'''
 		if cls is SciDDAstro:
-			# note: the walrus operation (3.8+) will be useful here
-
-			# dataset specific classes
-			match = re.search("scidd:/astro/(?P<type>data|file)/2mass/.+", str(sci_dd))
-			if match:
-				if match.group("type") == "data":
-					return super().__new__(scidd.astro.SciDDAstroData)
-				else: # type == "file"
-					#return super().__new__(scidd.astro.dataset.twomass.SciDDAstro2MASSFile)
-					return super().__new__(scidd.astro.SciDDAstroFile)
-
-			# anything else that can be handled by the "generic" classes
-			if str(sci_dd).startswith("scidd:/astro/data/"):
+			# raises a ValueError if not an astro data or file ID
+			parsed = _parse_recent(str(sci_dd))
+
+			# there are currently no dataset specific classes (e.g. 2MASS files are handled by the generic classes)
+			if parsed.type == "data":
 				return super().__new__(scidd.astro.SciDDAstroData)
-			elif str(sci_dd).startswith("scidd:/astro/file/"):
+			else: # type == "file"
 				return super().__new__(scidd.astro.SciDDAstroFile)
-			else:
-				raise ValueError(f"The SciDD was not interpreted as an astro data or file ID: '{sci_dd}'")
 
 		return super().__new__(cls)
 
+	@property
+	def parsed(self) -> SciDDAstroParseResult:
+		'''
+		The components of this identifier (dataset, release, path, filename, extended descriptors, fragment).
+
+		This is not kept with the object; only the most recently used identifiers are remembered (see :py:func:`set_parse_cache_size`).
+		'''
+		return _parse_recent(self.scidd)
+
 	def isValid(self) -> bool:
 		'''
 		Performs (very!) basic validation of the syntax of the identifier.
@@ -85,12 +108,10 @@ class SciDDAstro(SciDD):
 		The short label can be used to get the dataset object, e.g. "galex" -> Dataset.from_short_name("galex")
 		'''
 		if self._datasetRelease is None:
-			match = re.search("^scidd:/astro/(data|file)/([^/]+)/([^/^.]+)", self.scidd)
-			if match:
-				self._datasetRelease = ".".join([match.group(2), match.group(3)])
-		#		match = re.search("^scidd:/astro/(data|file)/([^/]+)", self.scidd)
-		#		if match:
-		#			self._dataset = match.group(2)
+			dataset_release = self.parsed.datasetRelease
+			if dataset_release is not None:
+				# there are only a few distinct values; share one string across all objects
+				self._datasetRelease = sys.intern(dataset_release)
 		return self._datasetRelease
 
 	@property
@@ -98,10 +119,11 @@ class SciDDAstro(SciDD):
 		'''
 		Returns the short label of the dataset indicated in the SciDD.
 		'''
-		# This doesn't feel strongly robust; also maybe should not
-		# name it "dataset" as it doesn't return an object as
-		# it would in Trillian.
-		return self.datasetRelease.split(".")[0]
+		# Maybe should not name it "dataset" as it doesn't return
+		# an object as it would in Trillian.
+		if self._datasetRelease is None:
+			return self.parsed.dataset
+		return self._datasetRelease.split(".")[0]
 
 	# @property
 	# def release(self) -> str:
@@ -118,6 +140,8 @@ class SciDDAstroData(SciDDAstro):
 	'''
 	An identifier pointing to data in the astronomy namespace ("scidd:/astro/data/").
 	'''
+	__slots__ = ()
+
 	def __init__(self, sci_dd:str=None, resolver:Resolver=None):
 		if sci_dd.startswith("scidd:") and not sci_dd.startswith("scidd:/astro/data/"):
 			raise scidd.core.exc.SciDDClassMismatch(f"Attempting to create {self.__class__} object with a SciDD that does not begin with 'scidd:/astro/data/'; try using the 'SciDD(sci_dd)' factory constructor instead.")
@@ -140,27 +164,22 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 	:param sci_dd: the SciDD identifier
 	:param resolver: an object that knows how to translate a SciDD into a URL that points to the specific resource
 	'''
+	__slots__ = ("_ra", "_dec")
 
 	def __init__(self, sci_dd:str=None, resolver:Resolver=None):
 		SciDDAstro.__init__(self, sci_dd=sci_dd, resolver=resolver)
 		SciDDFileResource.__init__(self)
-		self._position = None
-		self._uniqueid_checked = False
+		self._ra = None # representative position in degrees, see `position`
+		self._dec = None
 
-	# @property
-	# def path_within_cache(self):
-	# 	'''
-	# 	The directory path within the top level SciDD cache where the file would be written when downloaded, not including filename.
-	# 	'''
-	# 	if self._cache_path is None:
-	# 		match = re.search("^/astro/file/(.+)#?", str(pathlib.Path(self.path)))
-	# 		if match:
-	# 			path_components = pathlib.Path(match.group(1)).parts[0:-1] # omit last part (filename)
-	# 			self._cache_path = os.path.join("astro", *path_components)
-	# 		else:
-	# 			raise NotImplementedError()
-	# 		logger.debug(f" --> {self._cache_path}")
-	# 	return self._cache_path
+	@property
+	def path_within_cache(self) -> str:
+		'''
+		The directory path within the top level SciDD cache where the file would be written when downloaded, not including filename.
+
+		This is "astro" followed by the path of the identifier without the file name, e.g. ``astro/galex/gr6``.
+		'''
+		return os.path.join("astro", *self.parsed.path[:-1])
 
 	def isFile(self) -> bool:
 		''' Returns 'True' if this identifier points to a file. '''
@@ -196,26 +215,7 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 		# example of SciDD with a filename identifier:
 		# scidd:/astro/file/2mass/allsky/ji0270198.fits;uniqueid=20001017.s.27#1
 
-		if self._uniqueid_checked is False:
-		#if self._filename_unique_identifier is None:
-			match = re.search("^.+;([^#]+)", str(self))
-			if match:
-				extended_file_descriptor = match.group(1)
-				d = dict([x.split("=") for x in extended_file_descriptor.split("?")])
-				if "uniqueid" in d:
-					self._filename_unique_identifier = d["uniqueid"]
-			else:
-				self._filename_unique_identifier = None
-
-			self._uniqueid_checked = True
-
-
-			# match = re.search("^.+;uniqueid=([^#]+)", str(self))
-			# if match:
-			# 	self._filename_unique_identifier = match.group(1)
-			# else:
-			# 	self._filename_unique_identifier = None
-		return self._filename_unique_identifier
+		return self.parsed.uniqueid
 
 	@property
 	def filename(self, without_compressed_extension:bool=True) -> str:
@@ -223,16 +223,10 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 		If this identifier points to a file, return the filename, "None" otherwise.
 		:param without_compressed_extension: if True, removes extensions indicating compression (e.g. ".zip", ".tgz", etc.)
 		'''
-		# The filename should always be the last part of the URI if this is a filename, excluding any fragment.
-		uri = self.scidd.split("#")[0]  # strip fragment identifier (if present)
-		filename = uri.split("/")[-1]   # filename will always be the last element
-		filename = filename.split(";")[0] # remove any unique identifier that might be present at the end of the filename
-
+		# The filename is always the last part of the URI, excluding any fragment and extended descriptors.
 		if without_compressed_extension:
-			fname, ext = os.path.splitext(filename)
-			if ext in compression_extensions:
-				filename = fname
-		return filename
+			return self.parsed.filename
+		return self.parsed.path[-1]
 
 	@property
 	def url(self) -> str:
@@ -246,6 +240,37 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 			self._url = self.resolver.urlForSciDD(self)
 		return self._url
 
+	def openStream(self) -> io.BufferedReader:
+		'''
+		Open the resource as a stream that is decompressed while it downloads, without writing it to the cache.
+
+		See :py:func:`scidd.astro.streaming.open_stream`; close the returned stream when done.
+		'''
+		from .streaming import open_stream
+		return open_stream(self.url)
+
+	@property
+	def uncompressedFilepath(self) -> pathlib.Path:
+		'''
+		The path of an uncompressed copy of the cached file, downloading and decompressing it only once.
+
+		Compressed files in the cache are decompressed once into a sidecar file next to them (see
+		:py:func:`scidd.astro.streaming.uncompressed_path`) that can be memory mapped; for uncompressed
+		files this is the cached file itself.
+		'''
+		from .streaming import uncompressed_path
+		return uncompressed_path(self.filepath)
+
+	def openFITS(self, memmap:bool=True, **kwargs):
+		'''
+		Open the file with ``astropy.io.fits``, memory mapping the uncompressed data instead of reading the whole file into memory.
+
+		:param memmap: passed to ``astropy.io.fits.open``
+		:param kwargs: additional arguments passed to ``astropy.io.fits.open``
+		'''
+		from astropy.io import fits
+		return fits.open(self.uncompressedFilepath, memmap=memmap, **kwargs)
+
 	@classmethod
 	def fromFilename(cls, filename:str, allow_multiple_results=False) -> Union[SciDD,List[SciDD]]:
 		'''
@@ -255,45 +280,22 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 		:param domain: the top level domain of the resource, e.g. `astro`
 		:param allow_multiple_results: when True will raise an exception if the filename is not unique; if False will always return an array of matching SciDDs.
 		'''
-		CACHE_KEY = f"astro/filename:{filename}"
-
-		try:
-			use_cache = os.environ["SCIDD_USE_CACHE"].lower() not in ["0", "false", "f"]
-		except KeyError:
-			use_cache = True
-
-		list_of_results = None
-		if use_cache:
-			try:
-				# fetch from cache
-				list_of_results = json.loads(LocalAPICache.defaultCache()[CACHE_KEY])
-				logger.debug("API cache hit")
-			except KeyError:
-				pass
-
-		if list_of_results is None:
-			# Use the generic filename resolver which assumes the filename is unique across all curated data.
-			# If this is not the case, override this method in a subclass (e.g. see the twomass.py file).
-			list_of_results = SciDDAstroResolver.defaultResolver().genericFilenameResolver(filename=filename)
-
-			if use_cache:
-				# save to cache
-				try:
-					LocalAPICache.defaultCache()[CACHE_KEY] = json.dumps(list_of_results)
-				except Exception as e:
-					raise e # remove after debugging
-					logger.debug(f"Note: exception in trying to save API response to cache: {e}")
-					pass
+		# Use the generic filename resolver which assumes the filename is unique across all curated data.
+		# If this is not the case, override this method in a subclass (e.g. see the twomass.py file).
+		# The resolver caches the search (and finds it under the key earlier versions used here).
+		list_of_results = SciDDAstroResolver.defaultResolver().genericFilenameResolver(filename=filename)
 
 		logger.debug(f"list_of_results={list_of_results}")
 
 		if allow_multiple_results:
+			sci_dds = list()
 			for record in list_of_results:
-				s = SciDD(rec["scidd"])
-				s.url = rec["url"] # since we have it here anyway
-				s._uncompressed_file_size = rec["file_size"]
-				s._datasetRelease = ".".join([rec["dataset"], rec["release"]]) # note there isn't a public interface for this
-			return [SciDD(rec["scidd"]) for rec in list_of_results]
+				s = SciDD(record["scidd"])
+				s._url = record["url"] # since we have it here anyway
+				s._uncompressed_file_size = record["file_size"]
+				s._datasetRelease = ".".join([record["dataset"], record["release"]]) # note there isn't a public interface for this
+				sci_dds.append(s)
+			return sci_dds
 		else:
 			if len(list_of_results) == 1:
 				return SciDD(list_of_results[0]["scidd"])
@@ -304,7 +306,7 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 				# TODO: create API call to list currently implemented datasets
 
 	@property
-	def position(self) -> SkyCoord:
+	def position(self) -> "astropy.coordinates.SkyCoord":
 		'''
 		Returns a representative sky position for this file; this value should not be used for science.
 
@@ -315,7 +317,10 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 		of caching), but it is not intended to be exhaustive. Use traditional methods to get positions for analysis.
 		Whenever possible (but not guaranteed), the value returned is in J2000 IRCS.
 		'''
-		if self._position is None:
+		metrics = getattr(self.resolver, "metrics", None)
+		if self._ra is None:
+			if metrics is not None:
+				start = time.perf_counter()
 			# note that the API automatically discards file compression extensions
 			parameters = {
 				"filename" : self.filename,
@@ -334,7 +339,7 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 
 			logger.debug(f"parameters={parameters}")
 
-			records = scidd.core.API().get(path="/astro/data/filename-search", params=parameters)
+			records = self.resolver.get("/astro/data/filename-search", params=parameters)
 
 			logger.debug(f"filename-search records: {json.dumps(records, indent=4)}")
 			if not len(records) == 1:
@@ -349,10 +354,13 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 			# This is an example of a file that returns NULL for the representative position:
 			# AIS_316_0001_sg65-nd-intbgsub.fits.gz
 			#
+			# (The bulk `scidd.astro.positions` function masks these instead.)
 			if pos is None:
-				pos = [0,0]
+				pos = [math.nan, math.nan]
 
-			self._position = SkyCoord(ra=pos[0]*u.deg, dec=pos[1]*u.deg)
+			# keep plain floats; the SkyCoord object is many times larger
+			self._ra = float(pos[0])
+			self._dec = float(pos[1])
 
 			# while we have the info...
 			if self._url is None:
@@ -361,4 +369,18 @@ class SciDDAstroFile(SciDDAstro, SciDDFileResource):
 					# value is null if not available
 					self._uncompressed_file_size = records[0]["file_size"]
 
-		return self._position
+			if metrics is not None:
+				metrics.increment("position_lookups_total", source="api")
+				metrics.observe("position_seconds", time.perf_counter() - start)
+		elif metrics is not None:
+			metrics.increment("position_lookups_total", source="memory")
+
+		# astropy is slow to import and only needed here
+		import astropy.units as u
+		from astropy.coordinates import SkyCoord
+
+		# the SkyCoord object is many times larger than the two floats, so it isn't kept
+		if math.isnan(self._ra):
+			# no position could be determined (see above)
+			return SkyCoord(ra=0*u.deg, dec=0*u.deg)
+		return SkyCoord(ra=self._ra*u.deg, dec=self._dec*u.deg)
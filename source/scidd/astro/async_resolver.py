@@ -0,0 +1,270 @@
+
+import json
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Union
+
+import scidd.core
+import scidd.core.exc
+
+from .astro_resolver import SciDDAstroResolver, filename_cache_key
+from .throttle import CircuitOpenError
+
+logger = logging.getLogger("scidd.astro")
+
+class AsyncSciDDAstroResolver:
+	'''
+	An asyncio counterpart of :py:class:`SciDDAstroResolver` for use in applications running an event loop.
+
+	The methods :py:meth:`get`, :py:meth:`genericFilenameResolver`, and :py:meth:`urlForSciDD` mirror
+	those of the synchronous resolver as coroutines. No more than ``max_concurrency`` requests are in flight
+	at once, and concurrent filename searches for the same cache key are merged into a single request.
+	Results are cached under the same keys as the synchronous resolver so both populate (and use) the same cache.
+	Only the in-memory tier of the cache is read on the event loop; the persistent tier (files or databases) is
+	read and written on the loop's default executor. Requests go through the circuit breaker and rate limiter of
+	the resolver's transport and are counted in its metrics, like those of the synchronous resolver.
+
+	This class requires the ``aiohttp`` package (``pip install scidd_astro[async]``).
+
+	:param resolver: the synchronous resolver to take the service location and cache settings from; defaults to :py:meth:`SciDDAstroResolver.defaultResolver`
+	:param max_concurrency: the maximum number of requests in flight at once
+	:param timeout: the total timeout of a single request in seconds
+	'''
+	def __init__(self, resolver:SciDDAstroResolver=None, max_concurrency:int=10, timeout:float=30.0):
+		if resolver is None:
+			resolver = SciDDAstroResolver.defaultResolver()
+		self.resolver = resolver
+		self.max_concurrency = int(max_concurrency)
+		self.timeout = timeout
+
+		self._session = None
+		self._semaphore = None # created in the event loop on first use
+		self._inflight = dict() # key: cache key, value: task
+
+	async def __aenter__(self):
+		return self
+
+	async def __aexit__(self, exc_type, exc_value, traceback):
+		await self.close()
+
+	@property
+	def useCache(self) -> bool:
+		return self.resolver.useCache
+
+	async def _getSession(self):
+		'''
+		Returns the shared ``aiohttp`` session, creating it on first use.
+		'''
+		if self._session is None or self._session.closed:
+			try:
+				import aiohttp
+			except ImportError:
+				raise ImportError("The 'aiohttp' package is required to use AsyncSciDDAstroResolver.")
+			connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+			self._session = aiohttp.ClientSession(connector=connector,
+												  timeout=aiohttp.ClientTimeout(total=self.timeout))
+			self._semaphore = asyncio.Semaphore(self.max_concurrency)
+		return self._session
+
+	async def close(self):
+		'''
+		Close the pooled connections.
+		'''
+		if self._session is not None:
+			await self._session.close()
+			self._session = None
+
+	async def get(self, path:str, params:dict=None, headers:Dict[str,str]=None) -> Union[Dict,List]:
+		'''
+		Make a GET call on the Trillian API with the given path and parameters.
+
+		:param path: the path of the API to call
+		:param params: a dictionary of the parameters to pass to the API
+		:param headers: any additional headers to pass to the API
+		:returns: JSON response
+		'''
+		session = await self._getSession()
+		import aiohttp
+		if params is None:
+			params = dict()
+
+		# requests go through the circuit breaker and rate limiter of the synchronous resolver's transport
+		url = self.resolver.base_url + path
+		transport = self.resolver.transport
+		breaker = transport.circuitBreaker(url)
+		bucket = transport.rateLimiter(url)
+		metrics = self.resolver.metrics
+		if metrics is not None:
+			metrics.increment("http_requests_total")
+		try:
+			probe = breaker.check() if breaker is not None else False # fail fast while the host is down
+		except CircuitOpenError:
+			if metrics is not None:
+				metrics.increment("http_errors_total", status="circuit_open")
+			raise
+
+		try:
+			async with self._semaphore:
+				if bucket is not None:
+					wait = bucket.tryAcquire()
+					while wait > 0:
+						await asyncio.sleep(wait)
+						wait = bucket.tryAcquire()
+				start = time.perf_counter()
+				try:
+					async with session.get(url, params=params, headers=headers) as response:
+						body = await response.read()
+				except (aiohttp.ClientError, asyncio.TimeoutError):
+					if breaker is not None:
+						breaker.recordFailure()
+					if metrics is not None:
+						metrics.increment("http_errors_total", status="connection")
+					raise
+				transport._recordStatus(breaker, bucket, response.status, response.headers.get("Retry-After"))
+		finally:
+			if probe:
+				breaker.releaseProbe()
+
+		logger.debug(f"API request URL: '{response.url}'")
+		if metrics is not None:
+			metrics.observe("http_request_seconds", time.perf_counter() - start)
+			metrics.increment("http_response_bytes_total", len(body))
+			if response.status >= 400:
+				metrics.increment("http_errors_total", status=str(response.status))
+
+		if response.status == 500: # "Server Error"
+			raise scidd.core.exc.ErrorInAccessingAPI("\n".join([
+				f"An error occurred on the server in accessing the API.",
+				f"Please contact Demitri Muna <demitri.muna@utsa.edu> with this full error message.",
+				f"URL: {response.url}",
+				"Response:",
+				f"{body.decode('utf-8', errors='replace')}"
+			]))
+		elif response.status >= 400:
+			raise Exception(f"Unhandled HTTP error status code: {response.status}")
+
+		if metrics is None:
+			return json.loads(body)
+		start = time.perf_counter()
+		results = json.loads(body)
+		metrics.observe("json_decode_seconds", time.perf_counter() - start)
+		return results
+
+	async def genericFilenameResolver(self, dataset:str=None, release:str=None, filename:str=None, uniqueid:str=None) -> List[dict]:
+		'''
+		This method calls the Trillian API to search for a given filename; dataset and release names are optional.
+
+		:param dataset: the short name of the dataset
+		:param release: the short name of the release
+		:param filename: the file name
+		:param uniqueid: if filenames are not unique in the dataset, this is an identifier that disambiguates the records for the filename
+		'''
+		CACHE_KEY = filename_cache_key(dataset=dataset, release=release, filename=filename, uniqueid=uniqueid)
+		use_cache, _ = self.resolver._cachePolicy(dataset)
+
+		if use_cache:
+			# the memory tier doesn't block, so it's checked here; the persistent tier is read in the shared task
+			cache = self.resolver.cache
+			try:
+				results = cache.memory[CACHE_KEY]
+				logger.debug("API cache hit")
+				return results
+			except KeyError:
+				pass
+			try:
+				if cache.negative_memory[CACHE_KEY] >= time.time():
+					logger.debug("API negative cache hit")
+					return list()
+			except KeyError:
+				pass
+
+		task = self._inflight.get(CACHE_KEY)
+		if task is None:
+			task = asyncio.ensure_future(self._filenameSearch(CACHE_KEY, dataset, release, filename, uniqueid))
+			self._inflight[CACHE_KEY] = task
+			task.add_done_callback(lambda _: self._inflight.pop(CACHE_KEY, None))
+		else:
+			logger.debug(f"merged with in-flight request for '{CACHE_KEY}'")
+
+		# shield the shared request so that one cancelled caller doesn't cancel it for the others
+		return list(await asyncio.shield(task))
+
+	async def _inThread(self, function, *args):
+		'''
+		Call a blocking function (e.g. one that reads or writes the persistent cache tier) on a thread so the event loop isn't held up.
+		'''
+		return await asyncio.get_running_loop().run_in_executor(None, function, *args)
+
+	async def _filenameSearch(self, cache_key:str, dataset:str, release:str, filename:str, uniqueid:str) -> List[dict]:
+		use_cache, negative_ttl = self.resolver._cachePolicy(dataset)
+		if use_cache:
+			results = await self._inThread(self._cachedResults, cache_key)
+			if results is not None:
+				return results
+
+		query_parameters = { "filename" : filename }
+		if dataset:
+			query_parameters["dataset"] = dataset
+		if release:
+			query_parameters["release"] = release
+		if uniqueid:
+			query_parameters["uniqueid"] = uniqueid
+		results = await self.get("/astro/data/filename-search", params=query_parameters)
+
+		if use_cache:
+			await self._inThread(self._cacheResults, cache_key, results, negative_ttl)
+		return results
+
+	def _cachedResults(self, cache_key:str) -> Optional[List[dict]]:
+		'''
+		Returns the cached results of a filename search (an empty list if it is known to find nothing), or 'None'.
+		'''
+		cache = self.resolver.cache
+		try:
+			results = cache[cache_key]
+			logger.debug("API cache hit")
+			return results
+		except KeyError:
+			pass
+		if cache.isNegative(cache_key):
+			logger.debug("API negative cache hit")
+			return list()
+		return None
+
+	def _cacheResults(self, cache_key:str, results:List[dict], negative_ttl:float):
+		try:
+			if len(results) == 0:
+				self.resolver.cache.setNegative(cache_key, ttl=negative_ttl)
+			else:
+				self.resolver.cache[cache_key] = results
+		except Exception as e:
+			logger.debug(f"Note: exception in trying to save API response to cache: {e}")
+
+	async def urlForSciDD(self, sci_dd:scidd.core.SciDD, verify_resource=False) -> str:
+		'''
+		This method resolves a SciDD into a URL that can be used to retrieve the resource.
+
+		:param sci_dd: a `scidd.core.SciDD` object
+		:param verify_resource: verify that the resource exists at the location returned, raises `scidd.core.exc.ResourceUnavailableWhereResolverExpected` exception if not found
+		'''
+		from .astro_scidd import SciDDAstroFile # avoid circular import
+
+		if not isinstance(sci_dd, SciDDAstroFile):
+			raise NotImplementedError(f"Class {type(sci_dd)} not handled in {self.__class__}.")
+
+		dataset_resolver = self.resolver._datasetResolverFor(sci_dd.datasetRelease.split(".")[0])
+		dataset, release = dataset_resolver._datasetAndRelease(sci_dd)
+		records = await self.genericFilenameResolver(dataset=dataset,
+													 release=release,
+													 filename=sci_dd.filename,
+													 uniqueid=sci_dd.filenameUniqueIdentifier)
+		url = dataset_resolver._urlFromRecords(sci_dd, records)
+
+		if verify_resource:
+			session = await self._getSession()
+			async with self._semaphore:
+				async with session.head(url, allow_redirects=True) as response:
+					if response.status != 200:
+						raise scidd.core.exc.ResourceUnavailableWhereResolverExpected("The resolver returned a URL, but the resource was not found at that location.")
+		return url
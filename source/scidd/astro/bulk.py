@@ -0,0 +1,354 @@
+'''
+Resolve very large manifests of SciDDs or filenames with a pool of worker processes, or unbounded streams of them.
+
+	python -m scidd.astro.bulk manifest.txt results.jsonl [--workers 8] [--cache-dir DIR | --temporary-cache]
+
+(also installed as the ``scidd-astro-resolve`` command)
+'''
+
+import os
+import sys
+import json
+import time
+import queue
+import pathlib
+import logging
+import argparse
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from typing import Any, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from .manifest import manifest_lookup, read_manifest
+
+logger = logging.getLogger("scidd.astro")
+
+class ManifestSummary(NamedTuple):
+	'''
+	The outcome of :py:func:`resolve_manifest`.
+	'''
+	total: int # entries read from the manifest
+	resolved: int # entries with at least one record
+	not_found: int # entries with no records
+	failed: int # entries whose lookup failed
+	elapsed: float # seconds
+
+	@property
+	def throughput(self) -> float:
+		''' Entries resolved per second. '''
+		return self.total / self.elapsed if self.elapsed > 0 else 0.0
+
+	def __str__(self) -> str:
+		return (f"{self.total} entries in {self.elapsed:.1f} s ({self.throughput:,.1f}/s): "
+				f"{self.resolved} resolved, {self.not_found} not found, {self.failed} failed")
+
+# the resolver of a worker process, created once by _start_worker
+_worker_resolver = None
+
+def _start_worker(resolver_options:dict, cache_dir:str):
+	global _worker_resolver
+	from .astro_resolver import SciDDAstroResolver
+	# a resolver of its own (not the default one, which may have been inherited from the parent process on fork)
+	options = dict(resolver_options or SciDDAstroResolver._defaultOptions(), persistent_cache=cache_dir)
+	_worker_resolver = SciDDAstroResolver(**options)
+
+def _resolve_entries(resolver, entries:List[str], chunk_size:int=None) -> List[Union[List[dict],Exception]]:
+	'''
+	Look up manifest entries, querying the API in bulk where possible.
+
+	Entries are grouped by dataset and release and looked up with :py:meth:`SciDDAstroResolver.bulkFilenameResolver`.
+	Identifiers with a unique id, and bare filenames with a compression extension, are looked up one at a time
+	with :py:meth:`SciDDAstroResolver.genericFilenameResolver` as bulk results are matched by filename.
+
+	:param chunk_size: the maximum number of filenames per query; defaults to the batch size of each dataset
+	:returns: the records found for each entry (in order), or the exception raised looking it up
+	'''
+	from .parser import compression_extensions
+	from .registry import dataset_registry
+
+	results = [None] * len(entries)
+	groups = dict() # key: (dataset, release), value: list of (index, filename)
+
+	for index, entry in enumerate(entries):
+		try:
+			dataset, release, filename, uniqueid = manifest_lookup(entry)
+			if uniqueid or (dataset is None and any(filename.endswith(ext) for ext in compression_extensions)):
+				results[index] = resolver.genericFilenameResolver(dataset=dataset, release=release, filename=filename, uniqueid=uniqueid)
+			else:
+				groups.setdefault((dataset, release), list()).append((index, filename))
+		except Exception as e:
+			results[index] = e
+
+	for (dataset, release), items in groups.items():
+		batch_size = chunk_size or getattr(dataset_registry.get(dataset) if dataset else None, "batchSize", 100)
+		found = resolver.bulkFilenameResolver(dataset=dataset, release=release, filenames=[filename for _, filename in items], chunk_size=batch_size)
+		for index, filename in items:
+			results[index] = found.get(filename, list())
+	return results
+
+def _resolve_chunk(entries:List[str]) -> Tuple[str,int,int,int]:
+	'''
+	Resolve a chunk of manifest entries in a worker process.
+
+	Only the output text and the counts are sent back to the parent process; no SciDD (or astropy)
+	objects are created.
+
+	:returns: the output lines of the entries (in order), and the numbers of entries resolved, not found and failed
+	'''
+	lines = list()
+	resolved = not_found = failed = 0
+	for entry, result in zip(entries, _resolve_entries(_worker_resolver, entries)):
+		if isinstance(result, Exception):
+			failed += 1
+			lines.append(json.dumps({"entry" : entry, "error" : f"{result.__class__.__name__}: {result}"}))
+		else:
+			if len(result) > 0:
+				resolved += 1
+			else:
+				not_found += 1
+			lines.append(json.dumps({"entry" : entry, "records" : result}))
+	lines.append("")
+	return "\n".join(lines), resolved, not_found, failed
+
+def _default_cache_dir() -> pathlib.Path:
+	'''
+	Returns the directory of the persistent cache shared by the workers when none is given: the directory in the
+	``SCIDD_ASTRO_CACHE_DIR`` environment variable (as used by :py:class:`SciDDAstroResolver`), else a directory
+	in the SciDD cache.
+	'''
+	if os.environ.get("SCIDD_ASTRO_CACHE_DIR"):
+		return pathlib.Path(os.environ["SCIDD_ASTRO_CACHE_DIR"])
+	from scidd.core import SciDDCacheManager
+	return pathlib.Path(SciDDCacheManager().path) / "astro" / "resolver"
+
+def _chunks(entries:Iterable[str], chunk_size:int) -> Iterable[List[str]]:
+	chunk = list()
+	for entry in entries:
+		chunk.append(entry)
+		if len(chunk) == chunk_size:
+			yield chunk
+			chunk = list()
+	if chunk:
+		yield chunk
+
+def resolve_manifest(manifest:Union[str,pathlib.Path,Iterable[str]], output:Union[str,pathlib.Path], workers:int=None, chunk_size:int=500,
+					 column:str=None, cache_dir:Union[str,pathlib.Path]=None, temporary_cache:bool=False,
+					 resolver_options:dict=None) -> ManifestSummary:
+	'''
+	Resolve every entry of a manifest with a pool of worker processes, writing the results to a file in input order.
+
+	Entries may be SciDDs or bare filenames. Chunks of ``chunk_size`` entries are sent to the workers, each of
+	which has its own resolver and queries the API in bulk (see :py:meth:`SciDDAstroResolver.bulkFilenameResolver`).
+	The output is JSON Lines with one line per entry in the order of the manifest: ``{"entry": ..., "records": [...]}``,
+	or ``{"entry": ..., "error": "..."}`` if the lookup failed. At most ``2 * workers`` chunks are in flight
+	at a time, so memory use doesn't grow with the size of the manifest.
+
+	Workers share a persistent :py:class:`scidd.astro.sqlite_cache.ShardedSQLiteCache`, which is safe for many
+	processes to write to, in ``cache_dir``. This defaults to the directory in the ``SCIDD_ASTRO_CACHE_DIR`` environment
+	variable, else ``astro/resolver`` in the SciDD cache, so that results are kept for later runs. With ``temporary_cache``,
+	a temporary directory is used instead and deleted at the end of the run.
+
+	:param manifest: a manifest file (see :py:func:`scidd.astro.manifest.read_manifest`) or an iterable of entries
+	:param output: the file the results are written to
+	:param workers: the number of worker processes; defaults to the number of CPUs
+	:param chunk_size: the number of entries sent to a worker at a time
+	:param column: the column of a CSV or Parquet manifest holding the entries
+	:param cache_dir: the directory of the persistent cache shared by the workers
+	:param temporary_cache: if True, the workers share a cache that is deleted at the end of the run (``cache_dir`` must not be given)
+	:param resolver_options: keyword arguments used to create the resolver of each worker (e.g. ``host``, ``port``,
+							 ``memory_cache_size``); if not given, the workers use the settings of
+							 :py:meth:`SciDDAstroResolver.defaultResolver`
+	'''
+	workers = workers or os.cpu_count() or 1
+	if isinstance(manifest, (str, pathlib.Path)):
+		manifest = read_manifest(manifest, column=column)
+
+	temporary_dir = None
+	if temporary_cache:
+		if cache_dir is not None:
+			raise ValueError("'cache_dir' and 'temporary_cache' can't both be given")
+		# the workers still need a shared cache, or each would only see its own results
+		temporary_dir = tempfile.TemporaryDirectory(prefix="scidd-astro-cache-")
+		cache_dir = temporary_dir.name
+		logger.info(f"using the temporary cache directory '{cache_dir}' for this run")
+	elif cache_dir is None:
+		cache_dir = _default_cache_dir()
+		logger.info(f"using the cache directory '{cache_dir}'")
+
+	start = time.monotonic()
+	total = resolved = not_found = failed = 0
+	try:
+		with open(output, "w", encoding="utf-8") as f, \
+			 ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(resolver_options, str(cache_dir))) as executor:
+			pending = deque() # in input order
+
+			def write_oldest():
+				nonlocal resolved, not_found, failed
+				text, chunk_resolved, chunk_not_found, chunk_failed = pending.popleft().result()
+				f.write(text)
+				resolved += chunk_resolved
+				not_found += chunk_not_found
+				failed += chunk_failed
+
+			for chunk in _chunks(manifest, chunk_size):
+				total += len(chunk)
+				if len(pending) >= 2 * workers:
+					write_oldest()
+				pending.append(executor.submit(_resolve_chunk, chunk))
+			while pending:
+				write_oldest()
+	finally:
+		if temporary_dir is not None:
+			temporary_dir.cleanup()
+
+	summary = ManifestSummary(total=total, resolved=resolved, not_found=not_found, failed=failed, elapsed=time.monotonic() - start)
+	logger.info(str(summary))
+	return summary
+
+def iter_resolve(entries:Iterable, resolver:"SciDDAstroResolver"=None, lookahead:int=1000, chunk_size:int=100,
+				 workers:int=4, ordered:bool=True, flush_after:float=1.0) -> Iterator[Tuple[Any,Union[List[dict],Exception]]]:
+	'''
+	Resolve a stream of SciDDs or filenames, yielding the results as they become available.
+
+	Entries are read from the iterable (which may be unbounded) on a background thread and grouped in chunks of
+	``chunk_size``; each chunk is looked up in bulk on one of ``workers`` threads. A chunk is sent once it is full,
+	or once its first entry has waited ``flush_after`` seconds, and resolved chunks are yielded as soon as they are
+	ready, so results keep coming while the source has nothing new. No more than ``lookahead`` entries are read
+	ahead of the results consumed: once that many are waiting, no more are read until the caller takes the next
+	result. Memory use therefore doesn't depend on the length of the stream.
+
+	Each result is an ``(entry, records)`` tuple where ``records`` is the list of filename search records found
+	(empty if none), or the exception raised if the lookup failed; errors don't stop the stream. An exception
+	raised by the iterable itself is raised once the entries read before it have been yielded.
+
+	:param entries: an iterable of SciDD strings or objects, or bare filenames
+	:param resolver: the resolver to use; defaults to :py:meth:`SciDDAstroResolver.defaultResolver`
+	:param lookahead: the maximum number of entries read but not yet yielded
+	:param chunk_size: the number of entries looked up together
+	:param workers: the number of chunks looked up at the same time
+	:param ordered: if True, results are yielded in input order; if False, each chunk is yielded as soon as it is resolved
+	:param flush_after: the number of seconds an entry waits for its chunk to fill before the chunk is sent anyway
+	'''
+	from .astro_resolver import SciDDAstroResolver
+	if resolver is None:
+		resolver = SciDDAstroResolver.defaultResolver()
+	chunk_size = max(1, min(chunk_size, lookahead))
+
+	def resolve(chunk:list) -> list:
+		return list(zip(chunk, _resolve_entries(resolver, [entry if isinstance(entry, str) else str(entry) for entry in chunk])))
+
+	# the reader thread and the lookups post to 'events': an entry, _RESOLVED when a chunk is done, or _End at the end of the source
+	events = queue.Queue()
+	slots = threading.Semaphore(lookahead) # one per entry read but not yet yielded
+	stop = threading.Event()
+
+	def read():
+		try:
+			iterator = iter(entries)
+			while True:
+				while not slots.acquire(timeout=0.1):
+					if stop.is_set():
+						return
+				if stop.is_set():
+					return
+				try:
+					entry = next(iterator)
+				except StopIteration:
+					break
+				events.put(entry)
+		except Exception as e:
+			events.put(_End(e))
+			return
+		events.put(_End(None))
+
+	executor = ThreadPoolExecutor(max_workers=workers)
+	pending = deque() # of futures of the chunks sent, in input order
+
+	def ready() -> bool:
+		''' Returns 'True' if the next chunk to yield has been resolved. '''
+		if ordered:
+			return pending[0].done()
+		return any(future.done() for future in pending)
+
+	def take() -> Iterator:
+		''' Removes the next chunk to yield from 'pending', waiting for it if needed, and yields its results. '''
+		if ordered:
+			future = pending.popleft()
+		else:
+			done, _ = wait(pending, return_when=FIRST_COMPLETED)
+			future = next(future for future in pending if future in done)
+			pending.remove(future)
+		for result in future.result():
+			slots.release()
+			yield result
+
+	def send(chunk:list):
+		future = executor.submit(resolve, chunk)
+		future.add_done_callback(lambda _: events.put(_RESOLVED))
+		pending.append(future)
+
+	reader = threading.Thread(target=read, name="scidd-iter-resolve", daemon=True)
+	reader.start()
+	try:
+		chunk = list()
+		chunk_deadline = None
+		while True:
+			# pass on whatever has already been resolved
+			while pending and ready():
+				yield from take()
+			try:
+				event = events.get(timeout=None if not chunk else max(0.0, chunk_deadline - time.monotonic()))
+			except queue.Empty:
+				# the source is idle (or blocked by the lookahead); send what has been read
+				send(chunk)
+				chunk = list()
+				continue
+			if event is _RESOLVED:
+				continue
+			if isinstance(event, _End):
+				break
+			if not chunk:
+				chunk_deadline = time.monotonic() + flush_after
+			chunk.append(event)
+			if len(chunk) == chunk_size:
+				send(chunk)
+				chunk = list()
+
+		if chunk:
+			send(chunk)
+		while pending:
+			yield from take()
+		if event.error is not None:
+			raise event.error
+	finally:
+		# the caller may stop early; don't read or resolve what is left
+		stop.set()
+		for future in pending:
+			future.cancel()
+		executor.shutdown(wait=False)
+
+_RESOLVED = object()
+
+class _End(NamedTuple):
+	''' Posted by the reader thread of :py:func:`iter_resolve` when the source is exhausted or raised. '''
+	error: Exception
+
+def main(argv:List[str]=None):
+	parser = argparse.ArgumentParser(description="Resolve a manifest of SciDDs or filenames with a pool of worker processes.")
+	parser.add_argument("manifest", type=pathlib.Path, help="a text (one entry per line), CSV or Parquet file")
+	parser.add_argument("output", type=pathlib.Path, help="the JSON Lines file the results are written to")
+	parser.add_argument("--column", help="the column of a CSV or Parquet file holding the entries")
+	parser.add_argument("--workers", type=int, default=None, help="the number of worker processes (default: the number of CPUs)")
+	parser.add_argument("--chunk-size", type=int, default=500, help="the number of entries sent to a worker at a time")
+	parser.add_argument("--cache-dir", type=pathlib.Path, default=None, help="a sharded cache directory shared by the workers (default: $SCIDD_ASTRO_CACHE_DIR, else astro/resolver in the SciDD cache)")
+	parser.add_argument("--temporary-cache", action="store_true", help="share a cache that is deleted at the end of the run")
+	args = parser.parse_args(argv)
+
+	summary = resolve_manifest(args.manifest, args.output, workers=args.workers, chunk_size=args.chunk_size,
+							   column=args.column, cache_dir=args.cache_dir, temporary_cache=args.temporary_cache)
+	print(summary)
+	return 1 if summary.failed > 0 else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,408 @@
+
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, List, MutableMapping
+
+from .codec import decode_records, encode_records, is_encoded
+
+logger = logging.getLogger("scidd.astro")
+
+def filename_cache_key(dataset:str=None, release:str=None, filename:str=None, uniqueid:str=None) -> str:
+	'''
+	Returns the key under which the results of a filename search are stored in the API cache.
+	'''
+	if uniqueid:
+		return "/".join(["astro:file", str(dataset), str(release), str(filename), str(uniqueid)])
+	else:
+		return "/".join(["astro:file", str(dataset), str(release), str(filename)])
+
+_ANY_DATASET_PREFIX = filename_cache_key(filename="") # a search for a filename in any dataset
+_LEGACY_FILENAME_PREFIX = "astro/filename:" # where SciDDAstroFile.fromFilename stored a copy of the same search
+
+def legacy_cache_keys(key:str) -> List[str]:
+	'''
+	Returns the keys under which earlier versions also stored the value stored under the given key.
+	'''
+	if key.startswith(_ANY_DATASET_PREFIX):
+		return [_LEGACY_FILENAME_PREFIX + key[len(_ANY_DATASET_PREFIX):]]
+	return []
+
+def canonical_cache_key(key:str) -> str:
+	'''
+	Returns the key a value is stored under now, given a key used by earlier versions (other keys are returned as they are).
+	'''
+	if key.startswith(_LEGACY_FILENAME_PREFIX):
+		return filename_cache_key(filename=key[len(_LEGACY_FILENAME_PREFIX):])
+	return key
+
+_MISSING = object()
+
+class MemoryCache:
+	'''
+	A bounded, thread-safe, in-process LRU cache whose entries expire after a fixed time.
+
+	:param maxsize: the maximum number of entries; the least recently used entry is evicted when full
+	:param ttl: the number of seconds an entry is valid for, or ``None`` to never expire entries
+	'''
+	def __init__(self, maxsize:int=10000, ttl:float=3600):
+		self.maxsize = int(maxsize)
+		self.ttl = ttl
+		self._entries = OrderedDict() # key: cache key, value: (expiration time, value)
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self.expirations = 0
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def __contains__(self, key:str) -> bool:
+		return self.peek(key, _MISSING) is not _MISSING
+
+	def peek(self, key:str, default=None) -> Any:
+		'''
+		Returns the value of an unexpired entry, or 'default', without counting a hit or miss or marking the entry as used.
+		'''
+		with self._lock:
+			entry = self._entries.get(key)
+		if entry is None or (entry[0] is not None and entry[0] < time.monotonic()):
+			return default
+		return entry[1]
+
+	def __getitem__(self, key:str) -> Any:
+		with self._lock:
+			try:
+				expires, value = self._entries[key]
+			except KeyError:
+				self.misses += 1
+				raise
+			if expires is not None and expires < time.monotonic():
+				del self._entries[key]
+				self.expirations += 1
+				self.misses += 1
+				raise KeyError(key)
+			self._entries.move_to_end(key)
+			self.hits += 1
+			return value
+
+	def __setitem__(self, key:str, value:Any):
+		if self.maxsize <= 0:
+			return
+		expires = None if self.ttl is None else time.monotonic() + self.ttl
+		with self._lock:
+			self._entries[key] = (expires, value)
+			self._entries.move_to_end(key)
+			while len(self._entries) > self.maxsize:
+				self._entries.popitem(last=False)
+				self.evictions += 1
+
+	def __delitem__(self, key:str):
+		with self._lock:
+			del self._entries[key]
+
+	def pop(self, key:str, default=None) -> Any:
+		with self._lock:
+			entry = self._entries.pop(key, None)
+		return default if entry is None else entry[1]
+
+	def clear(self):
+		''' Remove all entries (counters are not reset). '''
+		with self._lock:
+			self._entries.clear()
+
+	@property
+	def stats(self) -> dict:
+		''' A dictionary of the cache counters. '''
+		return {
+			"size" : len(self._entries),
+			"maxsize" : self.maxsize,
+			"hits" : self.hits,
+			"misses" : self.misses,
+			"evictions" : self.evictions,
+			"expirations" : self.expirations
+		}
+
+class ResolverCache:
+	'''
+	The cache used by the resolver to store API responses.
+
+	Values are kept in two tiers: an in-process :py:class:`MemoryCache` holding already-decoded values in
+	front of a persistent cache (by default ``scidd.core.cache.LocalAPICache.defaultCache()``) that holds
+	encoded values. A value found only in the persistent tier is decoded once and promoted to the memory tier.
+
+	Lists of filename search records are stored in a compact binary form (see :py:mod:`scidd.astro.codec`);
+	anything else is stored as JSON. Entries written as JSON by earlier versions are read as before and
+	rewritten in the compact form the first time they are read, or all at once with :py:meth:`migrate`.
+	If the persistent tier only accepts text, JSON is used for every value.
+
+	Values stored by earlier versions under a legacy key (see :py:func:`legacy_cache_keys`) are found by lookups
+	of the current key and moved to it. :py:meth:`migrate` moves them all at once, removing duplicates; after that
+	the legacy keys are no longer looked up.
+
+	Values returned from the memory tier are shared between callers and should be treated as read-only.
+
+	Negative results (a lookup that is known to find nothing) are recorded separately with :py:meth:`setNegative`.
+	They are stored under their own key prefix, expire after ``negative_ttl`` seconds in both tiers, and are
+	counted separately from positive hits in :py:attr:`stats`.
+
+	:param persistent: a dictionary-like object used as the persistent tier; defaults to the default ``LocalAPICache``
+	:param memory_size: the maximum number of entries held in memory
+	:param memory_ttl: the number of seconds an entry is held in memory, or ``None`` to hold it until evicted
+	:param negative_ttl: the number of seconds a negative result is valid for
+	:param compact: store records in the compact binary form; if False, only JSON is written
+	'''
+	NEGATIVE_PREFIX = "negative:"
+	MIGRATED_KEY = "astro:cache/migrated" # present once migrate() has run
+
+	def __init__(self, persistent:MutableMapping=None, memory_size:int=10000, memory_ttl:float=3600, negative_ttl:float=86400,
+				 compact:bool=True):
+		self._persistent = persistent
+		self.compact = compact
+		self.memory = MemoryCache(maxsize=memory_size, ttl=memory_ttl)
+		self.negative_memory = MemoryCache(maxsize=memory_size, ttl=negative_ttl)
+		self.negative_ttl = negative_ttl
+		self.persistent_hits = 0
+		self.persistent_misses = 0
+		self.negative_hits = 0
+		self.negative_misses = 0
+		self.migrations = 0
+		self._legacyKeys = None # whether legacy keys may be present; checked on first use
+
+	@property
+	def persistent(self) -> MutableMapping:
+		'''
+		The persistent cache tier.
+		'''
+		if self._persistent is None:
+			from scidd.core.cache import LocalAPICache
+			return LocalAPICache.defaultCache()
+		return self._persistent
+
+	def __getitem__(self, key:str) -> Any:
+		try:
+			return self.memory[key]
+		except KeyError:
+			pass
+
+		try:
+			data = self.persistent[key]
+		except KeyError:
+			value = self._fromLegacyKey(key)
+			if value is None:
+				self.persistent_misses += 1
+				raise
+		else:
+			if is_encoded(data):
+				value = decode_records(data)
+			else:
+				value = json.loads(data)
+				if self.compact and self._writePersistent(key, value):
+					self.migrations += 1
+		self.persistent_hits += 1
+		self.memory[key] = value
+		return value
+
+	@property
+	def legacyKeys(self) -> bool:
+		'''
+		'True' if values may still be stored under legacy keys, i.e. :py:meth:`migrate` has not been run on the persistent tier.
+		'''
+		if self._legacyKeys is None:
+			self._legacyKeys = self.MIGRATED_KEY not in self.persistent
+		return self._legacyKeys
+
+	def _fromLegacyKey(self, key:str) -> Any:
+		'''
+		Returns the value stored under a legacy key of the given key, moving it to the key, or 'None' if there is none.
+		'''
+		if not self.legacyKeys:
+			return None
+		for legacy_key in legacy_cache_keys(key):
+			try:
+				value = self._decode(self.persistent[legacy_key])
+			except (KeyError, TypeError, ValueError):
+				continue
+			self._writePersistent(key, value)
+			self._deletePersistent(legacy_key)
+			self.migrations += 1
+			return value
+		return None
+
+	@staticmethod
+	def _decode(data) -> Any:
+		return decode_records(data) if is_encoded(data) else json.loads(data)
+
+	def __setitem__(self, key:str, value:Any):
+		self.memory[key] = value
+		self._writePersistent(key, value)
+		if self.negative_memory.pop(key) is not None:
+			self._deletePersistent(self.NEGATIVE_PREFIX + key)
+
+	def _writePersistent(self, key:str, value:Any) -> bool:
+		'''
+		Write a value to the persistent tier; returns 'True' if it was written in the compact form.
+		'''
+		encoded = encode_records(value) if self.compact else None
+		if encoded is not None:
+			try:
+				self.persistent[key] = encoded
+				return True
+			except (TypeError, ValueError):
+				logger.debug("the persistent cache doesn't accept binary values; storing JSON")
+				self.compact = False
+		self.persistent[key] = json.dumps(value)
+		return False
+
+	def migrate(self) -> int:
+		'''
+		Bring the persistent tier up to date: move entries stored under legacy keys to their current key (dropping
+		them if the current key already has a value) and rewrite every JSON entry that can be stored in the compact form.
+
+		If the persistent tier has a ``vacuum()`` method (e.g. :py:class:`scidd.astro.sqlite_cache.ShardedSQLiteCache`),
+		it is called afterwards to reclaim the space freed. Running this more than once is harmless.
+
+		:returns: the number of entries moved or rewritten
+		'''
+		persistent = self.persistent
+		count = 0
+		for key in list(persistent.keys()):
+			negative = key.startswith(self.NEGATIVE_PREFIX)
+			name = key[len(self.NEGATIVE_PREFIX):] if negative else key
+			try:
+				data = persistent[key]
+			except KeyError:
+				continue
+
+			canonical = canonical_cache_key(name)
+			if canonical != name:
+				target = self.NEGATIVE_PREFIX + canonical if negative else canonical
+				if target not in persistent:
+					if negative:
+						persistent[target] = data
+					else:
+						try:
+							self._writePersistent(target, self._decode(data))
+						except (TypeError, ValueError):
+							continue
+				self._deletePersistent(key)
+				count += 1
+			elif not negative and not is_encoded(data):
+				try:
+					value = json.loads(data)
+				except (TypeError, ValueError):
+					continue
+				if encode_records(value) is not None and self._writePersistent(key, value):
+					count += 1
+
+		persistent[self.MIGRATED_KEY] = json.dumps({"migrated" : time.time()})
+		self._legacyKeys = False
+		if hasattr(persistent, "vacuum"):
+			persistent.vacuum()
+		self.migrations += count
+		return count
+
+	def _deletePersistent(self, key:str):
+		try:
+			del self.persistent[key]
+		except KeyError:
+			pass
+
+	def setNegative(self, key:str, ttl:float=None):
+		'''
+		Record that a lookup for the given key is known to find nothing.
+
+		:param key: the cache key of the lookup
+		:param ttl: the number of seconds the negative result is valid for; defaults to ``negative_ttl``
+		'''
+		expires = time.time() + (self.negative_ttl if ttl is None else ttl)
+		self.negative_memory[key] = expires
+		self.persistent[self.NEGATIVE_PREFIX + key] = json.dumps({"expires" : expires})
+
+	def isNegative(self, key:str) -> bool:
+		'''
+		Returns 'True' if an unexpired negative result is recorded for the given key.
+		'''
+		try:
+			expires = self.negative_memory[key]
+		except KeyError:
+			try:
+				expires = json.loads(self.persistent[self.NEGATIVE_PREFIX + key])["expires"]
+			except KeyError:
+				self.negative_misses += 1
+				return False
+			self.negative_memory[key] = expires
+
+		if expires < time.time():
+			self.negative_memory.pop(key)
+			self._deletePersistent(self.NEGATIVE_PREFIX + key)
+			self.negative_misses += 1
+			return False
+
+		self.negative_hits += 1
+		return True
+
+	def purgeNegative(self, key:str=None):
+		'''
+		Remove negative results from the cache.
+
+		:param key: the key to remove a negative result for; if ``None``, all negative results are removed
+		'''
+		if key is not None:
+			self.negative_memory.pop(key)
+			self._deletePersistent(self.NEGATIVE_PREFIX + key)
+			return
+
+		self.negative_memory.clear()
+		for persistent_key in [k for k in self.persistent.keys() if k.startswith(self.NEGATIVE_PREFIX)]:
+			self._deletePersistent(persistent_key)
+
+	def __contains__(self, key:str) -> bool:
+		try:
+			self[key]
+			return True
+		except KeyError:
+			return False
+
+	def isCached(self, key:str) -> bool:
+		'''
+		Returns 'True' if a value or an unexpired negative result is stored for the given key.
+
+		Values are not decoded, and neither the hit and miss counters nor the order of the memory tier are changed.
+		'''
+		if key in self.memory or key in self.persistent:
+			return True
+		expires = self.negative_memory.peek(key)
+		if expires is None:
+			try:
+				expires = json.loads(self.persistent[self.NEGATIVE_PREFIX + key])["expires"]
+			except (KeyError, TypeError, ValueError):
+				pass
+		if expires is not None and expires >= time.time():
+			return True
+		return self.legacyKeys and any(legacy_key in self.persistent for legacy_key in legacy_cache_keys(key))
+
+	def clearMemory(self):
+		'''
+		Remove all values from the in-memory tier; the persistent tier is not affected.
+		'''
+		self.memory.clear()
+		self.negative_memory.clear()
+
+	@property
+	def stats(self) -> dict:
+		'''
+		A dictionary of the cache counters; ``memory_*`` values describe the in-memory tier, ``persistent_*`` values lookups that fell through to the persistent tier,
+		and ``negative_*`` values lookups of negative results.
+		'''
+		stats = {f"memory_{key}":value for key, value in self.memory.stats.items()}
+		stats["persistent_hits"] = self.persistent_hits
+		stats["persistent_misses"] = self.persistent_misses
+		stats["negative_hits"] = self.negative_hits
+		stats["negative_misses"] = self.negative_misses
+		stats["negative_memory_size"] = len(self.negative_memory)
+		stats["migrations"] = self.migrations
+		return stats
@@ -0,0 +1,172 @@
+
+import sys
+import struct
+from typing import List, Optional
+
+# The compact form of a list of filename search records (the only shape stored in bulk in the cache):
+#
+#   magic (4 bytes) | record count n (uint32)
+#   n flag bytes
+#   n file sizes (int64) | n right ascensions (float64) | n declinations (float64) | n shared URL suffix lengths (uint16)
+#   UTF-8 text: for each record "scidd \0 url prefix \0 dataset \0 release", records separated by \0
+#
+# The end of a URL is usually the file name at the end of the SciDD; only the part before it is stored.
+# All numbers are little-endian. The magic bytes can't start JSON text, which tells the two formats apart.
+
+MAGIC = b"\x00SR1"
+_COUNT = struct.Struct("<I")
+_HEADER_SIZE = len(MAGIC) + _COUNT.size
+
+_FIELDS = ("scidd", "url", "dataset", "release", "file_size", "position")
+
+_HAS_FILE_SIZE = 1 # the record has a "file_size" key
+_FILE_SIZE = 2 # ... that is not null
+_HAS_POSITION = 4 # the record has a "position" key
+_POSITION = 8 # ... that is not null
+_ALL = _HAS_FILE_SIZE | _FILE_SIZE | _HAS_POSITION | _POSITION
+_HAS_KEYS = _HAS_FILE_SIZE | _HAS_POSITION
+_KEYS = bytes(flag & _HAS_KEYS for flag in range(256)) # translation table that keeps only the key flags
+
+_INT64_MIN, _INT64_MAX = -2**63, 2**63 - 1
+
+def _shared_suffix(sci_dd:str, url:str) -> int:
+	''' Returns the length of the common end of the SciDD path and the URL. '''
+	path = sci_dd.partition(";")[0]
+	length = min(len(path), len(url), 0xFFFF)
+	count = 0
+	while count < length and path[-1-count] == url[-1-count]:
+		count += 1
+	return count
+
+def encode_records(records) -> Optional[bytes]:
+	'''
+	Encode a list of filename search records in the compact binary form.
+
+	Returns ``None`` if the value is not a list of records of the expected shape (e.g. a record has an
+	extra key or a value of an unexpected type); such values should be stored some other way (i.e. JSON).
+	'''
+	if not isinstance(records, list):
+		return None
+
+	n = len(records)
+	flags = bytearray(n)
+	file_sizes = [0] * n
+	ra = [0.0] * n
+	dec = [0.0] * n
+	suffixes = [0] * n
+	text = list()
+
+	for i, record in enumerate(records):
+		if not isinstance(record, dict) or not set(record.keys()) <= set(_FIELDS):
+			return None
+		try:
+			sci_dd, url, dataset, release = record["scidd"], record["url"], record["dataset"], record["release"]
+		except KeyError:
+			return None
+		if not all(type(s) is str and "\x00" not in s for s in (sci_dd, url, dataset, release)):
+			return None
+
+		if "file_size" in record:
+			flags[i] |= _HAS_FILE_SIZE
+			file_size = record["file_size"]
+			if file_size is not None:
+				if type(file_size) is not int or not _INT64_MIN <= file_size <= _INT64_MAX:
+					return None
+				flags[i] |= _FILE_SIZE
+				file_sizes[i] = file_size
+
+		if "position" in record:
+			flags[i] |= _HAS_POSITION
+			position = record["position"]
+			if position is not None:
+				if not isinstance(position, list) or len(position) != 2 or not all(type(v) in (int, float) for v in position):
+					return None
+				flags[i] |= _POSITION
+				ra[i], dec[i] = float(position[0]), float(position[1])
+
+		suffix = _shared_suffix(sci_dd, url)
+		suffixes[i] = suffix
+		text.extend((sci_dd, url[:len(url)-suffix], dataset, release))
+
+	return b"".join((MAGIC, _COUNT.pack(n), bytes(flags),
+					 _numbers_struct(n).pack(*file_sizes, *ra, *dec, *suffixes),
+					 "\x00".join(text).encode("utf-8")))
+
+def is_encoded(data) -> bool:
+	''' Returns 'True' if the value was written by :py:func:`encode_records`. '''
+	return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(MAGIC)]) == MAGIC
+
+_numbers_structs = dict() # key: record count, value: struct of the numeric columns
+
+def _numbers_struct(n:int) -> struct.Struct:
+	try:
+		return _numbers_structs[n]
+	except KeyError:
+		numbers = struct.Struct(f"<{n}q{2*n}d{n}H")
+		if len(_numbers_structs) < 1024:
+			_numbers_structs[n] = numbers
+		return numbers
+
+_SINGLE = struct.Struct("<IBqddH") # count, flags and numbers of a single record
+
+def decode_records(data:bytes) -> List[dict]:
+	'''
+	Decode a list of records written by :py:func:`encode_records`.
+
+	:raises ValueError: if the data are not in the compact form
+	'''
+	if type(data) is not bytes:
+		data = bytes(data)
+	if data[:4] != MAGIC:
+		raise ValueError("The data are not encoded records.")
+	n, = _COUNT.unpack_from(data, 4)
+	intern = sys.intern
+
+	if n == 1:
+		# most filename searches find a single file
+		_, flag, file_size, ra, dec, suffix = _SINGLE.unpack_from(data, 4)
+		sci_dd, url, dataset, release = data[_HEADER_SIZE + 27:].decode("utf-8").split("\x00")
+		if suffix:
+			url += sci_dd.partition(";")[0][-suffix:]
+		record = {"scidd" : sci_dd, "url" : url, "dataset" : intern(dataset), "release" : intern(release)}
+		if flag & _HAS_FILE_SIZE:
+			record["file_size"] = file_size if flag & _FILE_SIZE else None
+		if flag & _HAS_POSITION:
+			record["position"] = [ra, dec] if flag & _POSITION else None
+		return [record]
+	elif n == 0:
+		return list()
+
+	flags = data[_HEADER_SIZE:_HEADER_SIZE+n]
+	offset = _HEADER_SIZE + n
+	numbers = _numbers_struct(n).unpack_from(data, offset)
+	text = data[offset + 26*n:].decode("utf-8").split("\x00")
+
+	sci_dds = text[0::4]
+	urls = [url_prefix + sci_dd.partition(";")[0][-suffix:] if suffix else url_prefix
+			for sci_dd, url_prefix, suffix in zip(sci_dds, text[1::4], numbers[3*n:])]
+	datasets = map(intern, text[2::4])
+	releases = map(intern, text[3::4])
+
+	if flags.translate(_KEYS).count(_HAS_KEYS) == n:
+		# the usual case: every record has every key, though the file size or position may be null
+		if flags.count(_ALL) == n:
+			file_sizes = numbers[:n]
+			positions = [[ra, dec] for ra, dec in zip(numbers[n:2*n], numbers[2*n:3*n])]
+		else:
+			file_sizes = [file_size if flag & _FILE_SIZE else None for flag, file_size in zip(flags, numbers[:n])]
+			positions = [[ra, dec] if flag & _POSITION else None for flag, ra, dec in zip(flags, numbers[n:2*n], numbers[2*n:3*n])]
+		return [{"scidd" : sci_dd, "url" : url, "dataset" : dataset, "release" : release,
+				 "file_size" : file_size, "position" : position}
+				for sci_dd, url, dataset, release, file_size, position in zip(sci_dds, urls, datasets, releases, file_sizes, positions)]
+
+	records = list()
+	for i, dataset, release in zip(range(n), datasets, releases):
+		record = {"scidd" : sci_dds[i], "url" : urls[i], "dataset" : dataset, "release" : release}
+		flag = flags[i]
+		if flag & _HAS_FILE_SIZE:
+			record["file_size"] = numbers[i] if flag & _FILE_SIZE else None
+		if flag & _HAS_POSITION:
+			record["position"] = [numbers[n+i], numbers[2*n+i]] if flag & _POSITION else None
+		records.append(record)
+	return records
@@ -1,7 +1,9 @@
 
 import re
-import pdb
+import sys
+import math
 import json
+from typing import Dict, Iterable, List, Union
 from abc import ABC, ABCMeta, abstractmethod, abstractproperty
 
 import scidd.core.exc
@@ -17,7 +19,13 @@ from scidd.core.logger import scidd_logger as logger
 class DatasetResolverBase(metaclass=ABCMeta):
 	'''
 	This is the base class for resolvers
+
+	Subclasses can override the class attributes below to set the batching and caching policy of their dataset.
 	'''
+	batchSize = 100 # the maximum number of filenames sent to the API in a single bulk query
+	cacheResults = True # store the results of filename searches in the resolver cache
+	negativeCacheTTL = None # seconds a search that found nothing is remembered for; 'None' uses the resolver's setting
+
 	@abstractproperty
 	def dataset(self):
 		return self._dataset
@@ -26,7 +34,7 @@ class DatasetResolverBase(metaclass=ABCMeta):
 	def releases(self):
 		return NotImplementedError("")
 
-	def resolveURLFromSciDD(self, sci_dd:SciDD) -> str:
+	def resolveURLFromSciDD(self, sci_dd:SciDD, resolver=None) -> str:
 		#return self.resolveURLFromRelease(sci_dd=sci_dd, dataset=self.dataset, releases=self.releases)
 
 	#def resolveURLFromRelease(self, sci_dd:SciDD=None, dataset:str=None, releases:List[str]=None) -> str:
@@ -34,27 +42,95 @@ class DatasetResolverBase(metaclass=ABCMeta):
 		Given a SciDD pointing to a file, return a URL that locates the resource.
 
 		:param sci_dd: a SciDD object
+		:param resolver: the resolver used to call the API; defaults to the resolver of the SciDD
 		'''
 		#:param dataset: the short name of the dataset
 		#:param releases: list of releases to search for the file under, or ``None`` to search across all
 		#'''
 
+		dataset, release = self._datasetAndRelease(sci_dd)
+
+		records = (resolver or sci_dd.resolver).genericFilenameResolver(dataset=dataset,
+																		release=release,
+																		filename=sci_dd.filename,
+																		uniqueid=sci_dd.filenameUniqueIdentifier)
+
+		logger.debug(f"response: {json.dumps(records, indent=4)}\n")
+		return self._urlFromRecords(sci_dd, records)
+
+	def resolveURLsFromSciDDs(self, sci_dds:Iterable[SciDD], resolver=None, chunk_size:int=None) -> Dict[SciDD,Union[str,Exception]]:
+		'''
+		Given SciDDs pointing to files in this dataset, return a URL that locates each resource.
+
+		Filenames are resolved in bulk per release; identifiers that carry a unique identifier
+		(i.e. filenames that are not unique in the dataset) are resolved one at a time.
+
+		:param sci_dds: SciDD objects
+		:param resolver: the resolver used to call the API; defaults to the resolver of each SciDD
+		:param chunk_size: the maximum number of filenames sent to the server in a single query; defaults to :py:attr:`batchSize`
+		:returns: a dictionary mapping each SciDD to its URL or to the exception raised in resolving it
+		'''
+		chunk_size = chunk_size or self.batchSize
+		results = dict()
+		releases = dict() # key: (resolver, dataset, release), value: list of SciDDs
+		for sci_dd in sci_dds:
+			try:
+				if sci_dd.filenameUniqueIdentifier:
+					results[sci_dd] = self.resolveURLFromSciDD(sci_dd, resolver=resolver)
+					continue
+				dataset, release = self._datasetAndRelease(sci_dd)
+			except Exception as e:
+				results[sci_dd] = e
+				continue
+			releases.setdefault((resolver or sci_dd.resolver, dataset, release), list()).append(sci_dd)
+
+		for (api_resolver, dataset, release), group in releases.items():
+			records = api_resolver.bulkFilenameResolver(dataset=dataset,
+														release=release,
+														filenames=[sci_dd.filename for sci_dd in group],
+														chunk_size=chunk_size)
+			for sci_dd in group:
+				filename_records = records[sci_dd.filename]
+				if isinstance(filename_records, Exception):
+					results[sci_dd] = filename_records
+					continue
+				try:
+					results[sci_dd] = self._urlFromRecords(sci_dd, filename_records)
+				except scidd.core.exc.UnableToResolveSciDDToURL as e:
+					results[sci_dd] = e
+
+		return results
+
+	def _datasetAndRelease(self, sci_dd:SciDD) -> tuple:
+		'''
+		Returns the dataset and release short names of the SciDD; the release is ``None`` if not present.
+		'''
 		try:
 			dataset, release = sci_dd.datasetRelease.split(".")
 		except ValueError:
 			dataset = sci_dd.datasetRelease
 			release = None
+		return dataset, release
 
-		records = sci_dd.resolver.genericFilenameResolver(dataset=dataset,
-														  release=release,
-														  filename=sci_dd.filename,
-														  uniqueid=sci_dd.filenameUniqueIdentifier)
-
-		logger.debug(f"response: {json.dumps(records, indent=4)}\n")
+	def _urlFromRecords(self, sci_dd:SciDD, records:List[dict]) -> str:
+		'''
+		Returns the URL from the records of a filename search for the given SciDD, filling in what else is known about it.
+		'''
 		if len(records) == 1:
-			url = records[0]["url"] # don't set sci_dd.url here or will infinitely recurse
+			record = records[0]
+			url = record["url"] # don't set sci_dd.url here or will infinitely recurse
 			if sci_dd._url is None:
 				sci_dd._url = url
+			if record.get("file_size"):
+				# value is null if not available
+				sci_dd._uncompressed_file_size = record["file_size"]
+			if record.get("dataset") and record.get("release"):
+				sci_dd._datasetRelease = sys.intern(".".join([record["dataset"], record["release"]]))
+			if "position" in record and getattr(sci_dd, "_ra", False) is None:
+				# the API returns null if a position could not be determined; recorded as NaN
+				position = record["position"] or [math.nan, math.nan]
+				sci_dd._ra = float(position[0])
+				sci_dd._dec = float(position[1])
 			return url
 		elif len(records) == 0:
 			raise scidd.core.exc.UnableToResolveSciDDToURL(f"The SciDD could not be resolved to a URL (no records found): '{sci_dd}'.")
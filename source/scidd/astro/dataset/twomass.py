@@ -6,12 +6,12 @@
 import logging
 
 import scidd
-from astropy.coordinates import SkyCoord
 
 from scidd.core.utilities.designpatterns import singleton
 from scidd.core.logger import scidd_logger as logger
 
 from .dataset import DatasetResolverBase
+from ..parser import parse_astro_scidd
 
 logger = logging.getLogger("scidd.astro")
 
@@ -44,19 +44,16 @@ class TwoMASSResolver(DatasetResolverBase):
 		# else:
 		# 	raise scidd.core.exc.UnexpectedSciDDFormatException("Format of 2MASS SciDD not as expected.")
 
-	def uniqueIdentifierForFilename(self) -> str:
+	def uniqueIdentifierForFilename(self, sci_dd) -> str:
 		'''
 		Returns a string that can be used as a unique identifier to disambiguate files within the dataset that have the same name.
 
-		The default returns an empty string as it is assumed filenames within a dataset are unique;
-		override this method to return an identifier when this is not the case.
-		'''
-		# The filename should always be the last part of the URI if this is a filename, excluding any fragment.
-		uri = self.scidd.split("#")[0]  # strip fragment identifier (if present)
-		filename = uri.split("/")[-1]   # filename will always be the last element
-		unique_id = filename.split(";")[1] # remove any unique identifier that might be present at the end of the filename
+		2MASS filenames are not unique within the release; the identifier is the ``uniqueid`` extended
+		file descriptor, e.g. ``20001017.s.27`` in ``scidd:/astro/file/2mass/allsky/ji0270198.fits;uniqueid=20001017.s.27``.
 
-		return unique_id
+		:param sci_dd: a SciDD pointing to a 2MASS file
+		'''
+		return parse_astro_scidd(str(sci_dd)).uniqueid
 
 		#match = re.search(";([^#].+)", self.path)
 		#if match:
@@ -70,7 +67,7 @@ class TwoMASSResolver(DatasetResolverBase):
 		#	raise scidd.core.exc.UnexpectedSciDDFormatException(f"Expected to find a unique identifier for a filename, but one was not found: '{sci_dd}'.")
 
 	@property
-	def position(self) -> SkyCoord:
+	def position(self) -> "astropy.coordinates.SkyCoord":
 		'''
 		Returns a representative sky position for this file; this value should not be used for science.
 
@@ -82,6 +79,9 @@ class TwoMASSResolver(DatasetResolverBase):
 		Whenever possible (but not guaranteed), the value returned is in J2000 IRCS.
 		'''
 
+		import astropy.units as u
+		from astropy.coordinates import SkyCoord
+
 		if self._position is None:
 			# note that the API automatically discards file compression extensions
 			parameters = {
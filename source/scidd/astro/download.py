@@ -0,0 +1,308 @@
+
+import os
+import time
+import logging
+import pathlib
+import threading
+from urllib.parse import urlsplit
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .transport import HTTPTransport
+
+logger = logging.getLogger("scidd.astro")
+
+class DownloadProgress(NamedTuple):
+	'''
+	A snapshot of the progress of :py:meth:`DownloadManager.download`, passed to the progress callback.
+	'''
+	files_done: int
+	files_total: int
+	files_failed: int
+	bytes_received: int
+	elapsed: float # seconds
+
+	@property
+	def throughput(self) -> float:
+		''' Bytes received per second. '''
+		return self.bytes_received / self.elapsed if self.elapsed > 0 else 0.0
+
+class DownloadResult(NamedTuple):
+	'''
+	The outcome of downloading one file; ``error`` is ``None`` on success, ``path`` is ``None`` on failure.
+	'''
+	sci_dd: object
+	path: pathlib.Path
+	bytes_received: int
+	error: Exception
+
+class IncompleteDownload(IOError):
+	''' The connection ended before the full resource was received. '''
+	pass
+
+class DownloadManager:
+	'''
+	Downloads the files of many `SciDDAstroFile` objects in parallel.
+
+	Files are written where :py:attr:`SciDDAstroFile.filepath` looks for them in the SciDD cache,
+	``<cache directory>/<path within cache>/<file name in URL>`` (see :py:attr:`SciDDAstroFile.path_within_cache`),
+	so files downloaded here are found in the cache afterwards. Data are first written to a
+	``.part`` file next to the destination that is renamed into place only once complete, so the destination
+	never holds a partial file. If a transfer is interrupted, it is resumed from the end of the ``.part`` file
+	with an HTTP Range request (in the same call, up to ``max_attempts`` times, or in a later call). The request
+	carries an ``If-Range`` header with the ETag (or Last-Modified date) recorded when the ``.part`` file was
+	started, so that a resource that changed in the meantime is downloaded again from the start rather than
+	spliced onto old data. Only connection errors and interrupted transfers are retried; other errors (e.g. a 404)
+	fail the file immediately. Files that already exist at their destination are not downloaded again, and SciDDs
+	that map to the same destination are downloaded once.
+
+	:param directory: the top level directory of the SciDD cache; defaults to that of the ``SciDDCacheManager``
+	:param workers: the number of files downloaded at the same time
+	:param per_host_connections: the maximum number of simultaneous downloads from any one host
+	:param max_attempts: the number of times a transfer is attempted before giving up on the file
+	:param chunk_size: the number of bytes read from the network at a time
+	:param progress: a callable that is passed a :py:class:`DownloadProgress` as data arrive
+	:param transport: the HTTP transport to use; a pooled transport sized to ``workers`` is created if not provided
+	'''
+	def __init__(self, directory:Union[str,pathlib.Path]=None, workers:int=8, per_host_connections:int=4, max_attempts:int=5,
+				 chunk_size:int=1024*1024, progress:Callable[[DownloadProgress],None]=None, transport:HTTPTransport=None):
+		if directory is None:
+			from scidd.core import SciDDCacheManager
+			directory = SciDDCacheManager().path
+		self.directory = pathlib.Path(directory)
+		self.workers = int(workers)
+		self.per_host_connections = int(per_host_connections)
+		self.max_attempts = int(max_attempts)
+		self.chunk_size = int(chunk_size)
+		self.progress = progress
+		self.transport = transport or HTTPTransport(pool_size=self.workers, timeout=(10.0, 60.0))
+
+		self._host_semaphores = dict()
+		self._lock = threading.Lock()
+		self._reset(0)
+
+	def _reset(self, files_total:int):
+		self._files_total = files_total
+		self._files_done = 0
+		self._files_failed = 0
+		self._bytes_received = 0
+		self._start = time.monotonic()
+
+	@property
+	def status(self) -> DownloadProgress:
+		''' The progress of the current (or last) call to :py:meth:`download`. '''
+		return DownloadProgress(files_done=self._files_done,
+								files_total=self._files_total,
+								files_failed=self._files_failed,
+								bytes_received=self._bytes_received,
+								elapsed=time.monotonic() - self._start)
+
+	def _report(self, bytes_received:int=0, done:bool=False, failed:bool=False):
+		with self._lock:
+			self._bytes_received += bytes_received
+			self._files_done += done
+			self._files_failed += failed
+		if self.progress is not None:
+			self.progress(self.status)
+
+	def _hostSemaphore(self, url:str) -> threading.BoundedSemaphore:
+		host = urlsplit(url).netloc
+		with self._lock:
+			if host not in self._host_semaphores:
+				self._host_semaphores[host] = threading.BoundedSemaphore(self.per_host_connections)
+			return self._host_semaphores[host]
+
+	def pathForSciDD(self, sci_dd, url:str) -> pathlib.Path:
+		'''
+		Returns the path a file is written to (its location in the SciDD cache); override to use a different layout.
+		'''
+		return self.directory / sci_dd.path_within_cache / os.path.basename(urlsplit(url).path)
+
+	def download(self, sci_dds:Iterable, resolver=None) -> List[DownloadResult]:
+		'''
+		Download the files pointed to by the given SciDDs.
+
+		URLs not yet known are resolved in bulk first (see :py:meth:`SciDDAstroResolver.urlsForSciDDs`).
+		A failure to download one file does not stop the others; it is reported in its result.
+
+		:param sci_dds: `SciDDAstroFile` objects
+		:param resolver: the resolver used to resolve URLs; defaults to :py:meth:`SciDDAstroResolver.defaultResolver`
+		:returns: one result per SciDD, in input order
+		'''
+		sci_dds = list(sci_dds)
+		self._reset(len(sci_dds))
+
+		urls = {sci_dd:sci_dd._url for sci_dd in sci_dds}
+		unresolved = [sci_dd for sci_dd, url in urls.items() if url is None]
+		if len(unresolved) > 0:
+			if resolver is None:
+				from .astro_resolver import SciDDAstroResolver
+				resolver = SciDDAstroResolver.defaultResolver()
+			urls.update(resolver.urlsForSciDDs(unresolved))
+
+		def fetch(index:int) -> DownloadResult:
+			sci_dd, url, path = sci_dds[index], urls[sci_dds[index]], paths[index]
+			try:
+				with self._hostSemaphore(url):
+					received = self._fetch(url, path)
+			except Exception as e:
+				logger.debug(f"download of '{url}' failed: {e}")
+				self._report(failed=True)
+				return DownloadResult(sci_dd=sci_dd, path=None, bytes_received=0, error=e)
+			self._report(done=True)
+			return DownloadResult(sci_dd=sci_dd, path=path, bytes_received=received, error=None)
+
+		results = [None] * len(sci_dds)
+		paths = [None] * len(sci_dds)
+		first = dict() # key: destination path, value: index of the first SciDD written to it
+		for index, sci_dd in enumerate(sci_dds):
+			url = urls[sci_dd]
+			if isinstance(url, Exception):
+				self._report(failed=True)
+				results[index] = DownloadResult(sci_dd=sci_dd, path=None, bytes_received=0, error=url)
+			else:
+				paths[index] = self.pathForSciDD(sci_dd, url)
+				first.setdefault(paths[index], index)
+
+		# download each destination once: two threads must not write the same '.part' file
+		with ThreadPoolExecutor(max_workers=self.workers) as executor:
+			for index, result in zip(first.values(), executor.map(fetch, first.values())):
+				results[index] = result
+
+		for index, path in enumerate(paths):
+			if results[index] is None:
+				# a duplicate: it shares the outcome of the download of its destination
+				result = results[first[path]]
+				self._report(done=result.error is None, failed=result.error is not None)
+				results[index] = result._replace(sci_dd=sci_dds[index], bytes_received=0)
+		return results
+
+	def _fetch(self, url:str, path:pathlib.Path) -> int:
+		'''
+		Download a single URL to the given path, resuming a partial transfer if one exists.
+
+		:returns: the number of bytes received
+		'''
+		import requests
+		import urllib3
+		retried = (IncompleteDownload, # the connection ended early or the partial file was unusable
+				   requests.exceptions.ConnectionError, requests.exceptions.Timeout, requests.exceptions.ChunkedEncodingError,
+				   urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError) # raised while reading the body
+
+		if path.exists():
+			return 0
+		path.parent.mkdir(parents=True, exist_ok=True)
+		part = path.with_name(path.name + ".part")
+
+		received = 0
+		for attempt in range(1, self.max_attempts + 1):
+			try:
+				received += self._transfer(url, part)
+				os.replace(part, path) # atomic on the same file system
+				_unlink(_validator_path(part))
+				return received
+			except retried as e:
+				logger.debug(f"attempt {attempt} of '{url}' interrupted: {e}")
+				error = e
+		raise error
+
+	def _transfer(self, url:str, part:pathlib.Path) -> int:
+		'''
+		Append the remainder of the resource to the partial file, or write it from the start.
+
+		A partial file is only resumed if the validator recorded when it was started is known; it is sent as
+		``If-Range`` so that the server sends the whole resource instead if it has changed since.
+
+		:raises IncompleteDownload: if the connection ended early, or the partial file doesn't match the resource
+									(it is deleted so that the next attempt starts over)
+		'''
+		validator_path = _validator_path(part)
+		offset = part.stat().st_size if part.exists() else 0
+		validator = validator_path.read_text() if offset > 0 and validator_path.exists() else None
+		headers = {"Range" : f"bytes={offset}-", "If-Range" : validator} if validator else None
+
+		with self.transport.get(url, headers=headers, stream=True) as response:
+			if response.status_code == 416 and validator:
+				start, length = _content_range(response.headers.get("Content-Range"))
+				if length == offset:
+					return 0 # the partial file already holds the whole resource
+				_discard(part)
+				raise IncompleteDownload(f"the partial file of '{url}' has {offset} bytes but the resource has {length}")
+			response.raise_for_status()
+
+			if response.status_code == 206 and validator:
+				start, length = _content_range(response.headers.get("Content-Range"))
+				if start != offset:
+					_discard(part)
+					raise IncompleteDownload(f"asked for '{url}' from byte {offset} but received it from byte {start}")
+				expected = length
+			else:
+				# a new transfer, or the resource changed (If-Range didn't match) or the server ignored the range
+				offset = 0
+				expected = None
+			if expected is None and response.headers.get("Content-Length") is not None:
+				expected = offset + int(response.headers["Content-Length"])
+
+			received = 0
+			with open(part, "ab" if offset > 0 else "wb") as f:
+				if offset == 0:
+					validator = _response_validator(response)
+					if validator:
+						validator_path.write_text(validator)
+					else:
+						_unlink(validator_path) # the transfer can't be resumed safely
+				# read the raw bytes: a Content-Encoding must not be undone as offsets refer to the encoded data
+				for chunk in response.raw.stream(self.chunk_size, decode_content=False):
+					f.write(chunk)
+					received += len(chunk)
+					self._report(bytes_received=len(chunk))
+
+		if expected is not None and offset + received < expected:
+			raise IncompleteDownload(f"received {offset + received} of {expected} bytes from '{url}'")
+		return received
+
+def _validator_path(part:pathlib.Path) -> pathlib.Path:
+	''' Returns the path of the file holding the validator a partial file was started with. '''
+	return part.with_name(part.name + ".validator")
+
+def _unlink(path:pathlib.Path):
+	''' Delete a file if it exists. '''
+	try:
+		path.unlink()
+	except FileNotFoundError:
+		pass
+
+def _discard(part:pathlib.Path):
+	''' Delete a partial file that can't be resumed. '''
+	_unlink(part)
+	_unlink(_validator_path(part))
+
+def _response_validator(response) -> Optional[str]:
+	'''
+	Returns the value to send as ``If-Range`` to resume this response: its ETag if strong
+	(weak ETags can't be used with ``If-Range``), else its Last-Modified date, or ``None``.
+	'''
+	etag = response.headers.get("ETag")
+	if etag and not etag.startswith("W/"):
+		return etag
+	return response.headers.get("Last-Modified")
+
+def _content_range(value:Optional[str]) -> Tuple[Optional[int],Optional[int]]:
+	'''
+	Returns the first byte and the complete length from a ``Content-Range`` header
+	(e.g. ``bytes 200-999/1000`` or ``bytes */1000``), with ``None`` for what is not given.
+	'''
+	start = length = None
+	if value and value.startswith("bytes "):
+		byte_range, _, total = value[6:].partition("/")
+		if byte_range != "*":
+			try:
+				start = int(byte_range.partition("-")[0])
+			except ValueError:
+				pass
+		if total != "*":
+			try:
+				length = int(total)
+			except ValueError:
+				pass
+	return start, length
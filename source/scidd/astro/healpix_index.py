@@ -0,0 +1,232 @@
+
+import logging
+import pathlib
+import threading
+from typing import Iterable, List, NamedTuple, Union
+
+import numpy as np
+import astropy.units as u
+
+from .parser import parse_astro_scidd
+
+logger = logging.getLogger("scidd.astro")
+
+class ConeSearchResult(NamedTuple):
+	'''
+	Files found by :py:meth:`HEALPixIndex.coneSearch`, sorted by distance from the center.
+
+	All fields are arrays of the same length: ``scidds`` and ``urls`` (strings), ``ra``, ``dec`` and
+	``separation`` (degrees).
+	'''
+	scidds: np.ndarray
+	urls: np.ndarray
+	ra: np.ndarray
+	dec: np.ndarray
+	separation: np.ndarray
+
+class HEALPixIndex:
+	'''
+	A local spatial index of files by their representative sky position (see :py:attr:`SciDDAstroFile.position`).
+
+	Files are assigned to HEALPix pixels (nested ordering) and kept in NumPy arrays sorted by pixel.
+	A cone search looks up the pixels overlapping the cone and then only compares positions within
+	those pixels, so it runs without calling the API. Inserts are buffered and merged into the sorted
+	arrays on the next search, so the index can grow incrementally.
+
+	Requires the ``astropy_healpix`` package (``pip install scidd_astro[healpix]``).
+
+	:param nside: the HEALPix resolution (a power of 2); the default of 64 gives pixels of about 0.9 degrees
+	'''
+	def __init__(self, nside:int=64):
+		from astropy_healpix import HEALPix
+		self.nside = int(nside)
+		self._healpix = HEALPix(nside=self.nside, order="nested")
+
+		self._pixels = np.empty(0, dtype=np.int64)
+		self._ra = np.empty(0, dtype=np.float64)
+		self._dec = np.empty(0, dtype=np.float64)
+		self._datasets = np.empty(0, dtype=np.int16)
+		self._scidds = np.empty(0, dtype=object)
+		self._urls = np.empty(0, dtype=object)
+
+		self._dataset_names = list() # index = value in _datasets
+		self._known = set() # identifiers already in the index
+		self._pending = list() # (scidd, url, dataset index, ra, dec) waiting to be merged
+		self._lock = threading.Lock()
+
+	def __len__(self) -> int:
+		return len(self._scidds) + len(self._pending)
+
+	def _datasetCode(self, dataset:str) -> int:
+		try:
+			return self._dataset_names.index(dataset)
+		except ValueError:
+			self._dataset_names.append(dataset)
+			return len(self._dataset_names) - 1
+
+	def insert(self, sci_dd:str, ra:float, dec:float, url:str=None, dataset:str=None) -> bool:
+		'''
+		Add a file to the index; files without a position or already in the index are ignored.
+
+		:param sci_dd: the identifier of the file
+		:param ra: right ascension in degrees
+		:param dec: declination in degrees
+		:param url: the URL of the file
+		:param dataset: the short name of the dataset; taken from the identifier if not provided
+		:returns: 'True' if the file was added
+		'''
+		sci_dd = str(sci_dd)
+		if ra is None or dec is None or np.isnan(ra) or np.isnan(dec):
+			return False
+		with self._lock:
+			if sci_dd in self._known:
+				return False
+			if dataset is None:
+				dataset = parse_astro_scidd(sci_dd).dataset
+			self._known.add(sci_dd)
+			self._pending.append((sci_dd, url, self._datasetCode(dataset), float(ra), float(dec)))
+		return True
+
+	def insertRecords(self, records:Iterable[dict]) -> int:
+		'''
+		Add files from records returned by the API filename search (e.g. the values stored in the resolver cache).
+
+		:returns: the number of files added
+		'''
+		count = 0
+		for record in records:
+			position = record.get("position")
+			if position is None:
+				continue
+			count += self.insert(record["scidd"], position[0], position[1], url=record.get("url"), dataset=record.get("dataset"))
+		return count
+
+	def insertCachedRecords(self, resolver=None) -> int:
+		'''
+		Add every file found in the persistent resolver cache (the results of earlier filename searches).
+
+		:param resolver: the resolver whose cache to read; defaults to :py:meth:`SciDDAstroResolver.defaultResolver`
+		:returns: the number of files added
+		'''
+		if resolver is None:
+			from .astro_resolver import SciDDAstroResolver
+			resolver = SciDDAstroResolver.defaultResolver()
+		count = 0
+		for key in [key for key in resolver.cache.persistent.keys() if key.startswith("astro:file/")]:
+			try:
+				count += self.insertRecords(resolver.cache[key])
+			except (KeyError, ValueError):
+				pass
+		return count
+
+	def insertSciDDs(self, sci_dds:Iterable) -> int:
+		'''
+		Add `SciDDAstroFile` objects whose position is already known (e.g. after :py:func:`scidd.astro.positions`).
+
+		:returns: the number of files added
+		'''
+		count = 0
+		for sci_dd in sci_dds:
+			count += self.insert(str(sci_dd), getattr(sci_dd, "_ra", None), getattr(sci_dd, "_dec", None),
+								 url=sci_dd._url, dataset=sci_dd.dataset)
+		return count
+
+	def _merge(self):
+		'''
+		Merge buffered inserts into the pixel-sorted arrays.
+		'''
+		with self._lock:
+			if len(self._pending) == 0:
+				return
+			pending = self._pending
+			self._pending = list()
+
+			scidds, urls, datasets, ra, dec = zip(*pending)
+			ra = np.array(ra, dtype=np.float64)
+			dec = np.array(dec, dtype=np.float64)
+			pixels = self._healpix.lonlat_to_healpix(ra*u.deg, dec*u.deg).astype(np.int64)
+
+			new_scidds = np.empty(len(scidds), dtype=object)
+			new_scidds[:] = scidds
+			new_urls = np.empty(len(urls), dtype=object)
+			new_urls[:] = urls
+
+			all_pixels = np.concatenate([self._pixels, pixels])
+			order = np.argsort(all_pixels, kind="stable")
+			self._pixels = all_pixels[order]
+			self._ra = np.concatenate([self._ra, ra])[order]
+			self._dec = np.concatenate([self._dec, dec])[order]
+			self._datasets = np.concatenate([self._datasets, np.array(datasets, dtype=np.int16)])[order]
+			self._scidds = np.concatenate([self._scidds, new_scidds])[order]
+			self._urls = np.concatenate([self._urls, new_urls])[order]
+
+	def coneSearch(self, ra:float, dec:float, radius:Union[float,u.Quantity], datasets:List[str]=None) -> ConeSearchResult:
+		'''
+		Returns the indexed files whose representative position lies within ``radius`` of (``ra``, ``dec``).
+
+		:param ra: right ascension of the center in degrees
+		:param dec: declination of the center in degrees
+		:param radius: the search radius in degrees (or an astropy angle)
+		:param datasets: only return files from these datasets (short names, e.g. ``["galex", "wise"]``)
+		'''
+		self._merge()
+		radius = u.Quantity(radius, u.deg).to_value(u.deg)
+
+		# the pixels whose centers lie within the cone miss files in pixels that only overlap its edge,
+		# so look up the pixels within a pixel size of it; the exact separation is checked below
+		padded = radius*u.deg + self._healpix.pixel_resolution
+		pixels = np.unique(self._healpix.cone_search_lonlat(ra*u.deg, dec*u.deg, padded))
+		starts = np.searchsorted(self._pixels, pixels, side="left")
+		ends = np.searchsorted(self._pixels, pixels, side="right")
+		candidates = np.concatenate([np.arange(start, end) for start, end in zip(starts, ends) if end > start] or [np.empty(0, dtype=np.int64)])
+
+		if datasets is not None:
+			codes = [self._dataset_names.index(d) for d in datasets if d in self._dataset_names]
+			candidates = candidates[np.isin(self._datasets[candidates], codes)]
+
+		separation = _angular_separation(ra, dec, self._ra[candidates], self._dec[candidates])
+		inside = separation <= radius
+		candidates = candidates[inside]
+		separation = separation[inside]
+		order = np.argsort(separation)
+
+		candidates = candidates[order]
+		return ConeSearchResult(scidds=self._scidds[candidates],
+								urls=self._urls[candidates],
+								ra=self._ra[candidates],
+								dec=self._dec[candidates],
+								separation=separation[order])
+
+	def save(self, path:Union[str,pathlib.Path]):
+		'''
+		Write the index to a NumPy ``.npz`` file.
+		'''
+		self._merge()
+		np.savez(path, nside=self.nside, pixels=self._pixels, ra=self._ra, dec=self._dec,
+				 datasets=self._datasets, dataset_names=np.array(self._dataset_names, dtype=str),
+				 scidds=self._scidds.astype(str), urls=np.array([url or "" for url in self._urls], dtype=str))
+
+	@classmethod
+	def load(cls, path:Union[str,pathlib.Path]):
+		'''
+		Read an index written by :py:meth:`save`.
+		'''
+		with np.load(path) as data:
+			index = cls(nside=int(data["nside"]))
+			index._pixels = data["pixels"]
+			index._ra = data["ra"]
+			index._dec = data["dec"]
+			index._datasets = data["datasets"]
+			index._dataset_names = data["dataset_names"].tolist()
+			index._scidds = data["scidds"].astype(object)
+			index._urls = np.array([url or None for url in data["urls"].tolist()], dtype=object)
+		index._known = set(index._scidds.tolist())
+		return index
+
+def _angular_separation(ra1:float, dec1:float, ra2:np.ndarray, dec2:np.ndarray) -> np.ndarray:
+	'''
+	Returns the angular separation in degrees (haversine formula).
+	'''
+	ra1, dec1, ra2, dec2 = np.radians(ra1), np.radians(dec1), np.radians(ra2), np.radians(dec2)
+	a = np.sin((dec2 - dec1)/2)**2 + np.cos(dec1) * np.cos(dec2) * np.sin((ra2 - ra1)/2)**2
+	return np.degrees(2 * np.arcsin(np.sqrt(np.clip(a, 0, 1))))
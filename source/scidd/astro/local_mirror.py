@@ -0,0 +1,243 @@
+
+import os
+import re
+import pathlib
+import time
+import sqlite3
+import logging
+import threading
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
+
+import scidd.core
+import scidd.core.exc
+
+from .astro_resolver import ResourceStatus, SciDDAstroResolver
+from .parser import compression_extensions, strip_compression_extension
+
+logger = logging.getLogger("scidd.astro")
+
+class LocalMirrorResolver(SciDDAstroResolver):
+	'''
+	A resolver that translates SciDDs into ``file://`` URLs pointing into a local mirror of the data, without any network access.
+
+	The mirror is expected to be laid out as ``<root>/<dataset>/<release>/.../<filename>``, e.g.
+	``<root>/galex/gr6/pipe/01-vsn/.../NGA_NGC0024_0001-fd-exp.fits.gz``. The tree is scanned once and
+	an index from (dataset, release, filename, unique id) to path is stored in an SQLite database.
+	Lookups are then B-tree searches on that index (O(log n)). Filenames are indexed without their
+	compression extension, the same way :py:attr:`SciDDAstroFile.filename` returns them.
+
+	Call :py:meth:`buildIndex` with ``rescan=True`` to pick up files added to the mirror after the index was built.
+
+	:param root: the top level directory of the mirror
+	:param index_path: the SQLite index file; defaults to ``.scidd_index.sqlite`` in the root directory
+	:param build_index: if True, scan the mirror when the index doesn't exist yet
+	'''
+	def __init__(self, root:Union[str,pathlib.Path], index_path:Union[str,pathlib.Path]=None, build_index:bool=True):
+		super().__init__(scheme="file", host="", port=None)
+		self._useCache = False # the index is the cache
+		self.root = pathlib.Path(root).expanduser().resolve()
+		self.index_path = pathlib.Path(index_path) if index_path else self.root / ".scidd_index.sqlite"
+		self._local = threading.local() # one SQLite connection per thread
+
+		self._createTables()
+		if build_index and not self.isIndexed:
+			self.buildIndex()
+
+	@property
+	def connection(self) -> sqlite3.Connection:
+		''' The SQLite connection to the index for the current thread. '''
+		connection = getattr(self._local, "connection", None)
+		if connection is None:
+			connection = sqlite3.connect(str(self.index_path))
+			self._local.connection = connection
+		return connection
+
+	def _createTables(self):
+		with self.connection as db:
+			db.execute("CREATE TABLE IF NOT EXISTS files (dataset TEXT NOT NULL, release TEXT NOT NULL, filename TEXT NOT NULL, uniqueid TEXT NOT NULL DEFAULT '', path TEXT NOT NULL, file_size INTEGER, PRIMARY KEY (dataset, release, filename, uniqueid)) WITHOUT ROWID")
+			db.execute("CREATE INDEX IF NOT EXISTS files_filename ON files (filename)")
+			db.execute("CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT)")
+
+	@property
+	def isIndexed(self) -> bool:
+		''' Returns 'True' if the mirror has been scanned into the index. '''
+		row = self.connection.execute("SELECT value FROM metadata WHERE key = 'root'").fetchone()
+		return row is not None and row[0] == str(self.root)
+
+	def get(self, path:str, params:dict=None, data:dict=None, headers:Dict[str,str]=None):
+		raise NotImplementedError(f"{self.__class__.__name__} resolves identifiers from a local index and does not call an API.")
+
+	def uniqueIdentifierForPath(self, dataset:str, release:str, parts:Tuple[str]) -> str:
+		'''
+		Returns the identifier that disambiguates a file whose name is not unique in its dataset, or ``None``.
+
+		The default handles the 2MASS layout used by IRSA, where a file in ``<date><hemisphere>/s<scan>/``
+		(e.g. ``20001017s/s027/image/ji0270198.fits.gz``) has the unique id ``20001017.s.27``.
+		Override this method for other layouts.
+
+		:param dataset: the short name of the dataset
+		:param release: the short name of the release
+		:param parts: the path components below the release directory, the last one being the filename
+		'''
+		if dataset != "2mass":
+			return None
+		night = scan = None
+		for part in parts[:-1]:
+			match = re.match(r"^(\d{6,8})([ns])$", part)
+			if match:
+				night = match
+				continue
+			match = re.match(r"^s(\d{3})$", part)
+			if match:
+				scan = match
+		if night and scan:
+			return f"{night.group(1)}.{night.group(2)}.{int(scan.group(1))}"
+		return None
+
+	def _scan(self) -> Iterator[Tuple]:
+		'''
+		Walks the mirror and yields rows for the index.
+		'''
+		for dataset_entry in os.scandir(self.root):
+			if not dataset_entry.is_dir() or dataset_entry.name.startswith("."):
+				continue
+			for release_entry in os.scandir(dataset_entry.path):
+				if not release_entry.is_dir():
+					continue
+				directories = [release_entry.path]
+				while directories:
+					for entry in os.scandir(directories.pop()):
+						if entry.is_dir(follow_symlinks=False):
+							directories.append(entry.path)
+						elif entry.is_file():
+							filename = strip_compression_extension(entry.name)
+							parts = pathlib.Path(entry.path).relative_to(release_entry.path).parts
+							uniqueid = self.uniqueIdentifierForPath(dataset_entry.name, release_entry.name, parts) or ""
+							yield (dataset_entry.name, release_entry.name, filename, uniqueid, entry.path, entry.stat().st_size)
+
+	def buildIndex(self, rescan:bool=False, batch_size:int=10000) -> int:
+		'''
+		Scan the mirror and store every file found in the index.
+
+		:param rescan: scan the mirror even if it has already been indexed
+		:param batch_size: the number of rows inserted per statement
+		:returns: the number of files indexed
+		'''
+		if self.isIndexed and not rescan:
+			return self.connection.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+		count = 0
+		batch = list()
+		with self.connection as db:
+			db.execute("DELETE FROM files")
+			for row in self._scan():
+				batch.append(row)
+				if len(batch) >= batch_size:
+					db.executemany("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?)", batch)
+					count += len(batch)
+					batch = list()
+			db.executemany("INSERT OR REPLACE INTO files VALUES (?,?,?,?,?,?)", batch)
+			count += len(batch)
+			db.execute("INSERT OR REPLACE INTO metadata VALUES ('root', ?)", (str(self.root),))
+		logger.debug(f"indexed {count} files in '{self.root}'")
+		return count
+
+	def _record(self, row:Tuple) -> dict:
+		'''
+		Returns an index row in the same form as a record from the API filename search.
+		'''
+		dataset, release, filename, uniqueid, path, file_size = row
+		sci_dd = f"scidd:/astro/file/{dataset}/{release}/{filename}"
+		if uniqueid:
+			sci_dd += f";uniqueid={uniqueid}"
+		return {
+			"scidd" : sci_dd,
+			"url" : pathlib.Path(path).as_uri(),
+			"dataset" : dataset,
+			"release" : release,
+			"file_size" : None if os.path.splitext(path)[1] in compression_extensions else file_size,
+			"position" : None
+		}
+
+	def genericFilenameResolver(self, dataset:str=None, release:str=None, filename:str=None, uniqueid:str=None) -> List[dict]:
+		'''
+		Search the index for a given filename; dataset and release names are optional.
+
+		:param dataset: the short name of the dataset
+		:param release: the short name of the release
+		:param filename: the file name
+		:param uniqueid: if filenames are not unique in the dataset, this is an identifier that disambiguates the records for the filename
+		'''
+		conditions = ["filename = ?"]
+		values = [filename]
+		for column, value in [("dataset", dataset), ("release", release), ("uniqueid", uniqueid)]:
+			if value:
+				conditions.append(f"{column} = ?")
+				values.append(value)
+		rows = self.connection.execute(f"SELECT * FROM files WHERE {' AND '.join(conditions)}", values).fetchall()
+		return [self._record(row) for row in rows]
+
+	def bulkFilenameResolver(self, dataset:str=None, release:str=None, filenames:Iterable[str]=None, chunk_size:int=500) -> Dict[str,List[dict]]:
+		'''
+		Search the index for many filenames at once within a dataset and release.
+
+		:param dataset: the short name of the dataset
+		:param release: the short name of the release
+		:param filenames: the file names to search for
+		:param chunk_size: the maximum number of filenames in a single query
+		:returns: a dictionary mapping each filename to the list of matching records
+		'''
+		results = {filename:list() for filename in filenames}
+		names = list(results.keys())
+		for idx in range(0, len(names), chunk_size):
+			chunk = names[idx:idx+chunk_size]
+			conditions = [f"filename IN ({','.join('?' * len(chunk))})"]
+			values = list(chunk)
+			for column, value in [("dataset", dataset), ("release", release)]:
+				if value:
+					conditions.append(f"{column} = ?")
+					values.append(value)
+			for row in self.connection.execute(f"SELECT * FROM files WHERE {' AND '.join(conditions)}", values):
+				results[row[2]].append(self._record(row))
+		return results
+
+	def urlForSciDD(self, sci_dd:scidd.core.SciDD, verify_resource=False) -> str:
+		'''
+		This method resolves a SciDD into a ``file://`` URL in the local mirror.
+
+		:param sci_dd: a `scidd.core.SciDD` object
+		:param verify_resource: verify that the file exists at the location returned, raises `scidd.core.exc.ResourceUnavailableWhereResolverExpected` exception if not found
+		'''
+		from .astro_scidd import SciDDAstroFile # avoid circular import
+
+		if not isinstance(sci_dd, SciDDAstroFile):
+			raise NotImplementedError(f"Class {type(sci_dd)} not handled in {self.__class__}.")
+
+		dataset_resolver = self._datasetResolverFor(sci_dd.datasetRelease.split(".")[0])
+		dataset, release = dataset_resolver._datasetAndRelease(sci_dd)
+		records = self.genericFilenameResolver(dataset=dataset,
+											   release=release,
+											   filename=sci_dd.filename,
+											   uniqueid=sci_dd.filenameUniqueIdentifier)
+		url = dataset_resolver._urlFromRecords(sci_dd, records)
+
+		if verify_resource and not os.path.exists(url2pathname(urlsplit(url).path)):
+			raise scidd.core.exc.ResourceUnavailableWhereResolverExpected("The resolver returned a URL, but the resource was not found at that location.")
+		return url
+
+	def resourceStatus(self, url:str, refresh:bool=False) -> ResourceStatus:
+		'''
+		Check that a file exists in the local mirror; the status code is 200 if it does, 404 otherwise.
+
+		:param url: the ``file://`` URL to check
+		:param refresh: unused; the file system is always checked
+		'''
+		try:
+			content_length = os.stat(url2pathname(urlsplit(url).path)).st_size
+			status_code = 200
+		except FileNotFoundError:
+			content_length = None
+			status_code = 404
+		return ResourceStatus(url=url, status_code=status_code, etag=None, content_length=content_length, checked=time.time())
@@ -0,0 +1,86 @@
+
+import csv
+import pathlib
+import logging
+from typing import Iterator, Tuple, Union
+
+from .parser import parse_astro_scidd
+
+logger = logging.getLogger("scidd.astro")
+
+# column names looked for, in order, when none is given
+_DEFAULT_COLUMNS = ["scidd", "filename"]
+
+def read_manifest(path:Union[str,pathlib.Path], column:str=None) -> Iterator[str]:
+	'''
+	Read the entries of a manifest file: SciDDs (e.g. ``scidd:/astro/file/galex/gr6/...``) or bare filenames.
+
+	The format is chosen by the file extension:
+
+	* ``.csv``: a header row followed by one entry per row, read from ``column``
+	* ``.parquet``: read from ``column``; requires the ``pyarrow`` package (``pip install scidd_astro[parquet]``)
+	* anything else: text with one entry per line; blank lines and lines starting with '#' are skipped
+
+	For CSV and Parquet files, if ``column`` is not given the "scidd" column is used, else the "filename"
+	column, else the first column. Entries are read lazily, so manifests larger than memory can be read.
+
+	:param path: the manifest file
+	:param column: the name of the column holding the entries
+	'''
+	path = pathlib.Path(path)
+	suffix = path.suffix.lower()
+	if suffix == ".csv":
+		yield from _read_csv(path, column)
+	elif suffix in [".parquet", ".pq"]:
+		yield from _read_parquet(path, column)
+	else:
+		with open(path, encoding="utf-8") as f:
+			for line in f:
+				line = line.strip()
+				if line and not line.startswith("#"):
+					yield line
+
+def manifest_lookup(entry:str) -> Tuple[str,str,str,str]:
+	'''
+	Returns the (dataset, release, filename, uniqueid) to search for a manifest entry.
+
+	Bare filenames are searched across all datasets, the same way :py:meth:`SciDDAstroFile.fromFilename` does.
+
+	:raises ValueError: if the entry is a SciDD that doesn't identify a file
+	'''
+	if entry.startswith("scidd:"):
+		parsed = parse_astro_scidd(entry)
+		if parsed.type != "file":
+			raise ValueError(f"Only file identifiers can be looked up: '{entry}'")
+		return parsed.dataset, parsed.release, parsed.filename, parsed.uniqueid
+	return None, None, entry, None
+
+def _choose_column(columns:list, column:str, path:pathlib.Path) -> str:
+	if column is not None:
+		if column not in columns:
+			raise ValueError(f"The column '{column}' was not found in '{path}' (columns: {', '.join(columns)}).")
+		return column
+	for name in _DEFAULT_COLUMNS:
+		if name in columns:
+			return name
+	if len(columns) == 0:
+		raise ValueError(f"No columns were found in '{path}'.")
+	return columns[0]
+
+def _read_csv(path:pathlib.Path, column:str) -> Iterator[str]:
+	with open(path, newline="", encoding="utf-8") as f:
+		reader = csv.reader(f)
+		header = [name.strip() for name in next(reader, [])]
+		index = header.index(_choose_column(header, column, path))
+		for row in reader:
+			if index < len(row) and row[index].strip():
+				yield row[index].strip()
+
+def _read_parquet(path:pathlib.Path, column:str) -> Iterator[str]:
+	import pyarrow.parquet as pq
+	parquet_file = pq.ParquetFile(str(path))
+	column = _choose_column(parquet_file.schema_arrow.names, column, path)
+	for batch in parquet_file.iter_batches(columns=[column]):
+		for value in batch.column(0).to_pylist():
+			if value:
+				yield str(value).strip()
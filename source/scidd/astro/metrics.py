@@ -0,0 +1,143 @@
+
+import bisect
+import logging
+import threading
+from typing import Dict, Iterable, Tuple
+
+logger = logging.getLogger("scidd.astro")
+
+# upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+	'''
+	A cumulative histogram of observed values with fixed bucket boundaries (as used by Prometheus).
+
+	:param buckets: the upper bounds of the buckets, in increasing order; an unbounded bucket is added at the end
+	'''
+	__slots__ = ("buckets", "counts", "sum", "count")
+
+	def __init__(self, buckets:Iterable[float]=DEFAULT_BUCKETS):
+		self.buckets = tuple(buckets)
+		self.counts = [0] * (len(self.buckets) + 1)
+		self.sum = 0.0
+		self.count = 0
+
+	def observe(self, value:float):
+		self.counts[bisect.bisect_left(self.buckets, value)] += 1
+		self.sum += value
+		self.count += 1
+
+	def asDict(self) -> dict:
+		cumulative = 0
+		buckets = dict()
+		for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+			cumulative += count
+			buckets[bound] = cumulative
+		return {"count" : self.count, "sum" : self.sum, "buckets" : buckets}
+
+class ResolverMetrics:
+	'''
+	Counters and histograms describing where a resolver spends its time.
+
+	Metrics are identified by a name and optional labels, e.g. ``increment("cache_lookups_total", result="hit")``.
+	The resolver records:
+
+	* ``http_requests_total`` / ``http_errors_total`` (by ``status``): API calls made and those that failed
+	* ``http_request_seconds``: the latency of API calls
+	* ``http_response_bytes_total``: the size of API response bodies
+	* ``json_decode_seconds``: the time spent decoding API responses
+	* ``cache_lookups_total`` (by ``result``: ``hit``, ``negative_hit``, ``miss``): filename search cache lookups
+	* ``merged_requests_total``: filename searches served by an identical search in flight
+	* ``resolves_total`` (by ``dataset`` and ``outcome``) and ``resolve_seconds`` (by ``dataset``): calls to ``urlForSciDD``
+	* ``position_lookups_total`` (by ``source``: ``memory``, ``api``) and ``position_seconds``: accesses of ``SciDDAstroFile.position``
+
+	All methods are thread-safe.
+
+	:param buckets: the upper bounds in seconds of the buckets of every histogram
+	'''
+	def __init__(self, buckets:Iterable[float]=DEFAULT_BUCKETS):
+		self.buckets = tuple(buckets)
+		self._counters = dict() # key: (name, labels), value: number
+		self._histograms = dict() # key: (name, labels), value: Histogram
+		self._lock = threading.Lock()
+
+	def increment(self, name:str, value:float=1, **labels):
+		''' Add a value to a counter. '''
+		key = (name, tuple(sorted(labels.items())))
+		with self._lock:
+			self._counters[key] = self._counters.get(key, 0) + value
+
+	def observe(self, name:str, value:float, **labels):
+		''' Add an observation (e.g. a duration in seconds) to a histogram. '''
+		key = (name, tuple(sorted(labels.items())))
+		with self._lock:
+			histogram = self._histograms.get(key)
+			if histogram is None:
+				histogram = self._histograms[key] = Histogram(self.buckets)
+			histogram.observe(value)
+
+	def counter(self, name:str, **labels) -> float:
+		''' Returns the value of a counter (0 if it was never incremented). '''
+		return self._counters.get((name, tuple(sorted(labels.items()))), 0)
+
+	def histogram(self, name:str, **labels) -> Histogram:
+		''' Returns a histogram, or ``None`` if nothing was observed. '''
+		return self._histograms.get((name, tuple(sorted(labels.items()))))
+
+	def reset(self):
+		''' Remove all values. '''
+		with self._lock:
+			self._counters.clear()
+			self._histograms.clear()
+
+	def asDict(self) -> dict:
+		'''
+		Returns the metrics as ``{"counters" : {...}, "histograms" : {...}}``.
+
+		Keys are the metric names followed by their labels in Prometheus form, e.g. ``cache_lookups_total{result="hit"}``.
+		'''
+		with self._lock:
+			return {
+				"counters" : {_series_name(name, labels):value for (name, labels), value in sorted(self._counters.items())},
+				"histograms" : {_series_name(name, labels):histogram.asDict() for (name, labels), histogram in sorted(self._histograms.items())}
+			}
+
+	def prometheusText(self, prefix:str="scidd_astro_") -> str:
+		'''
+		Returns the metrics in the Prometheus text exposition format.
+
+		:param prefix: a string prepended to every metric name
+		'''
+		lines = list()
+		with self._lock:
+			counters = sorted(self._counters.items())
+			histograms = sorted((key, histogram.asDict()) for key, histogram in self._histograms.items())
+
+		typed = set()
+		for (name, labels), value in counters:
+			if name not in typed:
+				lines.append(f"# TYPE {prefix}{name} counter")
+				typed.add(name)
+			lines.append(f"{_series_name(prefix + name, labels)} {_format_value(value)}")
+
+		for (name, labels), histogram in histograms:
+			if name not in typed:
+				lines.append(f"# TYPE {prefix}{name} histogram")
+				typed.add(name)
+			for bound, count in histogram["buckets"].items():
+				le = "+Inf" if bound == float("inf") else _format_value(bound)
+				lines.append(f"{_series_name(prefix + name + '_bucket', labels + (('le', le),))} {count}")
+			lines.append(f"{_series_name(prefix + name + '_sum', labels)} {_format_value(histogram['sum'])}")
+			lines.append(f"{_series_name(prefix + name + '_count', labels)} {histogram['count']}")
+
+		return "\n".join(lines) + "\n"
+
+def _series_name(name:str, labels:Tuple[Tuple[str,str],...]) -> str:
+	if not labels:
+		return name
+	label_text = ",".join('{}="{}"'.format(key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in labels)
+	return f"{name}{{{label_text}}}"
+
+def _format_value(value:float) -> str:
+	return repr(float(value)) if isinstance(value, float) else str(value)
@@ -0,0 +1,105 @@
+
+import re
+import sys
+import os.path
+from urllib.parse import urlsplit
+from typing import NamedTuple, Optional, Tuple
+
+compression_extensions = [".zip", ".tgz", ".gz", ".bz2"]
+
+_RELEASE_RE = re.compile(r"[^/^.]+")
+
+class SciDDAstroParseResult(NamedTuple):
+	'''
+	The components of an identifier in the 'astro' namespace.
+
+	For ``scidd:/astro/file/2mass/allsky/ji0270198.fits.gz;uniqueid=20001017.s.27#1``:
+
+	* ``type``: ``"file"``
+	* ``dataset``: ``"2mass"``
+	* ``release``: ``"allsky"``
+	* ``path``: ``("2mass", "allsky", "ji0270198.fits.gz")``
+	* ``filename``: ``"ji0270198.fits"`` (compression extension removed)
+	* ``descriptors``: ``(("uniqueid", "20001017.s.27"),)``
+	* ``fragment``: ``"1"``
+	'''
+	type: str
+	dataset: Optional[str]
+	release: Optional[str]
+	path: Tuple[str, ...]
+	filename: str
+	descriptors: Tuple[Tuple[str, str], ...]
+	fragment: Optional[str]
+
+	@property
+	def datasetRelease(self) -> Optional[str]:
+		''' The dataset and release separated by a '.', e.g. ``galex.gr6``, or ``None`` if not present. '''
+		if self.dataset is None or self.release is None:
+			return None
+		return f"{self.dataset}.{self.release}"
+
+	@property
+	def uniqueid(self) -> Optional[str]:
+		''' The value of the ``uniqueid`` extended file descriptor, or ``None`` if not present. '''
+		for key, value in self.descriptors:
+			if key == "uniqueid":
+				return value
+		return None
+
+def compression_extension(name:str) -> str:
+	'''
+	Returns the extension of the file name or URL that indicates compression (e.g. ".gz"), or ``None``.
+	'''
+	ext = os.path.splitext(urlsplit(name).path if "://" in name else name)[1]
+	return ext if ext in compression_extensions else None
+
+def strip_compression_extension(filename:str) -> str:
+	'''
+	Returns the filename without an extension that indicates compression (e.g. ".gz", ".zip").
+	'''
+	fname, dot, ext = filename.rpartition(".")
+	if dot and fname and "." + ext in compression_extensions:
+		return fname
+	return filename
+
+def parse_astro_scidd(sci_dd:str) -> SciDDAstroParseResult:
+	'''
+	Tokenize an identifier in the 'astro' namespace in a single pass.
+
+	The dataset and release strings are interned since the same few values are repeated across every identifier.
+
+	:param sci_dd: the full identifier, e.g. ``scidd:/astro/file/galex/gr6/...``
+	:raises ValueError: if the identifier is not an astro data or file identifier
+	'''
+	if sci_dd.startswith("scidd:/astro/file/"):
+		type_ = "file"
+	elif sci_dd.startswith("scidd:/astro/data/"):
+		type_ = "data"
+	else:
+		raise ValueError(f"The SciDD was not interpreted as an astro data or file ID: '{sci_dd}'")
+
+	uri, separator, fragment = sci_dd.partition("#")
+	segments = uri[18:].split("/") # 18 = len("scidd:/astro/file/")
+	last_segment, _, extended_descriptor = segments[-1].partition(";")
+	segments[-1] = last_segment
+
+	if extended_descriptor:
+		descriptors = tuple(tuple(pair.partition("=")[::2]) for pair in extended_descriptor.split("?"))
+	else:
+		descriptors = ()
+
+	dataset = release = None
+	if len(segments) > 1 and segments[0]:
+		release_match = _RELEASE_RE.match(segments[1])
+		if release_match:
+			# share the interned strings with the path segments
+			dataset = segments[0] = sys.intern(segments[0])
+			release = sys.intern(release_match.group(0))
+			if release == segments[1]:
+				segments[1] = release
+
+	return _new_parse_result(SciDDAstroParseResult, (type_, dataset, release, tuple(segments),
+													 strip_compression_extension(last_segment),
+													 descriptors, fragment if separator else None))
+
+_new_parse_result = tuple.__new__ # skips the keyword argument handling of the named tuple constructor
@@ -0,0 +1,56 @@
+
+import logging
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import astropy.units as u
+from astropy.coordinates import SkyCoord
+
+from .astro_resolver import SciDDAstroResolver
+
+logger = logging.getLogger("scidd.astro")
+
+class SkyPositions(NamedTuple):
+	'''
+	The representative sky positions of a collection of files, aligned with the input order.
+
+	* ``coordinates``: a single (vector) ``SkyCoord``; entries without a position are NaN
+	* ``radec``: an ``(n, 2)`` array of RA and Dec in degrees; entries without a position are NaN
+	* ``mask``: a boolean array that is 'True' where no position is available
+	'''
+	coordinates: SkyCoord
+	radec: np.ndarray
+	mask: np.ndarray
+
+def positions(sci_dds:Iterable, resolver:SciDDAstroResolver=None, chunk_size:int=None) -> SkyPositions:
+	'''
+	Returns the representative sky positions of many files at once; see :py:attr:`SciDDAstroFile.position`.
+
+	Positions not already known are fetched in bulk queries (through :py:meth:`SciDDAstroResolver.urlsForSciDDs`)
+	and a single vectorized ``SkyCoord`` is built from them. Files for which the API has no position, or that
+	could not be resolved, are masked rather than given a placeholder position.
+
+	:param sci_dds: an iterable of `SciDDAstroFile` objects
+	:param resolver: the resolver used to fetch positions; defaults to :py:meth:`SciDDAstroResolver.defaultResolver`
+	:param chunk_size: the maximum number of filenames sent to the server in a single query; defaults to the batch size of each dataset
+	'''
+	sci_dds = list(sci_dds)
+	if resolver is None:
+		resolver = SciDDAstroResolver.defaultResolver()
+
+	pending = [sci_dd for sci_dd in sci_dds if getattr(sci_dd, "_ra", None) is None]
+	if len(pending) > 0:
+		logger.debug(f"fetching {len(pending)} of {len(sci_dds)} positions")
+		for sci_dd, result in resolver.urlsForSciDDs(pending, chunk_size=chunk_size).items():
+			if isinstance(result, Exception):
+				logger.debug(f"no position for '{sci_dd}': {result}")
+
+	radec = np.full((len(sci_dds), 2), np.nan)
+	for idx, sci_dd in enumerate(sci_dds):
+		ra = getattr(sci_dd, "_ra", None)
+		if ra is not None:
+			radec[idx] = (ra, sci_dd._dec)
+	mask = np.isnan(radec).any(axis=1)
+
+	coordinates = SkyCoord(ra=radec[:,0]*u.deg, dec=radec[:,1]*u.deg)
+	return SkyPositions(coordinates=coordinates, radec=radec, mask=mask)
@@ -0,0 +1,173 @@
+'''
+Fill the resolver cache ahead of time from a manifest of SciDDs or bare filenames.
+
+	python -m scidd.astro.prewarm manifest.txt [--column scidd] [--workers 8] [--chunk-size 100]
+
+(also installed as the ``scidd-astro-prewarm`` command)
+'''
+
+import sys
+import time
+import pathlib
+import logging
+import argparse
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, List, NamedTuple, Tuple, Union
+
+from .astro_resolver import SciDDAstroResolver, filename_cache_key
+from .bulk import _resolve_entries
+from .manifest import manifest_lookup, read_manifest
+
+logger = logging.getLogger("scidd.astro")
+
+class PrewarmReport(NamedTuple):
+	'''
+	The outcome of :py:func:`prewarm`.
+
+	Entries that failed are not cached and are tried again the next time the manifest is prewarmed;
+	``failures`` holds (entry, error message) pairs for the first of them.
+	'''
+	total: int # entries read from the manifest
+	skipped: int # already in the cache
+	resolved: int # found and cached
+	not_found: int # not found; recorded as a negative result
+	failed: int # the lookup failed
+	elapsed: float # seconds
+	failures: List[Tuple[str,str]]
+
+	@property
+	def throughput(self) -> float:
+		''' Entries looked up per second (excluding those skipped). '''
+		return (self.resolved + self.not_found + self.failed) / self.elapsed if self.elapsed > 0 else 0.0
+
+	def __str__(self) -> str:
+		lines = [f"{self.total} entries in {self.elapsed:.1f} s ({self.throughput:,.1f} lookups/s): "
+				 f"{self.skipped} already cached, {self.resolved} resolved, {self.not_found} not found, {self.failed} failed"]
+		lines.extend(f"  {entry}: {error}" for entry, error in self.failures)
+		return "\n".join(lines)
+
+class _Tally:
+	''' Thread-safe counts of a prewarm run. '''
+	def __init__(self, max_failures:int):
+		self.counts = dict(total=0, skipped=0, resolved=0, not_found=0, failed=0)
+		self.failures = list()
+		self.max_failures = max_failures
+		self.start = time.monotonic()
+		self.lock = threading.Lock()
+
+	def add(self, name:str, entry:str=None, error:Exception=None):
+		with self.lock:
+			self.counts[name] += 1
+			if error is not None and len(self.failures) < self.max_failures:
+				self.failures.append((entry, f"{error.__class__.__name__}: {error}"))
+
+	def report(self) -> PrewarmReport:
+		with self.lock:
+			return PrewarmReport(elapsed=time.monotonic() - self.start, failures=list(self.failures), **self.counts)
+
+def prewarm(manifest:Union[str,pathlib.Path,Iterable[str]], resolver:SciDDAstroResolver=None, workers:int=8, chunk_size:int=None,
+			column:str=None, progress:Callable[[PrewarmReport],None]=None, max_failures:int=1000) -> PrewarmReport:
+	'''
+	Resolve every entry of a manifest so that the results are in the resolver cache.
+
+	Entries may be SciDDs or bare filenames. Entries already in the cache (including known negative results)
+	are skipped, so an interrupted run can be restarted with the same manifest and continues where it left off.
+	The rest are looked up in batches of ``chunk_size`` entries, ``workers`` batches at a time, the same way
+	:py:func:`scidd.astro.bulk.resolve_manifest` does: grouped by dataset and release into bulk queries (see
+	:py:meth:`SciDDAstroResolver.bulkFilenameResolver`). The manifest is read as it is processed.
+
+	:param manifest: a manifest file (see :py:func:`scidd.astro.manifest.read_manifest`) or an iterable of entries
+	:param resolver: the resolver whose cache to fill; defaults to :py:meth:`SciDDAstroResolver.defaultResolver`
+	:param workers: the number of batches looked up at the same time
+	:param chunk_size: the maximum number of entries per batch and filenames per query; defaults to the batch size of each dataset
+						 (batches of 100 entries)
+	:param column: the column of a CSV or Parquet manifest holding the entries
+	:param progress: a callable that is passed a :py:class:`PrewarmReport` of the run so far after each query
+	:param max_failures: the maximum number of failures listed in the report (all are counted)
+	:raises ValueError: if the resolver's cache is disabled
+	'''
+	if resolver is None:
+		resolver = SciDDAstroResolver.defaultResolver()
+	if not resolver.useCache:
+		raise ValueError("The cache of the resolver is disabled (see SCIDD_USE_CACHE); there is nothing to prewarm.")
+	if isinstance(manifest, (str, pathlib.Path)):
+		manifest = read_manifest(manifest, column=column)
+
+	tally = _Tally(max_failures)
+	batch_size = chunk_size or 100
+
+	def lookup(entries:List[str]):
+		for entry, result in zip(entries, _resolve_entries(resolver, entries, chunk_size=chunk_size)):
+			if isinstance(result, Exception):
+				tally.add("failed", entry, result)
+			else:
+				tally.add("resolved" if len(result) > 0 else "not_found")
+
+	with ThreadPoolExecutor(max_workers=workers) as executor:
+		pending = set()
+
+		def submit(entries:List[str]):
+			# bound the number of queued lookups so the manifest is read only as fast as it is processed
+			nonlocal pending
+			while len(pending) >= 2 * workers:
+				done, pending = wait(pending, return_when=FIRST_COMPLETED)
+				_finished(done)
+			pending.add(executor.submit(lookup, entries))
+
+		def _finished(futures):
+			for future in futures:
+				future.result() # errors are tallied in the tasks; anything raised here is a bug
+				if progress is not None:
+					progress(tally.report())
+
+		batch = dict() # key: cache key, value: entry
+		for entry in manifest:
+			tally.add("total")
+			try:
+				dataset, release, filename, uniqueid = manifest_lookup(entry)
+			except Exception as e:
+				tally.add("failed", entry, e)
+				continue
+
+			key = filename_cache_key(dataset=dataset, release=release, filename=filename, uniqueid=uniqueid)
+			if key in batch or resolver.cache.isCached(key):
+				tally.add("skipped") # already cached, or a duplicate of an entry already queued
+				continue
+			batch[key] = entry
+			if len(batch) >= batch_size:
+				submit(list(batch.values()))
+				batch = dict()
+
+		if batch:
+			submit(list(batch.values()))
+
+		done, _ = wait(pending)
+		_finished(done)
+
+	report = tally.report()
+	logger.info(str(report))
+	return report
+
+def main(argv:List[str]=None):
+	parser = argparse.ArgumentParser(description="Fill the SciDD resolver cache from a manifest of SciDDs or filenames.")
+	parser.add_argument("manifest", type=pathlib.Path, help="a text (one entry per line), CSV or Parquet file")
+	parser.add_argument("--column", help="the column of a CSV or Parquet file holding the entries")
+	parser.add_argument("--workers", type=int, default=8, help="the number of queries made at the same time")
+	parser.add_argument("--chunk-size", type=int, default=None, help="the maximum number of filenames per query")
+	parser.add_argument("--quiet", action="store_true", help="don't report progress")
+	args = parser.parse_args(argv)
+
+	def show(report:PrewarmReport):
+		print(f"\r{report.total} read, {report.skipped} cached, {report.resolved} resolved, "
+			  f"{report.not_found} not found, {report.failed} failed ({report.throughput:,.1f}/s)", end="", file=sys.stderr)
+
+	report = prewarm(args.manifest, workers=args.workers, chunk_size=args.chunk_size, column=args.column,
+					 progress=None if args.quiet else show, max_failures=100)
+	if not args.quiet:
+		print(file=sys.stderr)
+	print(report)
+	return 1 if report.failed > 0 else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,153 @@
+
+import logging
+import importlib
+import threading
+from typing import Callable, Dict, List, Union
+
+logger = logging.getLogger("scidd.astro")
+
+ENTRY_POINT_GROUP = "scidd.astro.datasets"
+
+# built-in datasets; the modules are only imported when the dataset is first used
+_builtin_datasets = {
+	"galex" : "scidd.astro.dataset.galex:GALEXResolver",
+	"wise"  : "scidd.astro.dataset.wise:WISEResolver",
+	"2mass" : "scidd.astro.dataset.twomass:TwoMASSResolver",
+	"sdss"  : "scidd.astro.dataset.sdss:SDSSResolver"
+}
+
+def _load_reference(reference:str) -> Callable:
+	'''
+	Import and return the object named by a ``"package.module:attribute"`` string.
+	'''
+	module_name, _, attribute = reference.partition(":")
+	obj = importlib.import_module(module_name)
+	for name in attribute.split("."):
+		obj = getattr(obj, name)
+	return obj
+
+def _entry_points(group:str) -> list:
+	'''
+	Returns the entry points installed in the given group.
+	'''
+	try:
+		from importlib.metadata import entry_points
+	except ImportError: # Python < 3.8
+		try:
+			import pkg_resources
+		except ImportError:
+			return list()
+		return list(pkg_resources.iter_entry_points(group))
+	eps = entry_points()
+	if hasattr(eps, "select"): # Python >= 3.10
+		return list(eps.select(group=group))
+	return list(eps.get(group, []))
+
+class DatasetRegistry:
+	'''
+	A table of the dataset resolvers, keyed by the short name of the dataset (e.g. "galex").
+
+	A dataset is registered with a reference to its resolver: a ``"package.module:Class"`` string, the
+	resolver class (or any callable returning a resolver), or a resolver object. The reference is only
+	loaded the first time the dataset is looked up, and the resolver object is kept, so looking up a
+	dataset is a single dictionary access after that.
+
+	Datasets can be added by other packages without changing this one by declaring an entry point in the
+	``scidd.astro.datasets`` group, named after the dataset short name, e.g. in ``setup.py``::
+
+		entry_points={"scidd.astro.datasets" : ["panstarrs = my_package.panstarrs:PanSTARRSResolver"]}
+
+	Installed entry points are read the first time a dataset is not found among the registered ones.
+	They do not replace a dataset that is already registered.
+	'''
+	def __init__(self, datasets:Dict[str,Union[str,Callable]]=None, entry_point_group:str=ENTRY_POINT_GROUP):
+		self._references = dict(datasets or dict())
+		self._resolvers = dict() # key: dataset short name, value: resolver object
+		self.entry_point_group = entry_point_group
+		self._entry_points_loaded = entry_point_group is None
+		self._lock = threading.RLock()
+
+	def register(self, dataset:str, resolver:Union[str,Callable,object]):
+		'''
+		Register the resolver for a dataset, replacing any registered before.
+
+		:param dataset: the short name of the dataset
+		:param resolver: a ``"package.module:Class"`` string, a class or callable returning the resolver, or a resolver object
+		'''
+		with self._lock:
+			self._references[dataset] = resolver
+			self._resolvers.pop(dataset, None)
+
+	def unregister(self, dataset:str):
+		''' Remove a dataset from the registry. '''
+		with self._lock:
+			self._references.pop(dataset, None)
+			self._resolvers.pop(dataset, None)
+
+	def __getitem__(self, dataset:str):
+		try:
+			return self._resolvers[dataset]
+		except KeyError:
+			pass
+		resolver = self.get(dataset)
+		if resolver is None:
+			raise NotImplementedError(f"The dataset '{dataset}' does not currently have a resolver associated with it.")
+		return resolver
+
+	def __contains__(self, dataset:str) -> bool:
+		return self.get(dataset) is not None
+
+	def get(self, dataset:str, default=None):
+		'''
+		Returns the resolver for the given dataset, or ``default`` if no resolver is registered.
+		'''
+		try:
+			return self._resolvers[dataset]
+		except KeyError:
+			pass
+
+		with self._lock:
+			if dataset in self._resolvers:
+				return self._resolvers[dataset]
+			if dataset not in self._references:
+				self._loadEntryPoints()
+			if dataset not in self._references:
+				return default
+
+			reference = self._references[dataset]
+			if isinstance(reference, str):
+				reference = _load_reference(reference)
+			elif hasattr(reference, "load") and hasattr(reference, "group"): # an entry point
+				reference = reference.load()
+			resolver = reference() if callable(reference) else reference
+			logger.debug(f"loaded resolver for dataset '{dataset}': {resolver.__class__.__name__}")
+			self._resolvers[dataset] = resolver
+			return resolver
+
+	@property
+	def datasets(self) -> List[str]:
+		''' The short names of all registered datasets, including those declared by installed entry points. '''
+		with self._lock:
+			self._loadEntryPoints()
+			return sorted(self._references.keys())
+
+	def _loadEntryPoints(self):
+		'''
+		Add the datasets declared by installed packages (once).
+		'''
+		if self._entry_points_loaded:
+			return
+		self._entry_points_loaded = True
+		for entry_point in _entry_points(self.entry_point_group):
+			if entry_point.name in self._references:
+				logger.debug(f"entry point '{entry_point.name}' ignored; the dataset is already registered")
+				continue
+			self._references[entry_point.name] = entry_point
+
+dataset_registry = DatasetRegistry(datasets=_builtin_datasets)
+
+def register_dataset(dataset:str, resolver:Union[str,Callable,object]):
+	'''
+	Register the resolver for a dataset in the default registry; see :py:meth:`DatasetRegistry.register`.
+	'''
+	dataset_registry.register(dataset, resolver)
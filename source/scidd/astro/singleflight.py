@@ -0,0 +1,68 @@
+
+import logging
+import threading
+from typing import Any, Callable, Hashable, Tuple
+
+logger = logging.getLogger("scidd.astro")
+
+class _Call:
+	''' A call in progress and, once finished, its outcome. '''
+	__slots__ = ("done", "result", "error")
+
+	def __init__(self):
+		self.done = threading.Event()
+		self.result = None
+		self.error = None
+
+class SingleFlight:
+	'''
+	Merges concurrent calls that have the same key into one (request coalescing).
+
+	The first thread to call :py:meth:`do` with a key runs the function; threads calling with the same key
+	while it runs wait for it to finish and receive the same result, or have the same exception raised.
+	Once the call has finished, the next call with that key runs the function again.
+	'''
+	def __init__(self):
+		self._calls = dict() # key: call key, value: _Call
+		self._lock = threading.Lock()
+		self.merged = 0 # the number of calls that were served by another call in flight
+
+	def do(self, key:Hashable, function:Callable, *args, **kwargs) -> Tuple[Any,bool]:
+		'''
+		Call ``function(*args, **kwargs)`` unless a call with the same key is in flight, in which case wait for its result.
+
+		:param key: calls with equal keys are merged
+		:param function: the function to call
+		:returns: the value returned by the function, and 'True' if this call ran it ('False' if it was merged with a call in flight)
+		'''
+		with self._lock:
+			call = self._calls.get(key)
+			if call is None:
+				call = _Call()
+				self._calls[key] = call
+				leader = True
+			else:
+				self.merged += 1
+				leader = False
+
+		if not leader:
+			logger.debug(f"merged with in-flight request for '{key}'")
+			call.done.wait()
+			if call.error is not None:
+				raise call.error
+			return call.result, False
+
+		try:
+			call.result = function(*args, **kwargs)
+		except BaseException as e:
+			call.error = e
+			raise
+		finally:
+			with self._lock:
+				del self._calls[key]
+			call.done.set()
+		return call.result, True
+
+	def __len__(self) -> int:
+		''' The number of calls in flight. '''
+		return len(self._calls)
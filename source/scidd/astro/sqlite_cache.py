@@ -0,0 +1,134 @@
+
+import os
+import json
+import time
+import zlib
+import pathlib
+import logging
+import threading
+from collections.abc import MutableMapping
+from typing import Iterator, Union
+
+logger = logging.getLogger("scidd.astro")
+
+class ShardedSQLiteCache(MutableMapping):
+	'''
+	A persistent key-value store split across several SQLite databases, safe to share between many processes.
+
+	Each key is stored in one of ``shards`` databases chosen by a hash of the key, so writers of different keys
+	rarely wait on the same lock. The databases are in WAL mode: readers never block and are never blocked by
+	writers, and a write only locks its own shard for the duration of a single-row transaction. A process that
+	dies mid-write can't corrupt the store; the transaction is rolled back the next time the shard is opened.
+
+	Values may be strings or bytes and are returned with the same type. Connections are opened per thread
+	and per process (a forked worker opens its own), so an instance can be shared by threads and inherited
+	by worker processes.
+
+	The number of shards is fixed when the directory is first created and recorded in it; a different value
+	passed later is ignored. The directory must be on a local file system (SQLite locking is unreliable on
+	network file systems).
+
+	:param path: the directory holding the shard databases; created if needed
+	:param shards: the number of databases to split keys across
+	:param timeout: the number of seconds a writer waits for a locked shard before failing
+	'''
+	METADATA = "shards.json"
+
+	def __init__(self, path:Union[str,pathlib.Path], shards:int=16, timeout:float=30.0):
+		self.path = pathlib.Path(path).expanduser()
+		self.timeout = timeout
+		self.path.mkdir(parents=True, exist_ok=True)
+		self.shards = self._shardCount(int(shards))
+		self._local = threading.local()
+
+	def _shardCount(self, shards:int) -> int:
+		''' Returns the number of shards recorded in the directory, recording the given number if there is none. '''
+		metadata = self.path / self.METADATA
+		if not metadata.exists():
+			temporary = self.path / f".{self.METADATA}.{os.getpid()}"
+			temporary.write_text(json.dumps({"shards" : shards}))
+			os.replace(temporary, metadata) # atomic; every process then reads the same file
+		recorded = json.loads(metadata.read_text())["shards"]
+		if recorded != shards:
+			logger.debug(f"using the {recorded} shards of the existing cache in '{self.path}' (not {shards})")
+		return recorded
+
+	def _connections(self) -> list:
+		local = self._local
+		if getattr(local, "pid", None) != os.getpid():
+			# never reuse a connection opened in a parent process
+			local.pid = os.getpid()
+			local.connections = [None] * self.shards
+		return local.connections
+
+	def _connection(self, key:str) -> "sqlite3.Connection":
+		return self._shard(zlib.crc32(key.encode("utf-8")) % self.shards)
+
+	def _shard(self, index:int) -> "sqlite3.Connection":
+		connections = self._connections()
+		connection = connections[index]
+		if connection is None:
+			connection = self._open(self.path / f"shard-{index:03d}.sqlite")
+			connections[index] = connection
+		return connection
+
+	def _open(self, filename:pathlib.Path) -> "sqlite3.Connection":
+		import sqlite3
+		connection = sqlite3.connect(str(filename), timeout=self.timeout, isolation_level=None, check_same_thread=False)
+		deadline = time.monotonic() + self.timeout
+		while True:
+			try:
+				# switching to WAL needs a brief exclusive lock the busy timeout doesn't cover; it's recorded in the file, so only the first open does it
+				connection.execute("PRAGMA journal_mode=WAL")
+				break
+			except sqlite3.OperationalError:
+				if time.monotonic() > deadline:
+					raise
+				time.sleep(0.01)
+		connection.execute("PRAGMA synchronous=NORMAL") # durable across process crashes; a power loss may drop the last writes
+		connection.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB) WITHOUT ROWID")
+		return connection
+
+	def __getitem__(self, key:str):
+		row = self._connection(key).execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+		if row is None:
+			raise KeyError(key)
+		return row[0]
+
+	def __setitem__(self, key:str, value:Union[str,bytes]):
+		if not isinstance(value, (str, bytes, bytearray, memoryview)):
+			raise TypeError(f"Only strings and bytes can be stored, not '{type(value).__name__}'.")
+		if not isinstance(value, str):
+			value = bytes(value) # stored as a BLOB
+		self._connection(key).execute("INSERT OR REPLACE INTO cache (key, value) VALUES (?, ?)", (key, value))
+
+	def __delitem__(self, key:str):
+		if self._connection(key).execute("DELETE FROM cache WHERE key = ?", (key,)).rowcount == 0:
+			raise KeyError(key)
+
+	def __contains__(self, key) -> bool:
+		return isinstance(key, str) and self._connection(key).execute("SELECT 1 FROM cache WHERE key = ?", (key,)).fetchone() is not None
+
+	def __iter__(self) -> Iterator[str]:
+		for index in range(self.shards):
+			# read each shard's keys at once so the caller may modify the cache while iterating
+			yield from [row[0] for row in self._shard(index).execute("SELECT key FROM cache")]
+
+	def __len__(self) -> int:
+		return sum(self._shard(index).execute("SELECT COUNT(*) FROM cache").fetchone()[0] for index in range(self.shards))
+
+	def vacuum(self):
+		'''
+		Reclaim the disk space of deleted entries; each shard is locked while it is rebuilt.
+		'''
+		for index in range(self.shards):
+			self._shard(index).execute("VACUUM")
+
+	def close(self):
+		'''
+		Close the connections opened by the calling thread; they are reopened as needed.
+		'''
+		for index, connection in enumerate(self._connections()):
+			if connection is not None:
+				connection.close()
+				self._local.connections[index] = None
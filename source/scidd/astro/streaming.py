@@ -0,0 +1,134 @@
+
+import io
+import os
+import bz2
+import gzip
+import shutil
+import logging
+import pathlib
+import tarfile
+import zipfile
+import tempfile
+from typing import BinaryIO, Union
+
+from .parser import compression_extension
+from .transport import HTTPTransport
+
+logger = logging.getLogger("scidd.astro")
+
+_default_transport = None
+
+class _ResponseStream(io.RawIOBase):
+	'''
+	A read-only stream over a decompressor that closes the HTTP response with it.
+	'''
+	def __init__(self, stream:BinaryIO, response):
+		self._stream = stream
+		self._response = response
+
+	def readable(self) -> bool:
+		return True
+
+	def readinto(self, buffer) -> int:
+		data = self._stream.read(len(buffer))
+		buffer[:len(data)] = data
+		return len(data)
+
+	def close(self):
+		if not self.closed:
+			try:
+				self._stream.close()
+			finally:
+				self._response.close()
+		super().close()
+
+def _decompressor(fileobj:BinaryIO, ext:str, streaming:bool) -> BinaryIO:
+	'''
+	Wraps a file object in a reader that returns the decompressed data of its first file.
+	'''
+	if ext == ".gz":
+		return gzip.GzipFile(fileobj=fileobj, mode="rb")
+	elif ext == ".bz2":
+		return bz2.BZ2File(fileobj, mode="rb")
+	elif ext == ".tgz":
+		archive = tarfile.open(fileobj=fileobj, mode="r|gz" if streaming else "r:gz")
+		for member in archive:
+			if member.isfile():
+				return archive.extractfile(member)
+		raise ValueError("The archive does not contain any files.")
+	elif ext == ".zip":
+		if streaming:
+			# the index of a zip file is at the end
+			raise ValueError("Zip files cannot be decompressed while downloading; download the file first.")
+		archive = zipfile.ZipFile(fileobj)
+		return archive.open(archive.namelist()[0])
+	return fileobj
+
+def open_stream(url:str, transport:HTTPTransport=None, buffer_size:int=1024*1024) -> BinaryIO:
+	'''
+	Open a URL as a stream that is decompressed while it downloads; nothing is written to disk.
+
+	Files compressed with gzip (".gz", ".tgz") or bzip2 (".bz2") are decompressed on the fly. Zip
+	files cannot be read before they are complete and raise a ``ValueError``.
+
+	:param url: the URL of the file
+	:param transport: the HTTP transport to use; a shared pooled transport is used if not provided
+	:param buffer_size: the size of the read buffer of the returned stream
+	:returns: a binary file object; close it to release the connection
+	'''
+	global _default_transport
+	if transport is None:
+		if _default_transport is None:
+			_default_transport = HTTPTransport(timeout=(10.0, 60.0))
+		transport = _default_transport
+
+	ext = compression_extension(url)
+	response = transport.get(url, stream=True)
+	response.raise_for_status()
+
+	# Some servers send ".gz" files with "Content-Encoding: gzip"; the content is then only decompressed once.
+	# Any other transfer encoding is removed by the transport.
+	content_encoding = response.headers.get("Content-Encoding", "").lower()
+	response.raw.decode_content = not (ext in [".gz", ".tgz"] and content_encoding in ["gzip", "x-gzip"])
+
+	try:
+		stream = _decompressor(response.raw, ext, streaming=True)
+	except Exception:
+		response.close()
+		raise
+	return io.BufferedReader(_ResponseStream(stream, response), buffer_size=buffer_size)
+
+def uncompressed_path(path:Union[str,pathlib.Path], chunk_size:int=16*1024*1024) -> pathlib.Path:
+	'''
+	Returns the path of an uncompressed copy of a compressed file, decompressing it only the first time.
+
+	The copy (a "sidecar") is written next to the compressed file with the compression extension removed,
+	e.g. ``image.fits.gz`` -> ``image.fits``. It is written to a temporary file and renamed into place so that
+	a partial copy is never seen. The data are copied in chunks so memory use does not depend on the file size.
+	The uncompressed copy can be memory mapped, e.g. ``astropy.io.fits.open(path, memmap=True)``.
+	Paths of files that are not compressed are returned unchanged.
+
+	:param path: the path of the (possibly) compressed file
+	:param chunk_size: the number of bytes decompressed at a time
+	'''
+	path = pathlib.Path(path)
+	ext = compression_extension(path.name)
+	if ext is None:
+		return path
+
+	sidecar = path.with_name(path.name[:-len(ext)])
+	if sidecar.exists() and sidecar.stat().st_mtime >= path.stat().st_mtime:
+		return sidecar
+
+	logger.debug(f"decompressing '{path}' -> '{sidecar}'")
+	fd, temporary = tempfile.mkstemp(dir=str(path.parent), prefix=f".{sidecar.name}.", suffix=".tmp")
+	try:
+		with open(path, "rb") as compressed, os.fdopen(fd, "wb") as uncompressed:
+			with _decompressor(compressed, ext, streaming=False) as source:
+				shutil.copyfileobj(source, uncompressed, chunk_size)
+		os.replace(temporary, sidecar)
+	except BaseException:
+		if os.path.exists(temporary):
+			os.remove(temporary)
+		raise
+	return sidecar
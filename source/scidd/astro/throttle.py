@@ -0,0 +1,189 @@
+
+import time
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger("scidd.astro")
+
+class CircuitOpenError(Exception):
+	'''
+	Raised instead of sending a request to a host whose circuit breaker is open (the host recently kept failing).
+
+	:param host: the host requests were not sent to
+	:param retry_after: the number of seconds until a request will be tried again
+	'''
+	def __init__(self, host:str, retry_after:float):
+		super().__init__(f"Requests to '{host}' are paused for {retry_after:.1f} s after repeated failures.")
+		self.host = host
+		self.retry_after = retry_after
+
+def parse_retry_after(value:Optional[str]) -> Optional[float]:
+	'''
+	Returns the number of seconds in a ``Retry-After`` header (either a number of seconds or an HTTP date), or ``None``.
+	'''
+	if not value:
+		return None
+	try:
+		return max(0.0, float(value))
+	except ValueError:
+		pass
+	from email.utils import parsedate_to_datetime
+	try:
+		return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+	except (TypeError, ValueError, IndexError):
+		return None
+
+class TokenBucket:
+	'''
+	A thread-safe token bucket that limits the rate of requests, slowing down when the server pushes back.
+
+	The bucket holds up to ``burst`` tokens and is refilled at the current rate; each request takes one token,
+	waiting for it if necessary. When the server reports it is overloaded (:py:meth:`slowDown`) the rate is halved,
+	down to ``min_rate``, and each successful request raises it again by a small step, up to ``rate``.
+
+	:param rate: the maximum number of requests per second
+	:param burst: the number of requests that may be sent at once after an idle period
+	:param min_rate: the lowest rate the bucket slows down to
+	'''
+	def __init__(self, rate:float, burst:int=None, min_rate:float=None):
+		self.max_rate = float(rate)
+		self.rate = self.max_rate
+		self.min_rate = float(min_rate) if min_rate is not None else self.max_rate / 16
+		self.burst = float(burst if burst is not None else max(1, rate))
+		self._tokens = self.burst
+		self._updated = time.monotonic()
+		self._paused_until = 0.0
+		self._lock = threading.Lock()
+
+	def acquire(self):
+		'''
+		Take a token, waiting until one is available.
+		'''
+		wait = self.tryAcquire()
+		while wait > 0:
+			time.sleep(wait)
+			wait = self.tryAcquire()
+
+	def tryAcquire(self) -> float:
+		'''
+		Take a token if one is available without waiting (e.g. for callers that wait with ``asyncio.sleep``).
+
+		:returns: ``0`` if a token was taken, else the number of seconds to wait before trying again
+		'''
+		with self._lock:
+			now = time.monotonic()
+			if now < self._paused_until:
+				return self._paused_until - now
+			self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+			self._updated = now
+			if self._tokens >= 1:
+				self._tokens -= 1
+				return 0.0
+			return (1 - self._tokens) / self.rate
+
+	def pause(self, seconds:float):
+		'''
+		Send no requests for the given number of seconds (e.g. as asked by a ``Retry-After`` header).
+		'''
+		with self._lock:
+			self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+			self._tokens = 0.0
+			self._updated = self._paused_until
+
+	def slowDown(self):
+		''' Halve the rate (the server is overloaded). '''
+		with self._lock:
+			self.rate = max(self.min_rate, self.rate / 2)
+
+	def speedUp(self):
+		''' Raise the rate a step towards the maximum (a request succeeded). '''
+		if self.rate < self.max_rate:
+			with self._lock:
+				self.rate = min(self.max_rate, self.rate + self.max_rate / 64)
+
+class CircuitBreaker:
+	'''
+	A thread-safe circuit breaker for the requests to one host.
+
+	The circuit is "closed" while requests succeed. After ``failure_threshold`` consecutive failures it "opens":
+	requests fail immediately (see :py:meth:`check`) for ``recovery_time`` seconds, or longer if the server asked
+	for that with ``Retry-After``. Then it is "half-open": a single probe request is let through; if it succeeds
+	the circuit closes, otherwise it opens again.
+
+	:param host: the host the circuit breaker guards (used in messages)
+	:param failure_threshold: the number of consecutive failures that open the circuit
+	:param recovery_time: the number of seconds the circuit stays open before a probe is sent
+	'''
+	CLOSED = "closed"
+	OPEN = "open"
+	HALF_OPEN = "half-open"
+
+	def __init__(self, host:str, failure_threshold:int=5, recovery_time:float=30.0):
+		self.host = host
+		self.failure_threshold = int(failure_threshold)
+		self.recovery_time = float(recovery_time)
+		self.failures = 0 # consecutive
+		self.opened = 0 # number of times the circuit opened
+		self._state = self.CLOSED
+		self._retry_at = 0.0
+		self._probing = False
+		self._lock = threading.Lock()
+
+	@property
+	def state(self) -> str:
+		''' One of "closed", "open" or "half-open". '''
+		with self._lock:
+			if self._state == self.OPEN and time.monotonic() >= self._retry_at:
+				return self.HALF_OPEN
+			return self._state
+
+	def check(self) -> bool:
+		'''
+		Call before sending a request.
+
+		If this returns 'True' the request is the probe of a half-open circuit; call :py:meth:`releaseProbe`
+		once it is over (in a ``finally`` block) so the circuit can't be left waiting for a probe that ended
+		without a success or failure being recorded.
+
+		:returns: 'True' if the request is the probe
+		:raises CircuitOpenError: if the circuit is open, or half-open with a probe already in flight
+		'''
+		with self._lock:
+			if self._state == self.CLOSED:
+				return False
+			now = time.monotonic()
+			if now >= self._retry_at and not self._probing:
+				self._probing = True # this request is the probe
+				return True
+			raise CircuitOpenError(self.host, max(0.0, self._retry_at - now))
+
+	def releaseProbe(self):
+		''' Let another request be the probe (see :py:meth:`check`). '''
+		with self._lock:
+			self._probing = False
+
+	def recordSuccess(self):
+		with self._lock:
+			if self._state != self.CLOSED:
+				logger.info(f"requests to '{self.host}' are succeeding again; circuit closed")
+			self._state = self.CLOSED
+			self.failures = 0
+			self._probing = False
+
+	def recordFailure(self, retry_after:float=None):
+		'''
+		Record a failed request.
+
+		:param retry_after: the number of seconds the server asked clients to wait, if it did
+		'''
+		with self._lock:
+			self.failures += 1
+			if self._state == self.CLOSED and self.failures < self.failure_threshold and retry_after is None:
+				return
+			if self._state == self.CLOSED:
+				self.opened += 1
+				logger.warning(f"{self.failures} failed request(s) to '{self.host}'; pausing requests for {max(self.recovery_time, retry_after or 0):.1f} s")
+			self._state = self.OPEN
+			self._probing = False
+			self._retry_at = time.monotonic() + max(self.recovery_time, retry_after or 0)
@@ -0,0 +1,208 @@
+
+import os
+import logging
+import threading
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+from .throttle import CircuitBreaker, TokenBucket, parse_retry_after
+
+# 'requests' is imported when the first session is created so that importing this module stays cheap
+
+logger = logging.getLogger("scidd.astro")
+
+class HTTPTransport:
+	'''
+	A long-lived HTTP transport that keeps a pool of persistent (keep-alive) connections to the hosts it talks to.
+
+	Creating a new ``requests.Session`` for every call means every call pays for a fresh TCP (and TLS) handshake.
+	This object owns a single session whose connection pool is reused across calls. The underlying ``urllib3``
+	pool is thread-safe, so one transport can be shared by all threads of a process. If the process forks
+	(e.g. ``multiprocessing``), the child creates its own session the first time it is used as sockets
+	must not be shared across processes. The ``requests`` package is only imported when the session is created.
+
+	Requests to each host go through a :py:class:`scidd.astro.throttle.CircuitBreaker`: once a host keeps failing
+	(connection errors, timeouts, 5xx responses), requests to it raise :py:class:`scidd.astro.throttle.CircuitOpenError`
+	immediately instead of waiting out timeouts, until a probe request succeeds. If ``rate_limit`` is set, requests
+	to each host are also limited by a :py:class:`scidd.astro.throttle.TokenBucket` that slows down when the host
+	answers 429 or 503. A ``Retry-After`` header on those responses pauses requests to the host for that long.
+	Both are per process.
+
+	:param pool_size: the maximum number of connections kept open per host
+	:param max_retries: the number of times a failed request is retried (connection errors and the statuses in ``retry_statuses``)
+	:param backoff_factor: the sleep between retries is ``backoff_factor * 2**(retry number - 1)`` seconds
+	:param timeout: per-request timeout in seconds, either a single value or a ``(connect, read)`` tuple
+	:param retry_statuses: HTTP status codes that trigger a retry; 429 and 503 are never retried here, as their
+						   ``Retry-After`` is handled by the circuit breaker and rate limiter instead of by sleeping in the request
+	:param rate_limit: the maximum number of requests per second sent to a host, or ``None`` for no limit
+	:param burst: the number of requests that may be sent to a host at once; defaults to ``rate_limit``
+	:param failure_threshold: the number of consecutive failed requests to a host that opens its circuit; ``0`` to disable the circuit breaker
+	:param recovery_time: the number of seconds an open circuit waits before letting a probe request through
+	'''
+	def __init__(self, pool_size:int=10, max_retries:int=3, backoff_factor:float=0.5,
+				 timeout:Union[float,Tuple[float,float]]=(5.0, 30.0), retry_statuses:Tuple[int]=(502, 504),
+				 rate_limit:float=None, burst:int=None, failure_threshold:int=5, recovery_time:float=30.0):
+		self.pool_size = int(pool_size)
+		self.max_retries = int(max_retries)
+		self.backoff_factor = float(backoff_factor)
+		self.timeout = timeout
+		self.retry_statuses = tuple(status for status in retry_statuses if status not in (429, 503))
+		self.rate_limit = rate_limit
+		self.burst = burst
+		self.failure_threshold = int(failure_threshold)
+		self.recovery_time = float(recovery_time)
+
+		self._breakers = dict() # key: host, value: CircuitBreaker
+		self._buckets = dict() # key: host, value: TokenBucket
+		self._session = None
+		self._session_pid = None
+		self._lock = threading.Lock()
+
+	def _retryPolicy(self) -> "urllib3.util.retry.Retry":
+		''' Returns the ``urllib3`` retry policy used by the connection pool. '''
+		from urllib3.util.retry import Retry
+		kwargs = {
+			"total" : self.max_retries,
+			"connect" : self.max_retries,
+			"read" : self.max_retries,
+			"backoff_factor" : self.backoff_factor,
+			"status_forcelist" : self.retry_statuses,
+			"respect_retry_after_header" : False, # don't sleep inside a request; see _request
+			"raise_on_status" : False # let the caller inspect the final response
+		}
+		try:
+			return Retry(allowed_methods=frozenset(["GET", "HEAD"]), **kwargs)
+		except TypeError:
+			# urllib3 < 1.26
+			return Retry(method_whitelist=frozenset(["GET", "HEAD"]), **kwargs)
+
+	@property
+	def session(self) -> "requests.Session":
+		'''
+		The shared session; created on first use (and again in a forked child process).
+		'''
+		if self._session is None or self._session_pid != os.getpid():
+			with self._lock:
+				if self._session is None or self._session_pid != os.getpid():
+					import requests
+					from requests.adapters import HTTPAdapter
+					session = requests.Session()
+					adapter = HTTPAdapter(pool_connections=self.pool_size,
+										  pool_maxsize=self.pool_size,
+										  max_retries=self._retryPolicy())
+					session.mount("http://", adapter)
+					session.mount("https://", adapter)
+					self._session = session
+					self._session_pid = os.getpid()
+					logger.debug(f"created HTTP session (pool size={self.pool_size})")
+		return self._session
+
+	def get(self, url:str, params:dict=None, headers:Dict[str,str]=None, timeout=None, stream:bool=False) -> "requests.Response":
+		'''
+		Perform a GET request over the pooled connections.
+
+		:param url: the full URL to request
+		:param params: query parameters
+		:param headers: any additional headers to send
+		:param timeout: override the transport's default timeout for this request
+		:param stream: if True, the response body is not read until accessed
+		'''
+		return self._request("get", url, params=params, headers=headers,
+							 timeout=self.timeout if timeout is None else timeout, stream=stream)
+
+	def head(self, url:str, headers:Dict[str,str]=None, timeout=None, allow_redirects:bool=True) -> "requests.Response":
+		'''
+		Perform a HEAD request over the pooled connections.
+
+		:param url: the full URL to request
+		:param headers: any additional headers to send
+		:param timeout: override the transport's default timeout for this request
+		:param allow_redirects: follow redirects to the final location
+		'''
+		return self._request("head", url, headers=headers, allow_redirects=allow_redirects,
+							 timeout=self.timeout if timeout is None else timeout)
+
+	def circuitBreaker(self, url:str) -> Optional[CircuitBreaker]:
+		'''
+		Returns the circuit breaker of the host of the given URL, or ``None`` if the circuit breaker is disabled.
+		'''
+		if self.failure_threshold <= 0:
+			return None
+		host = urlsplit(url).netloc
+		try:
+			return self._breakers[host]
+		except KeyError:
+			with self._lock:
+				return self._breakers.setdefault(host, CircuitBreaker(host, failure_threshold=self.failure_threshold,
+																	  recovery_time=self.recovery_time))
+
+	def rateLimiter(self, url:str) -> Optional[TokenBucket]:
+		'''
+		Returns the rate limiter of the host of the given URL, or ``None`` if requests are not rate limited.
+		'''
+		if self.rate_limit is None:
+			return None
+		host = urlsplit(url).netloc
+		try:
+			return self._buckets[host]
+		except KeyError:
+			with self._lock:
+				return self._buckets.setdefault(host, TokenBucket(self.rate_limit, burst=self.burst))
+
+	def _request(self, method:str, url:str, **kwargs) -> "requests.Response":
+		breaker = self.circuitBreaker(url)
+		probe = breaker.check() if breaker is not None else False # fail fast while the host is down
+		try:
+			return self._send(method, url, breaker, **kwargs)
+		finally:
+			if probe:
+				# the probe may have ended with neither a success nor a failure (e.g. a 429, or an unexpected error)
+				breaker.releaseProbe()
+
+	def _send(self, method:str, url:str, breaker:Optional[CircuitBreaker], **kwargs) -> "requests.Response":
+		bucket = self.rateLimiter(url)
+		if bucket is not None:
+			bucket.acquire()
+
+		import requests
+		try:
+			response = getattr(self.session, method)(url, **kwargs)
+		except requests.exceptions.RequestException:
+			if breaker is not None:
+				breaker.recordFailure()
+			raise
+
+		self._recordStatus(breaker, bucket, response.status_code, response.headers.get("Retry-After"))
+		return response
+
+	@staticmethod
+	def _recordStatus(breaker:Optional[CircuitBreaker], bucket:Optional[TokenBucket], status_code:int, retry_after:Optional[str]):
+		'''
+		Update the circuit breaker and rate limiter of a host with the status of a response it sent.
+
+		:param retry_after: the value of the ``Retry-After`` header of the response, if any
+		'''
+		if status_code == 429 or status_code >= 500:
+			retry_after = parse_retry_after(retry_after)
+			if bucket is not None and status_code in (429, 503):
+				bucket.slowDown()
+				if retry_after is not None:
+					bucket.pause(retry_after)
+			if breaker is not None and (status_code != 429 or bucket is None):
+				# without a rate limiter, a 429 Retry-After is honoured by opening the circuit
+				breaker.recordFailure(retry_after=retry_after)
+		else:
+			if breaker is not None:
+				breaker.recordSuccess()
+			if bucket is not None:
+				bucket.speedUp()
+
+	def close(self):
+		'''
+		Close all pooled connections; a new session is created if the transport is used again.
+		'''
+		with self._lock:
+			if self._session is not None:
+				self._session.close()
+			self._session = None
+			self._session_pid = None
@@ -67,5 +67,14 @@ setup(
 	zip_safe=False,
 	#include_dirs=['trillian/core', 'trillian/dataset'],
 	data_files=data_files,
+	extras_require={
+		"async" : ["aiohttp>=3.7"],
+		"healpix" : ["astropy-healpix>=0.5"],
+		"parquet" : ["pyarrow"]
+	},
+	entry_points={
+		"console_scripts" : ["scidd-astro-prewarm = scidd.astro.prewarm:main",
+							 "scidd-astro-resolve = scidd.astro.bulk:main"]
+	},
 	python_requires='>=3.6'
 )
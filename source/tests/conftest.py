@@ -1,10 +1,24 @@
 
+import sys
 import pytest
 import pathlib
 
 from scidd import SciDDCacheManager
 
+# the stand-in for the resolver API is shared with the benchmarks
+sys.path.insert(0, str(pathlib.Path(__file__).parents[1] / "benchmarks"))
+from fake_api import FakeAPIServer
+
 @pytest.fixture
 def temporary_cache():
 	temporary_cache = SciDDCacheManager(path=pathlib.Path(__file__).parent / "scidd_test_cache")
 	return temporary_cache
+
+@pytest.fixture
+def local_api():
+	'''
+	A local HTTP server standing in for the resolver API; see `FakeAPIServer` in benchmarks/fake_api.py.
+	'''
+	server = FakeAPIServer().start()
+	yield server
+	server.stop()
@@ -0,0 +1,144 @@
+
+import json
+import pytest
+import itertools
+import threading
+
+from scidd.astro import SciDDAstroResolver
+from scidd.astro import bulk
+from scidd.astro.bulk import iter_resolve, resolve_manifest
+from scidd.astro.cache import ResolverCache
+
+def _record(dataset, release, filename):
+	return {
+		"scidd" : f"scidd:/astro/file/{dataset}/{release}/{filename}",
+		"url" : f"http://example.org/{dataset}/{release}/{filename}.gz",
+		"dataset" : dataset,
+		"release" : release,
+		"file_size" : None,
+		"position" : None
+	}
+
+@pytest.fixture
+def resolver(local_api, monkeypatch):
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+	resolver.cache = ResolverCache(persistent=dict())
+	return resolver
+
+def test_resolve_manifest_in_order(local_api, monkeypatch, tmp_path):
+	'''
+	Test that a manifest resolved by worker processes is written in input order and shares the persistent cache.
+	'''
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	local_api.respondWithRecords([_record("galex", "gr6", f"{i}.fits") for i in range(0, 20, 2)])
+	entries = [f"scidd:/astro/file/galex/gr6/{i}.fits" for i in range(20)]
+	options = {"scheme" : "http", "host" : "127.0.0.1", "port" : local_api.port}
+
+	summary = resolve_manifest(entries, tmp_path / "out.jsonl", workers=2, chunk_size=3, cache_dir=tmp_path / "cache", resolver_options=options)
+
+	assert (summary.total, summary.resolved, summary.not_found, summary.failed) == (20, 10, 10, 0)
+	lines = [json.loads(line) for line in (tmp_path / "out.jsonl").read_text().splitlines()]
+	assert [line["entry"] for line in lines] == entries
+	assert lines[2]["records"][0]["scidd"] == "scidd:/astro/file/galex/gr6/2.fits"
+	assert lines[3]["records"] == []
+	requests = len(local_api.requests)
+
+	resolve_manifest(entries, tmp_path / "out.jsonl", workers=2, chunk_size=3, cache_dir=tmp_path / "cache", resolver_options=options)
+	assert len(local_api.requests) == requests
+
+def test_iter_resolve_backpressure(local_api, resolver):
+	'''
+	Test that an unbounded stream is resolved in order without reading more than the lookahead ahead of the caller.
+	'''
+	local_api.respondWithRecords([_record("galex", "gr6", f"{i}.fits") for i in range(0, 40, 2)])
+	read = list()
+	def stream():
+		for i in itertools.count():
+			read.append(i)
+			yield f"scidd:/astro/file/galex/gr6/{i}.fits"
+
+	results = iter_resolve(stream(), resolver=resolver, lookahead=10, chunk_size=5, workers=2)
+	taken = list(itertools.islice(results, 25))
+	results.close()
+
+	assert [entry for entry, _ in taken] == [f"scidd:/astro/file/galex/gr6/{i}.fits" for i in range(25)]
+	assert taken[4][1][0]["scidd"] == "scidd:/astro/file/galex/gr6/4.fits"
+	assert taken[5][1] == []
+	assert len(read) <= 25 + 10
+
+def test_iter_resolve_idle_source(local_api, resolver):
+	'''
+	Test that results are yielded while the source is waiting for more entries, and that errors of the source are raised.
+	'''
+	local_api.respondWithRecords([_record("galex", "gr6", "a.fits")])
+	more = threading.Event()
+	def stream():
+		yield "scidd:/astro/file/galex/gr6/a.fits"
+		more.wait(10) # the source is idle
+		raise RuntimeError("the source failed")
+
+	results = iter_resolve(stream(), resolver=resolver, chunk_size=100, flush_after=0.05)
+	entry, records = next(results)
+
+	assert records[0]["scidd"] == "scidd:/astro/file/galex/gr6/a.fits"
+	more.set()
+	with pytest.raises(RuntimeError):
+		next(results)
+
+def test_resolve_manifest_default_cache_dir(local_api, monkeypatch, tmp_path):
+	'''
+	Test that workers share the cache in SCIDD_ASTRO_CACHE_DIR when no cache directory is given, and that it is kept.
+	'''
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	monkeypatch.setenv("SCIDD_ASTRO_CACHE_DIR", str(tmp_path / "cache"))
+	local_api.respondWithRecords([_record("galex", "gr6", "a.fits")])
+	options = {"scheme" : "http", "host" : "127.0.0.1", "port" : local_api.port}
+
+	summary = resolve_manifest(["a.fits"], tmp_path / "out.jsonl", workers=1, resolver_options=options)
+	requests = len(local_api.requests)
+	resolve_manifest(["a.fits"], tmp_path / "out.jsonl", workers=1, resolver_options=options)
+
+	assert (summary.total, summary.resolved) == (1, 1)
+	assert any((tmp_path / "cache").iterdir())
+	assert len(local_api.requests) == requests
+
+def test_resolve_manifest_temporary_cache(local_api, monkeypatch, tmp_path):
+	'''
+	Test that workers share a temporary cache when asked to, and that it is removed afterwards.
+	'''
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	monkeypatch.setenv("SCIDD_ASTRO_CACHE_DIR", str(tmp_path / "cache"))
+	monkeypatch.setattr(bulk.tempfile, "tempdir", str(tmp_path))
+	local_api.respondWithRecords([_record("galex", "gr6", "a.fits")])
+	options = {"scheme" : "http", "host" : "127.0.0.1", "port" : local_api.port}
+
+	summary = resolve_manifest(["a.fits"], tmp_path / "out.jsonl", workers=1, temporary_cache=True, resolver_options=options)
+
+	assert (summary.total, summary.resolved) == (1, 1)
+	assert [path.name for path in tmp_path.iterdir()] == ["out.jsonl"]
+	with pytest.raises(ValueError):
+		resolve_manifest(["a.fits"], tmp_path / "out.jsonl", cache_dir=tmp_path / "cache", temporary_cache=True)
+
+def test_default_cache_dir(monkeypatch, tmp_path):
+	'''
+	Test that the shared cache defaults to a directory in the SciDD cache when SCIDD_ASTRO_CACHE_DIR isn't set.
+	'''
+	import types
+	import scidd.core
+	monkeypatch.delenv("SCIDD_ASTRO_CACHE_DIR", raising=False)
+	monkeypatch.setattr(scidd.core, "SciDDCacheManager", lambda: types.SimpleNamespace(path=str(tmp_path)))
+
+	assert bulk._default_cache_dir() == tmp_path / "astro" / "resolver"
+
+def test_worker_resolver_keeps_cache_settings(tmp_path):
+	'''
+	Test that the resolver of a worker uses the shared cache directory without losing the cache settings it was given.
+	'''
+	from scidd.astro.sqlite_cache import ShardedSQLiteCache
+
+	bulk._start_worker({"host" : "127.0.0.1", "memory_cache_size" : 5, "negative_cache_ttl" : 7}, str(tmp_path))
+
+	cache = bulk._worker_resolver.cache
+	assert isinstance(cache._persistent, ShardedSQLiteCache)
+	assert (cache.memory.maxsize, cache.negative_ttl) == (5, 7)
@@ -0,0 +1,220 @@
+
+import json
+import pytest
+import multiprocessing
+
+from scidd.astro.cache import MemoryCache, ResolverCache
+from scidd.astro.sqlite_cache import ShardedSQLiteCache
+
+def test_memory_cache_lru_eviction():
+	'''
+	Test that the least recently used entry is evicted when the memory cache is full.
+	'''
+	cache = MemoryCache(maxsize=2, ttl=None)
+	cache["a"] = 1
+	cache["b"] = 2
+	assert cache["a"] == 1 # "b" is now least recently used
+	cache["c"] = 3
+
+	assert "b" not in cache
+	assert cache["a"] == 1 and cache["c"] == 3
+	assert cache.stats["evictions"] == 1
+
+def test_membership_checks_have_no_side_effects():
+	'''
+	Test that checking whether a key is cached doesn't count hits or misses or change which entry is evicted next.
+	'''
+	cache = ResolverCache(persistent=dict(), memory_size=2)
+	cache["a"] = [1]
+	cache["b"] = [2]
+	cache.setNegative("c")
+	stats = cache.stats
+
+	assert "a" in cache.memory and "x" not in cache.memory
+	assert cache.isCached("a") and cache.isCached("c") and not cache.isCached("x")
+	assert cache.stats == stats
+
+	cache["d"] = [4] # "a" is still the least recently used
+	assert "a" not in cache.memory and "b" in cache.memory
+
+def test_memory_cache_ttl(monkeypatch):
+	'''
+	Test that entries expire after the TTL.
+	'''
+	import scidd.astro.cache
+	now = [1000.0]
+	monkeypatch.setattr(scidd.astro.cache.time, "monotonic", lambda: now[0])
+
+	cache = MemoryCache(maxsize=10, ttl=60)
+	cache["a"] = 1
+	now[0] += 61
+	with pytest.raises(KeyError):
+		cache["a"]
+	assert cache.stats["expirations"] == 1
+
+def test_resolver_cache_tiers():
+	'''
+	Test that values are decoded once from the persistent tier and then served from memory.
+	'''
+	persistent = {"key" : json.dumps([{"url" : "http://example.org/a.fits"}])}
+	cache = ResolverCache(persistent=persistent)
+
+	assert cache["key"][0]["url"] == "http://example.org/a.fits"
+	assert cache["key"] is cache["key"]
+	assert cache.stats["persistent_hits"] == 1
+	assert cache.stats["memory_hits"] == 2
+
+	cache["other"] = {"status_code" : 200} # not a list of records
+	assert persistent["other"] == '{"status_code": 200}'
+
+	cache.clearMemory()
+	with pytest.raises(KeyError):
+		cache["missing"]
+	assert cache.stats["persistent_misses"] == 1
+
+def test_negative_results(monkeypatch):
+	'''
+	Test that negative results expire on their own TTL, can be purged, and are counted separately.
+	'''
+	import scidd.astro.cache
+	now = [1000.0]
+	monkeypatch.setattr(scidd.astro.cache.time, "time", lambda: now[0])
+
+	persistent = dict()
+	cache = ResolverCache(persistent=persistent, negative_ttl=60)
+	cache.setNegative("missing")
+	cache.setNegative("other")
+
+	assert cache.isNegative("missing")
+	assert "missing" not in cache # not a positive hit
+	assert cache.stats["negative_hits"] == 1
+	assert cache.stats["memory_hits"] == 0
+
+	# a fresh process sees the persisted negative result
+	assert ResolverCache(persistent=persistent, negative_ttl=60).isNegative("missing")
+
+	now[0] += 61
+	assert not cache.isNegative("missing")
+	assert "negative:missing" not in persistent
+
+	cache.purgeNegative()
+	assert len(persistent) == 0
+
+_RECORDS = [
+	{"scidd" : "scidd:/astro/file/2mass/allsky/ji0270198.fits.gz;uniqueid=20001017.s.27", "url" : "https://irsa.example.org/20001017s/s027/image/ji0270198.fits.gz",
+	 "dataset" : "2mass", "release" : "allsky", "file_size" : None, "position" : [10.5, -5.25]},
+	{"scidd" : "scidd:/astro/file/wise/allsky/01234a123-w1-int-1b.fits", "url" : "https://irsa.example.org/wise/01234a123-w1-int-1b.fits",
+	 "dataset" : "wise", "release" : "allsky", "file_size" : 1234567, "position" : None},
+	{"scidd" : "scidd:/astro/file/galex/gr6/AIS_316_0001_sg65-nd-intbgsub.fits.gz", "url" : "https://galex.example.org/ünïcode/AIS_316.fits.gz",
+	 "dataset" : "galex", "release" : "gr6"}
+]
+
+def test_record_codec_round_trip():
+	'''
+	Test that records are decoded exactly as written and that other values are not encoded.
+	'''
+	from scidd.astro.codec import decode_records, encode_records
+
+	complete = [dict(_RECORDS[1], position=[1.0, 2.0]), dict(_RECORDS[0], file_size=2880)]
+	for records in [_RECORDS, _RECORDS[:2], complete, _RECORDS[:1], []]:
+		encoded = encode_records(records)
+		assert decode_records(encoded) == records
+	assert len(encode_records(_RECORDS)) < len(json.dumps(_RECORDS))
+
+	assert encode_records({"expires" : 1.0}) is None
+	assert encode_records([dict(_RECORDS[1], extra="value")]) is None
+	assert encode_records([dict(_RECORDS[1], file_size="12")]) is None
+
+def test_resolver_cache_migrates_json_entries():
+	'''
+	Test that JSON entries are read and rewritten in the compact form, and that JSON is used if binary values are rejected.
+	'''
+	persistent = {"astro:file/a" : json.dumps(_RECORDS), "astro:file/b" : json.dumps(_RECORDS[:1]), "astro:head/c" : json.dumps({"status_code" : 200})}
+	cache = ResolverCache(persistent=persistent)
+
+	assert cache["astro:file/a"] == _RECORDS
+	assert isinstance(persistent["astro:file/a"], bytes)
+	assert cache.migrate() == 1
+	assert isinstance(persistent["astro:file/b"], bytes)
+	assert isinstance(persistent["astro:head/c"], str)
+	cache.clearMemory()
+	assert cache["astro:file/b"] == _RECORDS[:1]
+
+	class TextOnly(dict):
+		def __setitem__(self, key, value):
+			if not isinstance(value, str):
+				raise TypeError("values must be text")
+			super().__setitem__(key, value)
+	text_cache = ResolverCache(persistent=TextOnly())
+	text_cache["astro:file/a"] = _RECORDS
+	text_cache.clearMemory()
+	assert text_cache["astro:file/a"] == _RECORDS
+
+def test_sharded_sqlite_cache(tmp_path):
+	'''
+	Test that the sharded cache stores text and bytes across shards and keeps the shard count it was created with.
+	'''
+	store = ShardedSQLiteCache(tmp_path / "cache", shards=4)
+	for i in range(100):
+		store[f"key{i}"] = f"value{i}" if i % 2 else f"value{i}".encode()
+	del store["key0"]
+	with pytest.raises(KeyError):
+		store["key0"]
+
+	reopened = ShardedSQLiteCache(tmp_path / "cache", shards=8)
+	assert reopened.shards == 4
+	assert len(reopened) == 99
+	assert reopened["key1"] == "value1" and reopened["key2"] == b"value2"
+	assert "key3" in reopened and "key0" not in reopened
+	assert len(list((tmp_path / "cache").glob("shard-*.sqlite"))) == 4
+
+	cache = ResolverCache(persistent=reopened)
+	cache["astro:file/a"] = _RECORDS
+	cache.clearMemory()
+	assert cache["astro:file/a"] == _RECORDS
+
+def _write_keys(path, worker, count):
+	store = ShardedSQLiteCache(path, shards=4)
+	for i in range(count):
+		store[f"shared{i}"] = f"{worker}"
+		store[f"worker{worker}/{i}"] = f"{i}"
+
+def test_sharded_sqlite_cache_many_processes(tmp_path):
+	'''
+	Test that several processes can write to the same keys at once without losing writes.
+	'''
+	path = tmp_path / "cache"
+	processes = [multiprocessing.get_context("spawn").Process(target=_write_keys, args=(path, worker, 200)) for worker in range(4)]
+	for process in processes:
+		process.start()
+	for process in processes:
+		process.join(60)
+		assert process.exitcode == 0
+
+	store = ShardedSQLiteCache(path)
+	assert len(store) == 200 + 4 * 200
+	assert all(store[f"worker{worker}/199"] == "199" for worker in range(4))
+	assert store["shared0"] in ["0", "1", "2", "3"]
+
+def test_resolver_cache_legacy_filename_keys():
+	'''
+	Test that searches stored under the legacy filename key are found under the current key and that migrate() removes duplicates.
+	'''
+	persistent = {
+		"astro/filename:a.fits" : json.dumps(_RECORDS[:1]),
+		"astro/filename:b.fits" : json.dumps(_RECORDS[:1]),
+		"astro:file/None/None/b.fits" : json.dumps(_RECORDS[:1]),
+		"astro/filename:c.fits" : json.dumps(_RECORDS[1:]),
+		"negative:astro/filename:d.fits" : json.dumps({"expires" : 1e12})
+	}
+	cache = ResolverCache(persistent=persistent)
+
+	assert cache["astro:file/None/None/a.fits"] == _RECORDS[:1]
+	assert "astro/filename:a.fits" not in persistent
+	assert isinstance(persistent["astro:file/None/None/a.fits"], bytes)
+
+	assert cache.migrate() == 4
+	assert sorted(persistent.keys()) == [ResolverCache.MIGRATED_KEY, "astro:file/None/None/a.fits", "astro:file/None/None/b.fits",
+										 "astro:file/None/None/c.fits", "negative:astro:file/None/None/d.fits"]
+	assert cache.isNegative("astro:file/None/None/d.fits")
+	assert not ResolverCache(persistent=persistent).legacyKeys
@@ -0,0 +1,197 @@
+
+import pytest
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scidd.astro import SciDDAstro
+from scidd.astro.download import DownloadManager
+
+class FileServer(ThreadingHTTPServer):
+	'''
+	Serves in-memory files with Range and If-Range support; the first request for a path listed in 'interrupt' is cut off halfway.
+	'''
+	daemon_threads = True
+
+	def __init__(self, files):
+		super().__init__(("127.0.0.1", 0), _FileHandler)
+		self.files = files
+		self.interrupt = set()
+		self.requests = list() # the paths requested
+		self.range_requests = list() # (path, first byte) of the ranges served
+
+	def etag(self, path:str) -> str:
+		return f'"{hash(self.files[path])}"'
+
+class _FileHandler(BaseHTTPRequestHandler):
+	def do_GET(self):
+		self.server.requests.append(self.path)
+		data = self.server.files.get(self.path)
+		if data is None:
+			self.send_error(404)
+			return
+		start = 0
+		if "Range" in self.headers and self.headers.get("If-Range", self.server.etag(self.path)) == self.server.etag(self.path):
+			start = int(self.headers["Range"].split("=")[1].rstrip("-"))
+			if start >= len(data):
+				self.send_response(416)
+				self.send_header("Content-Range", f"bytes */{len(data)}")
+				self.send_header("Content-Length", "0")
+				self.end_headers()
+				return
+			self.server.range_requests.append((self.path, start))
+			self.send_response(206)
+			self.send_header("Content-Range", f"bytes {start}-{len(data)-1}/{len(data)}")
+		else:
+			self.send_response(200)
+		self.send_header("ETag", self.server.etag(self.path))
+		self.send_header("Content-Length", str(len(data) - start))
+		self.end_headers()
+		if self.path in self.server.interrupt:
+			self.server.interrupt.discard(self.path)
+			self.wfile.write(data[start:start + len(data)//2])
+			self.wfile.flush()
+			self.connection.shutdown(2) # drop the connection mid-transfer
+			return
+		self.wfile.write(data[start:])
+
+	def log_message(self, format, *args):
+		pass
+
+@pytest.fixture
+def file_server():
+	files = {f"/galex/f{n}.fits.gz" : bytes([n]) * (100000 + n) for n in range(6)}
+	server = FileServer(files)
+	thread = threading.Thread(target=server.serve_forever, daemon=True)
+	thread.start()
+	yield server
+	server.shutdown()
+	server.server_close()
+
+def _scidds(file_server):
+	sci_dds = list()
+	for path in sorted(file_server.files):
+		sci_dd = SciDDAstro(f"scidd:/astro/file/galex/gr6/{path.split('/')[-1][:-3]}")
+		sci_dd._url = f"http://127.0.0.1:{file_server.server_address[1]}{path}"
+		sci_dds.append(sci_dd)
+	return sci_dds
+
+def test_parallel_download_resumes_interrupted_transfer(file_server, tmp_path):
+	'''
+	Test that files are downloaded in parallel, an interrupted transfer is resumed with a Range request, and no partial files remain.
+	'''
+	file_server.interrupt.add("/galex/f3.fits.gz")
+	reports = list()
+	manager = DownloadManager(directory=tmp_path, workers=4, per_host_connections=2, chunk_size=8192, progress=reports.append)
+
+	results = manager.download(_scidds(file_server))
+
+	assert [r.error for r in results] == [None] * 6
+	for result, path in zip(results, sorted(file_server.files)):
+		assert result.path == tmp_path / "astro" / "galex" / "gr6" / path.split("/")[-1]
+		assert result.path.read_bytes() == file_server.files[path]
+	assert [path for path, _ in file_server.range_requests] == ["/galex/f3.fits.gz"]
+	assert list(tmp_path.rglob("*.part*")) == []
+
+	assert manager.status.files_done == 6
+	assert manager.status.bytes_received == sum(len(data) for data in file_server.files.values())
+	assert reports[-1].throughput > 0
+
+def test_existing_files_are_not_downloaded_again(file_server, tmp_path):
+	'''
+	Test that a second download of the same files transfers nothing.
+	'''
+	manager = DownloadManager(directory=tmp_path, workers=2)
+	manager.download(_scidds(file_server))
+	results = manager.download(_scidds(file_server))
+
+	assert all(r.error is None and r.bytes_received == 0 for r in results)
+
+def test_files_are_written_to_the_scidd_cache(file_server, tmp_path):
+	'''
+	Test that files are written to their location in the SciDD cache, and that a file already cached there is not downloaded.
+	'''
+	sci_dds = _scidds(file_server)[:2]
+	assert sci_dds[0].path_within_cache == "astro/galex/gr6"
+	assert SciDDAstro("scidd:/astro/file/2mass/allsky/ji0270198.fits.gz;uniqueid=20001017.s.27").path_within_cache == "astro/2mass/allsky"
+	cached = tmp_path / "astro" / "galex" / "gr6" / "f0.fits.gz"
+	cached.parent.mkdir(parents=True)
+	cached.write_bytes(file_server.files["/galex/f0.fits.gz"])
+	manager = DownloadManager(directory=tmp_path)
+
+	results = manager.download(sci_dds)
+
+	assert [r.path for r in results] == [cached, tmp_path / "astro" / "galex" / "gr6" / "f1.fits.gz"]
+	assert [r.bytes_received for r in results] == [0, len(file_server.files["/galex/f1.fits.gz"])]
+	assert file_server.requests == ["/galex/f1.fits.gz"]
+
+def _partial_file(tmp_path, file_server, path:str, data:bytes, validator:str=None):
+	''' Leave a partial download of 'path' as an interrupted transfer would. '''
+	part = tmp_path / "astro" / "galex" / "gr6" / (path.split("/")[-1] + ".part")
+	part.parent.mkdir(parents=True, exist_ok=True)
+	part.write_bytes(data)
+	part.with_name(part.name + ".validator").write_text(validator or file_server.etag(path))
+
+def test_changed_resource_is_downloaded_again(file_server, tmp_path):
+	'''
+	Test that a partial file is resumed only if the resource hasn't changed since it was started.
+	'''
+	path = "/galex/f1.fits.gz"
+	old = file_server.files[path]
+	_partial_file(tmp_path, file_server, path, old[:5000])
+	file_server.files[path] = b"new" * 40000
+	manager = DownloadManager(directory=tmp_path, workers=1)
+
+	result = manager.download(_scidds(file_server)[1:2])[0]
+
+	assert result.error is None
+	assert result.path.read_bytes() == file_server.files[path]
+	assert file_server.range_requests == [] # the If-Range didn't match, so the whole file was sent
+
+def test_complete_partial_file_is_checked(file_server, tmp_path):
+	'''
+	Test that a 416 answer only completes a partial file that has the length of the resource.
+	'''
+	path = "/galex/f2.fits.gz"
+	data = file_server.files[path]
+	manager = DownloadManager(directory=tmp_path, workers=1)
+
+	_partial_file(tmp_path, file_server, path, data)
+	result = manager.download(_scidds(file_server)[2:3])[0]
+	assert (result.error, result.bytes_received) == (None, 0)
+	assert result.path.read_bytes() == data
+
+	result.path.unlink()
+	_partial_file(tmp_path, file_server, path, data + b"stale")
+	result = manager.download(_scidds(file_server)[2:3])[0]
+	assert result.error is None
+	assert result.path.read_bytes() == data
+	assert list(tmp_path.rglob("*.part*")) == []
+
+def test_duplicate_destinations_are_downloaded_once(file_server, tmp_path):
+	'''
+	Test that SciDDs written to the same file are downloaded once and all get the result.
+	'''
+	sci_dds = _scidds(file_server)
+	duplicate = SciDDAstro(str(sci_dds[0]))
+	duplicate._url = sci_dds[0]._url
+	manager = DownloadManager(directory=tmp_path, workers=4)
+
+	results = manager.download([sci_dds[0], duplicate, sci_dds[1]])
+
+	assert [r.sci_dd for r in results] == [sci_dds[0], duplicate, sci_dds[1]]
+	assert results[0].path == results[1].path and results[1].error is None
+	assert sorted(file_server.requests) == ["/galex/f0.fits.gz", "/galex/f1.fits.gz"]
+	assert manager.status.files_done == 3
+
+def test_client_errors_are_not_retried(file_server, tmp_path):
+	'''
+	Test that a file that isn't found fails after a single request.
+	'''
+	sci_dd = _scidds(file_server)[0]
+	sci_dd._url = sci_dd._url.replace("f0", "missing")
+	manager = DownloadManager(directory=tmp_path, max_attempts=5)
+
+	result = manager.download([sci_dd])[0]
+
+	assert result.error is not None and result.error.response.status_code == 404
+	assert len(file_server.requests) == 1
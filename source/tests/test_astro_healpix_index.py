@@ -0,0 +1,74 @@
+
+import pytest
+import numpy as np
+
+pytest.importorskip("astropy_healpix")
+
+from scidd.astro.healpix_index import HEALPixIndex
+
+def _records():
+	return [
+		{"scidd" : "scidd:/astro/file/galex/gr6/a.fits", "url" : "http://example.org/a.fits.gz", "dataset" : "galex", "position" : [10.0, 20.0]},
+		{"scidd" : "scidd:/astro/file/wise/allsky/b.fits", "url" : "http://example.org/b.fits", "dataset" : "wise", "position" : [10.5, 20.0]},
+		{"scidd" : "scidd:/astro/file/galex/gr6/c.fits", "url" : "http://example.org/c.fits.gz", "dataset" : "galex", "position" : [200.0, -45.0]},
+		{"scidd" : "scidd:/astro/file/galex/gr6/d.fits", "url" : "http://example.org/d.fits.gz", "dataset" : "galex", "position" : None},
+		{"scidd" : "scidd:/astro/file/sdss/dr16/e.fits", "url" : "http://example.org/e.fits", "dataset" : "sdss", "position" : [359.9, 20.0]}
+	]
+
+def test_cone_search():
+	'''
+	Test that a cone search returns the files within the radius sorted by distance.
+	'''
+	index = HEALPixIndex(nside=32)
+	assert index.insertRecords(_records()) == 4
+
+	result = index.coneSearch(10.4, 20.0, 1.0)
+	assert result.scidds.tolist() == ["scidd:/astro/file/wise/allsky/b.fits", "scidd:/astro/file/galex/gr6/a.fits"]
+	assert np.all(np.diff(result.separation) >= 0)
+
+	assert index.coneSearch(10.4, 20.0, 1.0, datasets=["galex"]).scidds.tolist() == ["scidd:/astro/file/galex/gr6/a.fits"]
+
+	# across RA = 0
+	assert index.coneSearch(0.1, 20.0, 0.5).scidds.tolist() == ["scidd:/astro/file/sdss/dr16/e.fits"]
+
+def test_incremental_insert_and_persistence(tmp_path):
+	'''
+	Test that files inserted after a search are found, duplicates are ignored, and the index round trips to disk.
+	'''
+	index = HEALPixIndex(nside=32)
+	index.insertRecords(_records()[:1])
+	assert len(index.coneSearch(200.0, -45.0, 1.0).scidds) == 0
+
+	index.insertRecords(_records())
+	assert len(index) == 4
+	assert index.coneSearch(200.0, -45.0, 1.0).urls.tolist() == ["http://example.org/c.fits.gz"]
+
+	index.save(tmp_path / "index.npz")
+	loaded = HEALPixIndex.load(tmp_path / "index.npz")
+	assert len(loaded) == 4
+	assert loaded.coneSearch(10.0, 20.0, 0.1).scidds.tolist() == ["scidd:/astro/file/galex/gr6/a.fits"]
+	assert loaded.insertRecords(_records()) == 0
+
+def test_cone_search_near_the_edge():
+	'''
+	Test that files near the edge of the cone are found in pixels that overlap the cone but whose centers lie outside it.
+	'''
+	from scidd.astro.healpix_index import _angular_separation
+
+	rng = np.random.default_rng(42)
+	center = (359.70, -57.40)
+	radius = 0.1146
+	# positions just inside and just outside the cone, all around it
+	angle = rng.uniform(0, 2*np.pi, 3000)
+	distance = radius * rng.uniform(0.9, 1.1, 3000)
+	dec = center[1] + distance * np.sin(angle)
+	ra = (center[0] + distance * np.cos(angle) / np.cos(np.radians(center[1]))) % 360
+
+	index = HEALPixIndex()
+	for n in range(len(ra)):
+		index.insert(f"scidd:/astro/file/galex/gr6/f{n}.fits", ra[n], dec[n])
+
+	inside = _angular_separation(center[0], center[1], ra, dec) <= radius
+	expected = {f"scidd:/astro/file/galex/gr6/f{n}.fits" for n in np.flatnonzero(inside)}
+	assert 1000 < len(expected) < 2000
+	assert set(index.coneSearch(center[0], center[1], radius).scidds.tolist()) == expected
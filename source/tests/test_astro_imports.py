@@ -0,0 +1,30 @@
+
+import sys
+import subprocess
+
+def test_heavy_dependencies_are_imported_lazily():
+	'''
+	Test that importing scidd.astro and parsing an identifier doesn't import astropy, requests or any dataset module.
+	'''
+	probe = "\n".join([
+		"import sys",
+		"import scidd.core",
+		"before = set(sys.modules)",
+		"import scidd.astro",
+		"sci_dd = scidd.astro.SciDDAstro('scidd:/astro/file/galex/gr6/a.fits.gz')",
+		"assert sci_dd.filename == 'a.fits'",
+		"deferred = ['astropy', 'requests', 'aiohttp', 'sqlite3', 'tarfile', 'pdb', 'scidd.astro.dataset.galex', 'scidd.astro.positions', 'scidd.astro.streaming', 'scidd.astro.sqlite_cache']",
+		"print(','.join(m for m in deferred if m in sys.modules and m not in before))"
+	])
+	process = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, check=True)
+	assert process.stdout.strip() == ""
+
+def test_lazy_names_are_available():
+	'''
+	Test that names imported on first access resolve to the objects in their modules.
+	'''
+	import scidd.astro
+	from scidd.astro.download import DownloadManager
+
+	assert scidd.astro.DownloadManager is DownloadManager
+	assert "HEALPixIndex" in dir(scidd.astro)
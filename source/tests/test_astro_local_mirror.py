@@ -0,0 +1,48 @@
+
+import pytest
+
+from scidd.astro import SciDDAstro, LocalMirrorResolver
+
+@pytest.fixture
+def mirror(tmp_path):
+	'''
+	A small mirror directory tree.
+	'''
+	files = [
+		"galex/gr6/pipe/01-vsn/03001-MISDR1_24279_0266/d/00-visits/0001-img/07-try/MISDR1_24279_0266_0001-nd-cat_mch_rtastar.fits.gz",
+		"wise/allsky/4a_sky/ja/01/123/01234a123-w1-int-1b.fits",
+		"2mass/allsky/20001017s/s027/image/ji0270198.fits.gz",
+		"2mass/allsky/20001018n/s027/image/ji0270198.fits.gz"
+	]
+	for f in files:
+		path = tmp_path / "mirror" / f
+		path.parent.mkdir(parents=True)
+		path.write_bytes(b"SIMPLE")
+	return tmp_path / "mirror"
+
+def test_local_mirror_resolves_to_file_urls(mirror, tmp_path):
+	'''
+	Test that SciDDs are resolved to files in the mirror through the index.
+	'''
+	resolver = LocalMirrorResolver(root=mirror, index_path=tmp_path / "index.sqlite")
+	assert resolver.buildIndex() == 4
+
+	sci_dd = SciDDAstro("scidd:/astro/file/galex/gr6/MISDR1_24279_0266_0001-nd-cat_mch_rtastar.fits", resolver=resolver)
+	url = resolver.urlForSciDD(sci_dd, verify_resource=True)
+	assert url.startswith("file://")
+	assert url.endswith("/07-try/MISDR1_24279_0266_0001-nd-cat_mch_rtastar.fits.gz")
+
+	sci_dd = SciDDAstro("scidd:/astro/file/2mass/allsky/ji0270198.fits;uniqueid=20001018.n.27", resolver=resolver)
+	assert "/20001018n/" in resolver.urlForSciDD(sci_dd)
+
+def test_local_mirror_index_is_persistent(mirror, tmp_path):
+	'''
+	Test that a second resolver on the same index does not rescan the mirror.
+	'''
+	LocalMirrorResolver(root=mirror, index_path=tmp_path / "index.sqlite")
+	(mirror / "wise" / "allsky" / "new-w2-int-1b.fits").write_bytes(b"SIMPLE")
+
+	resolver = LocalMirrorResolver(root=mirror, index_path=tmp_path / "index.sqlite")
+	assert resolver.genericFilenameResolver(filename="new-w2-int-1b.fits") == []
+	assert resolver.buildIndex(rescan=True) == 5
+	assert len(resolver.genericFilenameResolver(dataset="wise", filename="new-w2-int-1b.fits")) == 1
@@ -0,0 +1,71 @@
+
+import pytest
+
+from scidd.astro import SciDDAstro, SciDDAstroResolver, ResolverMetrics
+from scidd.astro.cache import ResolverCache
+
+@pytest.fixture
+def resolver(local_api, monkeypatch):
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port, metrics=True)
+	resolver.cache = ResolverCache(persistent=dict())
+	return resolver
+
+def test_metrics_disabled_by_default():
+	assert SciDDAstroResolver(host="127.0.0.1").metrics is None
+
+def test_resolve_path_metrics(local_api, resolver):
+	'''
+	Test that API calls, cache lookups and resolves are counted and timed.
+	'''
+	local_api.respond("/astro/data/filename-search", [{"scidd" : "scidd:/astro/file/galex/gr6/a.fits", "url" : "http://example.org/a.fits.gz",
+													   "dataset" : "galex", "release" : "gr6", "file_size" : None, "position" : None}])
+	sci_dd = SciDDAstro("scidd:/astro/file/galex/gr6/a.fits", resolver=resolver)
+
+	resolver.urlForSciDD(sci_dd)
+	resolver.genericFilenameResolver(dataset="galex", release="gr6", filename="a.fits")
+
+	metrics = resolver.metrics
+	assert metrics.counter("http_requests_total") == 1
+	assert metrics.counter("http_response_bytes_total") > 0
+	assert metrics.counter("cache_lookups_total", result="miss") == 1
+	assert metrics.counter("cache_lookups_total", result="hit") == 1
+	assert metrics.counter("resolves_total", dataset="galex", outcome="ok") == 1
+	assert metrics.histogram("http_request_seconds").count == 1
+	assert metrics.histogram("json_decode_seconds").count == 1
+	assert metrics.histogram("resolve_seconds", dataset="galex").count == 1
+
+def test_errors_by_status_and_prometheus_text(local_api, resolver):
+	'''
+	Test that failed API calls are counted by status code and that metrics are exported as Prometheus text.
+	'''
+	local_api.respond("/astro/data/filename-search", {"error" : "not found"}, status=404)
+	with pytest.raises(Exception):
+		resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+
+	assert resolver.metrics.asDict()["counters"]['http_errors_total{status="404"}'] == 1
+	text = resolver.metrics.prometheusText()
+	assert "# TYPE scidd_astro_http_errors_total counter" in text
+	assert 'scidd_astro_http_errors_total{status="404"} 1' in text
+	assert 'scidd_astro_http_request_seconds_bucket{le="+Inf"} 1' in text
+	assert "scidd_astro_http_request_seconds_count 1" in text
+
+def test_histogram_buckets_are_cumulative():
+	metrics = ResolverMetrics(buckets=(0.1, 1.0))
+	for value in [0.05, 0.5, 0.5, 5.0]:
+		metrics.observe("latency", value)
+	assert metrics.asDict()["histograms"]["latency"]["buckets"] == {0.1 : 1, 1.0 : 3, float("inf") : 4}
+
+def test_position_lookup_uses_the_resolver(local_api, resolver):
+	'''
+	Test that the position of a file is looked up through the resolver of the SciDD (and counted in its metrics).
+	'''
+	pytest.importorskip("astropy")
+	local_api.respond("/astro/data/filename-search", [{"scidd" : "scidd:/astro/file/galex/gr6/a.fits", "url" : "http://example.org/a.fits.gz",
+													   "dataset" : "galex", "release" : "gr6", "file_size" : None, "position" : [10.5, -5.25]}])
+	sci_dd = SciDDAstro("scidd:/astro/file/galex/gr6/a.fits", resolver=resolver)
+
+	assert sci_dd.position.ra.deg == 10.5
+	assert len(local_api.requests) == 1
+	assert resolver.metrics.counter("http_requests_total") == 1
+	assert resolver.metrics.counter("position_lookups_total", source="api") == 1
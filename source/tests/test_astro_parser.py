@@ -0,0 +1,32 @@
+
+import pytest
+
+from scidd.astro.parser import parse_astro_scidd
+
+# sci_dd, (type, dataset, release, filename, uniqueid, fragment)
+expected_parse_results = [
+	("scidd:/astro/file/galex/gr6/NGA_NGC0024_0001-fd-exp.fits",
+	 ("file", "galex", "gr6", "NGA_NGC0024_0001-fd-exp.fits", None, None)),
+	("scidd:/astro/file/sdss/dr16/frame-g-004263-3-0213.fits.bz2",
+	 ("file", "sdss", "dr16", "frame-g-004263-3-0213.fits", None, None)),
+	("scidd:/astro/file/2mass/allsky/ji0270198.fits;uniqueid=20001017.s.27#1",
+	 ("file", "2mass", "allsky", "ji0270198.fits", "20001017.s.27", "1")),
+	("scidd:/astro/data/galex/gr7/table#row=4",
+	 ("data", "galex", "gr7", "table", None, "row=4"))
+]
+
+@pytest.mark.parametrize("sci_dd, expected", expected_parse_results)
+def test_parse_astro_scidd(sci_dd, expected):
+	'''
+	Test that identifiers are tokenized into their components.
+	'''
+	parsed = parse_astro_scidd(sci_dd)
+	assert (parsed.type, parsed.dataset, parsed.release, parsed.filename, parsed.uniqueid, parsed.fragment) == expected
+	assert parsed.datasetRelease == f"{expected[1]}.{expected[2]}"
+
+def test_parse_non_astro_scidd():
+	'''
+	Test that identifiers outside of the astro data/file namespace are rejected.
+	'''
+	with pytest.raises(ValueError):
+		parse_astro_scidd("scidd:/planetary/file/mars/a.img")
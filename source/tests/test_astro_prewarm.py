@@ -0,0 +1,71 @@
+
+import pytest
+
+from scidd.astro import SciDDAstroResolver
+from scidd.astro.cache import ResolverCache
+from scidd.astro.manifest import read_manifest
+from scidd.astro.prewarm import prewarm
+
+def _record(dataset, release, filename):
+	return {
+		"scidd" : f"scidd:/astro/file/{dataset}/{release}/{filename}",
+		"url" : f"http://example.org/{dataset}/{release}/{filename}.gz",
+		"dataset" : dataset,
+		"release" : release,
+		"file_size" : None,
+		"position" : None
+	}
+
+@pytest.fixture
+def resolver(local_api, monkeypatch):
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+	resolver.cache = ResolverCache(persistent=dict())
+	return resolver
+
+def test_read_manifest(tmp_path):
+	'''
+	Test reading text and CSV manifests.
+	'''
+	text = tmp_path / "manifest.txt"
+	text.write_text("# files\nscidd:/astro/file/galex/gr6/a.fits\n\nb.fits\n")
+	assert list(read_manifest(text)) == ["scidd:/astro/file/galex/gr6/a.fits", "b.fits"]
+
+	table = tmp_path / "manifest.csv"
+	table.write_text("id,filename\n1,a.fits\n2,\n3,b.fits\n")
+	assert list(read_manifest(table)) == ["a.fits", "b.fits"]
+	assert list(read_manifest(table, column="id")) == ["1", "2", "3"]
+	with pytest.raises(ValueError):
+		list(read_manifest(table, column="scidd"))
+
+def test_prewarm_is_restartable(local_api, resolver, tmp_path):
+	'''
+	Test that a manifest is resolved in bulk queries and that a second run finds everything in the cache.
+	'''
+	local_api.respondWithRecords([_record("galex", "gr6", "a.fits"), _record("galex", "gr6", "b.fits")])
+	manifest = tmp_path / "manifest.txt"
+	manifest.write_text("\n".join(f"scidd:/astro/file/galex/gr6/{name}" for name in ["a.fits", "b.fits", "c.fits", "a.fits"]))
+
+	report = prewarm(manifest, resolver=resolver, workers=2, chunk_size=10)
+
+	assert (report.total, report.skipped, report.resolved, report.not_found, report.failed) == (4, 1, 2, 1, 0)
+	assert len(local_api.requests) == 2 # the bulk query, and one confirming c.fits is missing
+
+	report = prewarm(manifest, resolver=resolver, workers=2, chunk_size=10)
+
+	assert (report.total, report.skipped, report.resolved) == (4, 4, 0)
+	assert len(local_api.requests) == 2
+
+def test_prewarm_failures_are_retried(local_api, resolver):
+	'''
+	Test that entries whose query failed are reported and not cached.
+	'''
+	local_api.respond("/astro/data/filename-search", {"error" : "bad request"}, status=400)
+	local_api.respond("/astro/data/filename-search", [_record("galex", "gr6", "a.fits")])
+
+	report = prewarm(["scidd:/astro/file/galex/gr6/a.fits"], resolver=resolver, chunk_size=10)
+	assert report.failed == 1
+	assert report.failures[0][0] == "scidd:/astro/file/galex/gr6/a.fits"
+
+	report = prewarm(["scidd:/astro/file/galex/gr6/a.fits"], resolver=resolver, chunk_size=10)
+	assert (report.resolved, report.failed) == (1, 0)
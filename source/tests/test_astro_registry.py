@@ -0,0 +1,77 @@
+
+import sys
+import types
+import pytest
+
+from scidd.astro import SciDDAstro, SciDDAstroResolver
+from scidd.astro.registry import DatasetRegistry, dataset_registry, register_dataset
+from scidd.astro.dataset.dataset import DatasetResolverBase
+
+class _SurveyResolver(DatasetResolverBase):
+	batchSize = 2
+	cacheResults = False
+
+	@property
+	def dataset(self):
+		return "survey"
+
+	@property
+	def releases(self):
+		return ["dr1"]
+
+@pytest.fixture
+def survey_module(monkeypatch):
+	''' A module holding a dataset resolver that has not been imported by the registry yet. '''
+	module = types.ModuleType("scidd_test_survey")
+	module.SurveyResolver = _SurveyResolver
+	monkeypatch.setitem(sys.modules, "scidd_test_survey", module)
+	return module
+
+def test_registry_loads_resolver_once(survey_module):
+	'''
+	Test that a dataset reference is only loaded when first looked up and the resolver object is reused.
+	'''
+	registry = DatasetRegistry(datasets={"survey" : "scidd_test_survey:SurveyResolver"}, entry_point_group=None)
+	assert registry._resolvers == {}
+
+	resolver = registry["survey"]
+	assert isinstance(resolver, _SurveyResolver)
+	assert registry["survey"] is resolver
+	with pytest.raises(NotImplementedError):
+		registry["unknown"]
+
+def test_registry_reads_entry_points(survey_module, monkeypatch):
+	'''
+	Test that datasets declared by entry points are found, but don't replace registered datasets.
+	'''
+	class EntryPoint:
+		group = "scidd.astro.datasets"
+		def __init__(self, name):
+			self.name = name
+		def load(self):
+			return _SurveyResolver
+
+	monkeypatch.setattr("scidd.astro.registry._entry_points", lambda group: [EntryPoint("survey"), EntryPoint("galex")])
+	registry = DatasetRegistry(datasets={"galex" : "scidd_test_survey:SurveyResolver"})
+
+	assert isinstance(registry["survey"], _SurveyResolver)
+	assert registry.datasets == ["galex", "survey"]
+	assert registry._references["galex"] == "scidd_test_survey:SurveyResolver"
+
+def test_dataset_batch_size_policy(local_api, monkeypatch):
+	'''
+	Test that a registered dataset's batch size sets the number of filenames per bulk query.
+	'''
+	monkeypatch.setenv("SCIDD_USE_CACHE", "0")
+	register_dataset("survey", _SurveyResolver)
+	try:
+		resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+		local_api.respondWithRecords([{"scidd" : f"scidd:/astro/file/survey/dr1/{name}.fits", "url" : f"http://example.org/{name}.fits",
+									   "dataset" : "survey", "release" : "dr1"} for name in "abcde"])
+		sci_dds = [SciDDAstro(f"scidd:/astro/file/survey/dr1/{name}.fits", resolver=resolver) for name in "abcde"]
+
+		resolver.urlsForSciDDs(sci_dds)
+
+		assert [len(parameters["filename"]) for path, parameters in local_api.requests] == [2, 2, 1]
+	finally:
+		dataset_registry.unregister("survey")
@@ -0,0 +1,324 @@
+
+import pytest
+
+import scidd.core.exc
+from scidd.astro import ResolverMetrics, SciDDAstro, SciDDAstroResolver
+from scidd.astro.cache import ResolverCache
+
+def _record(dataset, release, filename, file_size=None, position=None):
+	return {
+		"scidd" : f"scidd:/astro/file/{dataset}/{release}/{filename}",
+		"url" : f"http://example.org/{dataset}/{release}/{filename}.gz",
+		"dataset" : dataset,
+		"release" : release,
+		"file_size" : file_size,
+		"position" : position
+	}
+
+@pytest.fixture
+def resolver(local_api, monkeypatch):
+	monkeypatch.setenv("SCIDD_USE_CACHE", "0")
+	return SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+
+def test_urls_for_scidds_single_round_trip(local_api, resolver):
+	'''
+	Test that a batch of SciDDs in the same release is resolved in one API call with per-item errors.
+
+	A file missing from the response is confirmed with a query of its own.
+	'''
+	local_api.respondWithRecords([_record("galex", "gr6", "a.fits", file_size=1234), _record("galex", "gr6", "b.fits")])
+	sci_dds = [SciDDAstro(f"scidd:/astro/file/galex/gr6/{name}", resolver=resolver) for name in ["a.fits", "b.fits", "c.fits"]]
+
+	urls = resolver.urlsForSciDDs(sci_dds)
+
+	assert list(urls.keys()) == sci_dds
+	assert urls[sci_dds[0]] == "http://example.org/galex/gr6/a.fits.gz"
+	assert urls[sci_dds[1]] == "http://example.org/galex/gr6/b.fits.gz"
+	assert isinstance(urls[sci_dds[2]], scidd.core.exc.UnableToResolveSciDDToURL)
+	assert sci_dds[0]._uncompressed_file_size == 1234
+	assert sci_dds[0].datasetRelease == "galex.gr6"
+
+	assert len(local_api.requests) == 2
+	path, parameters = local_api.requests[0]
+	assert parameters["filename"] == ["a.fits", "b.fits", "c.fits"]
+	assert parameters["release"] == ["gr6"]
+	assert local_api.requests[1][1]["filename"] == ["c.fits"]
+
+def test_bulk_resolution_uses_the_given_resolver(local_api, resolver):
+	'''
+	Test that identifiers with a unique id resolved in bulk are looked up with the resolver doing the bulk resolution.
+	'''
+	local_api.respond("/astro/data/filename-search", [_record("2mass", "allsky", "ji0270198.fits")])
+	unreachable = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=9, max_retries=0)
+	sci_dd = SciDDAstro("scidd:/astro/file/2mass/allsky/ji0270198.fits;uniqueid=20001017.s.27", resolver=unreachable)
+
+	results = resolver.urlsForSciDDs([sci_dd])
+
+	assert results[sci_dd] == "http://example.org/2mass/allsky/ji0270198.fits.gz"
+	assert local_api.requests[0][1]["uniqueid"] == ["20001017.s.27"]
+
+def test_async_resolver_merges_inflight_requests(local_api, resolver):
+	'''
+	Test that concurrent identical filename searches on the async resolver are sent as a single request.
+	'''
+	pytest.importorskip("aiohttp")
+	import asyncio
+	from scidd.astro import AsyncSciDDAstroResolver
+
+	local_api.respond("/astro/data/filename-search", [_record("galex", "gr6", "a.fits")])
+
+	async def resolve():
+		async with AsyncSciDDAstroResolver(resolver=resolver, max_concurrency=2) as async_resolver:
+			return await asyncio.gather(*[async_resolver.genericFilenameResolver(filename="a.fits") for _ in range(10)])
+
+	results = asyncio.run(resolve())
+
+	assert all(records[0]["url"] == "http://example.org/galex/gr6/a.fits.gz" for records in results)
+	assert len(local_api.requests) == 1
+
+def test_async_resolver_persistent_cache_off_the_loop(local_api, resolver, monkeypatch):
+	'''
+	Test that the async resolver reads and writes the persistent cache tier off the event loop thread.
+	'''
+	pytest.importorskip("aiohttp")
+	import asyncio
+	import threading
+	from scidd.astro import AsyncSciDDAstroResolver
+
+	class Persistent(dict):
+		threads = set()
+		def __getitem__(self, key):
+			self.threads.add(threading.get_ident())
+			return super().__getitem__(key)
+		def __setitem__(self, key, value):
+			self.threads.add(threading.get_ident())
+			super().__setitem__(key, value)
+
+	monkeypatch.delenv("SCIDD_USE_CACHE")
+	resolver.cache = ResolverCache(persistent=Persistent())
+	local_api.respond("/astro/data/filename-search", [_record("galex", "gr6", "a.fits")])
+
+	async def resolve():
+		async with AsyncSciDDAstroResolver(resolver=resolver) as async_resolver:
+			first = await async_resolver.genericFilenameResolver(filename="a.fits")
+			resolver.cache.clearMemory()
+			second = await async_resolver.genericFilenameResolver(filename="a.fits")
+			return first, second, threading.get_ident()
+
+	first, second, loop_thread = asyncio.run(resolve())
+
+	assert first == second and len(local_api.requests) == 1
+	assert len(Persistent.threads) > 0 and loop_thread not in Persistent.threads
+
+def test_async_resolver_uses_throttle_and_metrics(local_api):
+	'''
+	Test that async requests go through the circuit breaker and rate limiter of the resolver and are counted in its metrics.
+	'''
+	pytest.importorskip("aiohttp")
+	import asyncio
+	from scidd.astro import AsyncSciDDAstroResolver, CircuitOpenError
+
+	local_api.respond("/astro/data/filename-search", {"error" : "broken"}, status=500)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port, metrics=True,
+								  failure_threshold=2, rate_limit=1000)
+
+	async def search():
+		errors = list()
+		async with AsyncSciDDAstroResolver(resolver=resolver) as async_resolver:
+			for _ in range(3):
+				try:
+					await async_resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+				except Exception as e:
+					errors.append(type(e))
+		return errors
+
+	errors = asyncio.run(search())
+
+	assert errors == [scidd.core.exc.ErrorInAccessingAPI, scidd.core.exc.ErrorInAccessingAPI, CircuitOpenError]
+	assert len(local_api.requests) == 2
+	bucket = resolver.transport.rateLimiter(resolver.base_url)
+	assert bucket._tokens <= bucket.burst - 1 # a token was taken
+	metrics = resolver.metrics
+	assert metrics.counter("http_requests_total") == 3
+	assert metrics.counter("http_errors_total", status="500") == 2
+	assert metrics.counter("http_errors_total", status="circuit_open") == 1
+	assert metrics.histogram("http_request_seconds").count == 2
+
+def test_positions_are_vectorized_and_masked(local_api, resolver):
+	'''
+	Test that positions are fetched in bulk, aligned with the input and masked where unavailable.
+	'''
+	from scidd.astro import positions
+
+	local_api.respondWithRecords([_record("galex", "gr6", "a.fits", position=[10.5, -5.25]), _record("galex", "gr6", "b.fits", position=None)])
+	sci_dds = [SciDDAstro(f"scidd:/astro/file/galex/gr6/{name}", resolver=resolver) for name in ["b.fits", "a.fits", "c.fits"]]
+
+	result = positions(sci_dds, resolver=resolver)
+
+	assert result.mask.tolist() == [True, False, True]
+	assert result.radec[1].tolist() == [10.5, -5.25]
+	assert result.coordinates.shape == (3,)
+	assert result.coordinates[1].ra.deg == 10.5
+	assert len(local_api.requests[0][1]["filename"]) == 3
+
+def test_verify_resources_concurrently_with_cache(local_api, monkeypatch):
+	'''
+	Test that resources are checked with HEAD requests whose results are cached and fill in missing file sizes.
+	'''
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+	resolver.cache = ResolverCache(persistent=dict())
+	base_url = f"http://127.0.0.1:{local_api.port}"
+
+	local_api.respond("/files/a.fits", {"data" : "abc"})
+	local_api.respond("/files/b.fits.gz", {"data" : "abc"})
+	sci_dds = [SciDDAstro(f"scidd:/astro/file/galex/gr6/{name}", resolver=resolver) for name in ["a.fits", "b.fits"]]
+	sci_dds[0]._url = f"{base_url}/files/a.fits"
+	sci_dds[1]._url = f"{base_url}/files/b.fits.gz"
+	missing = f"{base_url}/files/c.fits"
+
+	results = resolver.verifyResources(sci_dds + [missing], workers=4)
+
+	assert results[sci_dds[0]].available
+	assert results[sci_dds[0]].etag is not None
+	assert sci_dds[0]._uncompressed_file_size == results[sci_dds[0]].content_length
+	assert sci_dds[1]._uncompressed_file_size is None # the size of the compressed file is not the size of the file
+	assert not results[missing].available
+	assert len(local_api.requests) == 3
+
+	assert resolver.verifyResources([missing])[missing].status_code == 404
+	assert len(local_api.requests) == 3
+
+	resolver.verify_cache_ttl = 0
+	resolver.resourceStatus(missing)
+	assert len(local_api.requests) == 4
+
+def test_concurrent_filename_searches_are_merged(resolver, monkeypatch):
+	'''
+	Test that threads searching for the same filename at the same time share one request, including its errors.
+	'''
+	import time
+	import threading
+	from concurrent.futures import ThreadPoolExecutor
+
+	calls = list()
+	started = threading.Event()
+	def get(path, params=None, **kwargs):
+		calls.append(params)
+		started.set()
+		time.sleep(0.2) # keep the request in flight while the other threads arrive
+		if params["filename"] == "missing.fits":
+			raise scidd.core.exc.ErrorInAccessingAPI("server error")
+		return [_record("galex", "gr6", params["filename"])]
+	monkeypatch.setattr(resolver, "get", get)
+	resolver.metrics = ResolverMetrics()
+
+	def search(filename):
+		try:
+			return resolver.genericFilenameResolver(dataset="galex", release="gr6", filename=filename)
+		except Exception as e:
+			return e
+
+	for filename in ["a.fits", "missing.fits"]:
+		started.clear()
+		with ThreadPoolExecutor(max_workers=8) as executor:
+			first = executor.submit(search, filename)
+			started.wait()
+			others = [executor.submit(search, filename) for _ in range(7)]
+			results = [future.result() for future in [first] + others]
+		if filename == "a.fits":
+			assert all(records[0]["url"] == "http://example.org/galex/gr6/a.fits.gz" for records in results)
+		else:
+			assert all(isinstance(e, scidd.core.exc.ErrorInAccessingAPI) for e in results)
+
+	assert len(calls) == 2
+	assert resolver.mergedRequests == 14
+	assert resolver.metrics.counter("merged_requests_total") == 7 # errors are raised, not served
+
+def test_resolver_sharded_cache_selection(tmp_path, monkeypatch):
+	'''
+	Test that the persistent cache can be chosen by path, or with the SCIDD_ASTRO_CACHE_DIR environment variable.
+	'''
+	from scidd.astro.sqlite_cache import ShardedSQLiteCache
+
+	resolver = SciDDAstroResolver(host="127.0.0.1", persistent_cache=tmp_path / "a")
+	assert isinstance(resolver.cache.persistent, ShardedSQLiteCache)
+	assert resolver.cache.persistent.path == tmp_path / "a"
+
+	monkeypatch.setenv("SCIDD_ASTRO_CACHE_DIR", str(tmp_path / "b"))
+	resolver = SciDDAstroResolver(host="127.0.0.1")
+	assert resolver.cache.persistent.path == tmp_path / "b"
+
+def test_environment_clears_memory_once(monkeypatch):
+	'''
+	Test that turning the cache off with SCIDD_USE_CACHE clears the memory tier once, not on every check.
+	'''
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(host="127.0.0.1")
+	resolver.cache = ResolverCache(persistent=dict())
+	cleared = list()
+	monkeypatch.setattr(resolver.cache, "clearMemory", lambda: cleared.append(True))
+	assert resolver.useCache
+
+	monkeypatch.setenv("SCIDD_USE_CACHE", "0")
+	assert [resolver.useCache for _ in range(10)] == [False] * 10
+	assert len(cleared) == 1
+
+	monkeypatch.setenv("SCIDD_USE_CACHE", "1")
+	assert resolver.useCache
+	monkeypatch.setenv("SCIDD_USE_CACHE", "false")
+	assert not resolver.useCache
+	assert len(cleared) == 2
+
+def test_from_filename_caches_once(local_api, monkeypatch):
+	'''
+	Test that a filename search from SciDDAstroFile.fromFilename is stored under a single cache key.
+	'''
+	from scidd.astro import SciDDAstroFile
+
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+	resolver.cache = ResolverCache(persistent=dict())
+	monkeypatch.setattr(SciDDAstroResolver, "_default_instance", resolver)
+	local_api.respond("/astro/data/filename-search", [_record("galex", "gr6", "a.fits"), _record("galex", "gr7", "a.fits")])
+
+	sci_dds = SciDDAstroFile.fromFilename("a.fits", allow_multiple_results=True)
+	assert [s._url for s in sci_dds] == ["http://example.org/galex/gr6/a.fits.gz", "http://example.org/galex/gr7/a.fits.gz"]
+	assert list(resolver.cache.persistent.keys()) == ["astro:file/None/None/a.fits"]
+
+	assert len(SciDDAstroFile.fromFilename("a.fits", allow_multiple_results=True)) == 2
+	assert len(local_api.requests) == 1
+
+def test_bulk_search_missing_files_are_confirmed(local_api, monkeypatch):
+	'''
+	Test that files missing from a bulk response (e.g. a server that reads only one filename) are not cached as absent.
+	'''
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+	resolver.cache = ResolverCache(persistent=dict())
+	records = {name:_record("galex", "gr6", name) for name in ["a.fits", "b.fits"]}
+	local_api.respond("/astro/data/filename-search", lambda query: [records[query["filename"][0]]] if query["filename"][0] in records else []) # ignores all but the first filename
+
+	results = resolver.bulkFilenameResolver(dataset="galex", release="gr6", filenames=["a.fits", "b.fits", "c.fits"])
+
+	assert results["b.fits"] == [records["b.fits"]]
+	assert results["c.fits"] == []
+	assert not resolver.cache.isNegative("astro:file/galex/gr6/b.fits")
+	assert resolver.cache.isNegative("astro:file/galex/gr6/c.fits")
+
+def test_cache_write_errors_do_not_fail_lookups(local_api, monkeypatch):
+	'''
+	Test that a filename search still returns its records when they can't be stored in the cache.
+	'''
+	class ReadOnlyCache(dict):
+		def __setitem__(self, key, value):
+			raise OSError("read-only cache")
+
+	monkeypatch.delenv("SCIDD_USE_CACHE", raising=False)
+	resolver = SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port)
+	resolver.cache = ResolverCache(persistent=ReadOnlyCache())
+	local_api.respond("/astro/data/filename-search", [_record("galex", "gr6", "a.fits")])
+
+	records = resolver.genericFilenameResolver(dataset="galex", release="gr6", filename="a.fits")
+
+	assert [record["scidd"] for record in records] == ["scidd:/astro/file/galex/gr6/a.fits"]
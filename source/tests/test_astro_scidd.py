@@ -0,0 +1,63 @@
+
+import gc
+import tracemalloc
+
+from scidd.astro import SciDDAstro, SciDDAstroFile
+
+IDENTIFIERS = [f"scidd:/astro/file/galex/gr6/MISDR1_{i:06d}_0267_0001-nd-cat.fits" for i in range(5000)]
+
+def _bytes_per_object(read:bool=False) -> float:
+	'''
+	Returns the average number of bytes held by each object created from 'IDENTIFIERS'.
+
+	This is measured as the memory released when the objects are deleted, so that shared state that only
+	grows once (e.g. the table of interned strings) is not counted.
+
+	:param read: if True, read the components of each object before measuring
+	'''
+	gc.collect()
+	tracemalloc.start()
+	try:
+		sci_dds = [SciDDAstro(identifier) for identifier in IDENTIFIERS]
+		if read:
+			for sci_dd in sci_dds:
+				sci_dd.datasetRelease, sci_dd.filename, sci_dd.filenameUniqueIdentifier
+		alive = tracemalloc.take_snapshot()
+		del sci_dds
+		gc.collect()
+		released = tracemalloc.take_snapshot()
+	finally:
+		tracemalloc.stop()
+	return -sum(stat.size_diff for stat in released.compare_to(alive, "filename")) / len(IDENTIFIERS)
+
+def test_identifier_objects_stay_small():
+	'''
+	Test that reading the components of an identifier doesn't keep anything but the interned dataset/release with the object.
+	'''
+	sci_dd, other = SciDDAstro(IDENTIFIERS[0]), SciDDAstro(IDENTIFIERS[1])
+	assert isinstance(sci_dd, SciDDAstroFile)
+	assert "_parsed" not in SciDDAstroFile.__slots__
+	assert sci_dd.datasetRelease is other.datasetRelease
+	assert sci_dd.filename == "MISDR1_000000_0267_0001-nd-cat.fits"
+
+	size = _bytes_per_object()
+	assert size < 300 # per object, including the list slot
+	assert _bytes_per_object(read=True) - size < 1 # the dataset/release string is shared by all objects
+
+def test_parse_cache_size():
+	'''
+	Test that the number of remembered parse results can be set, and that identifiers are parsed the same without it.
+	'''
+	from scidd.astro import astro_scidd, set_parse_cache_size
+
+	sci_dd = SciDDAstro(IDENTIFIERS[2])
+	try:
+		set_parse_cache_size(0)
+		assert sci_dd.parsed is not sci_dd.parsed
+		assert sci_dd.filename == "MISDR1_000002_0267_0001-nd-cat.fits"
+
+		set_parse_cache_size(2)
+		assert sci_dd.parsed is sci_dd.parsed
+		assert astro_scidd._parse_recent.cache_info().maxsize == 2
+	finally:
+		set_parse_cache_size(64)
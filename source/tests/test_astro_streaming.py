@@ -0,0 +1,63 @@
+
+import bz2
+import gzip
+import pytest
+
+from scidd.astro.streaming import open_stream, uncompressed_path
+
+DATA = b"SIMPLE  =                    T" + bytes(range(256)) * 4000
+
+@pytest.mark.parametrize("ext, compress", [(".gz", gzip.compress), (".bz2", bz2.compress)])
+def test_uncompressed_sidecar(tmp_path, ext, compress):
+	'''
+	Test that a compressed file is decompressed once into a sidecar next to it.
+	'''
+	path = tmp_path / f"image.fits{ext}"
+	path.write_bytes(compress(DATA))
+
+	sidecar = uncompressed_path(path, chunk_size=1024)
+	assert sidecar == tmp_path / "image.fits"
+	assert sidecar.read_bytes() == DATA
+
+	mtime = sidecar.stat().st_mtime_ns
+	assert uncompressed_path(path) == sidecar
+	assert sidecar.stat().st_mtime_ns == mtime # not written again
+	assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+def test_uncompressed_path_of_uncompressed_file(tmp_path):
+	path = tmp_path / "image.fits"
+	path.write_bytes(DATA)
+	assert uncompressed_path(path) == path
+
+def test_open_stream_decompresses_while_downloading(local_api):
+	'''
+	Test that a gzip file served over HTTP is read decompressed from the stream.
+	'''
+	local_api.RequestHandlerClass = _raw_handler(gzip.compress(DATA))
+
+	with open_stream(f"http://127.0.0.1:{local_api.port}/data/image.fits.gz", buffer_size=4096) as stream:
+		assert stream.read(6) == b"SIMPLE"
+		assert stream.read() == DATA[6:]
+
+def test_open_stream_rejects_zip(local_api):
+	local_api.RequestHandlerClass = _raw_handler(b"PK")
+	with pytest.raises(ValueError):
+		open_stream(f"http://127.0.0.1:{local_api.port}/data/image.fits.zip")
+
+def _raw_handler(payload:bytes):
+	'''
+	Returns a request handler class that answers every GET with the given bytes.
+	'''
+	from http.server import BaseHTTPRequestHandler
+
+	class RawHandler(BaseHTTPRequestHandler):
+		def do_GET(self):
+			self.send_response(200)
+			self.send_header("Content-Length", str(len(payload)))
+			self.end_headers()
+			self.wfile.write(payload)
+
+		def log_message(self, format, *args):
+			pass
+
+	return RawHandler
@@ -0,0 +1,157 @@
+
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+from scidd.astro import SciDDAstroResolver
+
+def _resolver(local_api, **kwargs):
+	return SciDDAstroResolver(scheme="http", host="127.0.0.1", port=local_api.port, **kwargs)
+
+def test_connections_are_reused(local_api):
+	'''
+	Test that consecutive API calls are made over the same (keep-alive) connection.
+	'''
+	local_api.respond("/astro/data/filename-search", [{"scidd" : "scidd:/astro/file/galex/gr6/a.fits"}])
+	resolver = _resolver(local_api)
+
+	for _ in range(10):
+		assert resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})[0]["scidd"].endswith("a.fits")
+
+	assert len(local_api.requests) == 10
+	assert len(local_api.connections) == 1
+
+def test_transport_shared_across_threads(local_api):
+	'''
+	Test that one resolver can be used from many threads without opening more connections than the pool size.
+	'''
+	local_api.respond("/astro/data/filename-search", [])
+	resolver = _resolver(local_api, pool_size=4)
+
+	with ThreadPoolExecutor(max_workers=4) as executor:
+		results = list(executor.map(lambda n: resolver.get("/astro/data/filename-search", params={"filename" : str(n)}), range(100)))
+
+	assert results == [[]] * 100
+	assert len(local_api.connections) <= 4
+
+def test_retry_on_unavailable(local_api):
+	'''
+	Test that a transient server error is retried according to the retry policy.
+	'''
+	local_api.respond("/astro/data/filename-search", {}, status=502)
+	local_api.respond("/astro/data/filename-search", [])
+	resolver = _resolver(local_api, max_retries=2, backoff_factor=0)
+
+	assert resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"}) == []
+	assert len(local_api.requests) == 2
+
+def test_circuit_breaker(local_api, monkeypatch):
+	'''
+	Test that requests fail fast once a host keeps failing, and that a single probe closes the circuit again.
+	'''
+	from scidd.astro.throttle import CircuitBreaker, CircuitOpenError
+
+	for _ in range(2):
+		local_api.respond("/astro/data/filename-search", {"error" : "broken"}, status=500)
+	local_api.respond("/astro/data/filename-search", [])
+	resolver = _resolver(local_api, failure_threshold=2, recovery_time=60)
+
+	for _ in range(2):
+		with pytest.raises(Exception):
+			resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+	with pytest.raises(CircuitOpenError):
+		resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+	assert len(local_api.requests) == 2
+
+	breaker = resolver.transport.circuitBreaker(resolver.base_url)
+	assert breaker.state == CircuitBreaker.OPEN
+	monkeypatch.setattr(breaker, "_retry_at", 0.0)
+	assert breaker.state == CircuitBreaker.HALF_OPEN
+	assert resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"}) == []
+	assert breaker.state == CircuitBreaker.CLOSED
+
+def test_circuit_breaker_probe_is_released(local_api, monkeypatch):
+	'''
+	Test that a probe that ends without a success or failure being recorded doesn't leave the circuit waiting for it.
+	'''
+	from scidd.astro.throttle import CircuitBreaker
+
+	local_api.respond("/astro/data/filename-search", {"error" : "broken"}, status=500)
+	local_api.respond("/astro/data/filename-search", {"error" : "slow down"}, status=429)
+	local_api.respond("/astro/data/filename-search", [])
+	resolver = _resolver(local_api, max_retries=0, failure_threshold=1, recovery_time=60, rate_limit=1000)
+	with pytest.raises(Exception):
+		resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+	breaker = resolver.transport.circuitBreaker(resolver.base_url)
+	assert breaker.state == CircuitBreaker.OPEN
+
+	# a 429 is left to the rate limiter, so the probe records neither outcome
+	monkeypatch.setattr(breaker, "_retry_at", 0.0)
+	with pytest.raises(Exception):
+		resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+	assert breaker.state == CircuitBreaker.HALF_OPEN
+
+	monkeypatch.setattr(resolver.transport.rateLimiter(resolver.base_url), "_paused_until", 0.0)
+	assert resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"}) == []
+	assert breaker.state == CircuitBreaker.CLOSED
+
+def test_retry_after_and_stale_fallback(local_api):
+	'''
+	Test that a Retry-After header pauses requests to the host and that cached resource checks are used meanwhile.
+	'''
+	import time
+	from scidd.astro.cache import ResolverCache
+	from scidd.astro.throttle import CircuitOpenError
+
+	resolver = _resolver(local_api, max_retries=0, verify_cache_ttl=0)
+	resolver.cache = ResolverCache(persistent=dict())
+	url = f"http://127.0.0.1:{local_api.port}/files/a.fits"
+	local_api.respond("/files/a.fits", {"data" : "abc"})
+	assert resolver.resourceStatus(url).available
+
+	local_api.respond("/astro/data/filename-search", {"error" : "busy"}, status=503, headers={"Retry-After" : "120"})
+	with pytest.raises(Exception):
+		resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+	retry_after = resolver.transport.circuitBreaker(url)._retry_at - time.monotonic()
+	assert 100 < retry_after <= 120
+
+	count = len(local_api.requests)
+	assert resolver.resourceStatus(url).available # stale, but better than nothing
+	with pytest.raises(CircuitOpenError):
+		resolver.resourceStatus(url + "x")
+	assert len(local_api.requests) == count
+
+def test_retry_after_is_not_slept_in_the_request(local_api):
+	'''
+	Test that with the default retry policy a 503 with Retry-After fails at once, with a single request.
+	'''
+	import time
+	from scidd.astro.throttle import CircuitOpenError
+
+	local_api.respond("/astro/data/filename-search", {"error" : "busy"}, status=503, headers={"Retry-After" : "2"})
+	resolver = _resolver(local_api)
+
+	start = time.monotonic()
+	with pytest.raises(Exception):
+		resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+	assert time.monotonic() - start < 1.0
+	assert len(local_api.requests) == 1
+	with pytest.raises(CircuitOpenError):
+		resolver.get("/astro/data/filename-search", params={"filename" : "a.fits"})
+
+def test_token_bucket_rate():
+	'''
+	Test that the token bucket limits the request rate after the burst and slows down when asked to.
+	'''
+	import time
+	from scidd.astro.throttle import TokenBucket
+
+	bucket = TokenBucket(rate=100, burst=5)
+	start = time.monotonic()
+	for _ in range(25):
+		bucket.acquire()
+	assert 0.15 < time.monotonic() - start < 1.0
+
+	bucket.slowDown()
+	assert bucket.rate == 50
+	bucket.speedUp()
+	assert 50 < bucket.rate <= 100